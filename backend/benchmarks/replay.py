@@ -0,0 +1,76 @@
+"""Replay time of a single aggregate as its history grows, with and without
+snapshots.
+
+With snapshots, a replay only reads the events after the latest snapshot, so
+its time stays flat. Without them, it grows with the length of the history.
+
+Usage: `ENVIRONMENT=development uv run python -m benchmarks.replay`
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+
+from bson import ObjectId
+
+from core import constants, replay
+from core.enums import NoteEventType
+from core.utils import get_now_utc
+from database import get_client
+
+HISTORY_LENGTHS = [100, 1_000, 10_000, 50_000]
+# Events written after the latest snapshot, as between two reads of a Note
+TAIL_LENGTH = constants.SNAPSHOT_INTERVAL // 2
+RUNS = 5
+
+
+async def write_history(
+    session, aggregate_id: str, first_index: int, length: int
+) -> None:
+    start = get_now_utc() - timedelta(days=1)
+    documents = [
+        {
+            "aggregate_id": aggregate_id,
+            "type": (NoteEventType.UPDATED if index else NoteEventType.CREATED).value,
+            "payload": {"title": "Note", "content": f"Revision {index}"},
+            "created_at": start + timedelta(milliseconds=index),
+        }
+        for index in range(first_index, first_index + length)
+    ]
+    for index in range(0, length, 10_000):
+        await session.events.insert_many(documents[index : index + 10_000])
+
+
+async def time_replay(session, aggregate_id: str, snapshot_interval: int) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await replay.replay(aggregate_id, session, snapshot_interval)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+async def main() -> None:
+    print(f"{'events':>8} {'snapshots (ms)':>16} {'full replay (ms)':>18}")
+    async with await get_client().start_session() as session:
+        for length in HISTORY_LENGTHS:
+            aggregate_id = str(ObjectId())
+            try:
+                head_length = length - TAIL_LENGTH
+                await write_history(session, aggregate_id, 0, head_length)
+                await replay.replay(aggregate_id, session, snapshot_interval=1)
+                await write_history(session, aggregate_id, head_length, TAIL_LENGTH)
+                # An interval that is never reached keeps the snapshot as is
+                with_snapshots = await time_replay(session, aggregate_id, length + 1)
+                await session.snapshots.delete_one({"aggregate_id": aggregate_id})
+                full_replay = await time_replay(session, aggregate_id, length + 1)
+            finally:
+                await session.events.delete_many({"aggregate_id": aggregate_id})
+                await session.snapshots.delete_many({"aggregate_id": aggregate_id})
+            print(
+                f"{length:>8} {with_snapshots * 1000:>16.2f} {full_replay * 1000:>18.2f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
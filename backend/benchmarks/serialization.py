@@ -0,0 +1,86 @@
+"""Serialization cost per item of the list routes, as FastAPI does it from their
+`response_model`, and with `ModelResponse`.
+
+FastAPI validates the documents, dumps them back to Python objects, and encodes
+those with `jsonable_encoder` and `json.dumps`. `ModelResponse` validates them
+with a prebuilt `TypeAdapter`, which then serializes them straight to bytes.
+
+Usage: `ENVIRONMENT=development uv run python -m benchmarks.serialization`
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import TypeAdapter
+
+from core.responses import ModelResponse
+from core.utils import get_now_utc
+from notes.schemas import NoteRetrieve
+
+PAGE_SIZES = [20, 100]
+CONTENT_LENGTHS = [100, 10_000]
+RUNS = 200
+
+NOTES = TypeAdapter(list[NoteRetrieve])
+NOTES_FIELD = create_model_field(name="Response", type_=list[NoteRetrieve])
+
+
+def get_notes(count: int, content_length: int) -> "list[dict]":
+    now = get_now_utc()
+    folder_id = ObjectId()
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Note {index}",
+            "content": "x" * content_length,
+            "folder_id": folder_id,
+            "owner_id": "user",
+            "created_at": now - timedelta(days=1),
+            "last_updated_at": now - timedelta(minutes=index),
+            "revision": index,
+        }
+        for index in range(count)
+    ]
+
+
+async def fastapi_body(notes: "list[dict]") -> bytes:
+    return JSONResponse(
+        await serialize_response(field=NOTES_FIELD, response_content=notes)
+    ).body
+
+
+async def model_response_body(notes: "list[dict]") -> bytes:
+    return ModelResponse(notes, NOTES).body
+
+
+async def time_per_item(serialize, notes: "list[dict]") -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        await serialize(notes)
+        timings.append(time.perf_counter() - start)
+    return min(timings) / len(notes) * 1_000_000
+
+
+async def main() -> None:
+    print(
+        f"{'notes':>6} {'content':>8} {'FastAPI (µs)':>13} {'ModelResponse (µs)':>19}"
+    )
+    for count in PAGE_SIZES:
+        for content_length in CONTENT_LENGTHS:
+            notes = get_notes(count, content_length)
+            assert await fastapi_body(notes) == await model_response_body(notes)
+            print(
+                f"{count:>6} {content_length:>8} "
+                f"{await time_per_item(fastapi_body, notes):>13.2f} "
+                f"{await time_per_item(model_response_body, notes):>19.2f}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+"""Overhead of the database session of a request, before any operation.
+
+Eager sessions, as requests used to get, are started by Motor on a thread of
+its executor, get a new handle of each collection, and are ended on the
+executor again. Lazy sessions only start a driver session when an operation
+needs one, without leaving the event loop, and reuse the collection handles
+of the client. No server is needed: sessions are started without round trips.
+
+Usage: `ENVIRONMENT=development uv run python -m benchmarks.sessions`
+"""
+
+import asyncio
+import time
+
+from database import COLLECTION_NAMES, LazyMotorClientSession, get_client
+
+REQUESTS = 10_000
+RUNS = 5
+
+
+async def eager_session(client) -> None:
+    async with await client.start_session() as session:
+        for name in COLLECTION_NAMES:
+            setattr(session, name, client.db[name])
+        session.outbox = None
+
+
+async def lazy_session(client) -> None:
+    session = LazyMotorClientSession(client)
+    await session.end_session()
+
+
+async def used_lazy_session(client) -> None:
+    session = LazyMotorClientSession(client)
+    session.delegate
+    await session.end_session()
+
+
+async def implicit_session(client) -> None:
+    LazyMotorClientSession(client, explicit=False)
+
+
+async def time_requests(client, request) -> float:
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            await request(client)
+        timings.append(time.perf_counter() - start)
+    return min(timings) / REQUESTS * 1_000_000
+
+
+async def main() -> None:
+    client = get_client()
+    print(f"{'session':>30} {'per request (µs)':>18}")
+    for label, request in [
+        ("eager (before)", eager_session),
+        ("lazy, unused", lazy_session),
+        ("lazy, used", used_lazy_session),
+        ("implicit (read-only routes)", implicit_session),
+    ]:
+        print(f"{label:>30} {await time_requests(client, request):>18.1f}")
+    client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+"""Read-through cache of hot lookups and listings.
+
+Cached values are grouped by namespace (`folder`, `note`) and owner. Each group
+has a generation counter, part of the keys of its values: writing a `FOLDER_*`
+or `NOTE_*` event of an owner increments the generation of the matching group
+once the event is committed (see `invalidate`), so none of the previous values
+is read again, and they expire by their time to live.
+
+Counters expire once neither read nor incremented for
+`CACHE_GENERATION_TTL_SECONDS`, longer than any value is cached for, so every
+value of their group has expired by then and a missing counter safely reads as
+generation 0 again.
+
+`MemoryCache` is only invalidated by the events written by its own process, so
+deployments running several processes should use `RedisCache`.
+"""
+
+import logging
+from typing import TYPE_CHECKING
+
+import bson
+from bson.codec_options import CodecOptions
+
+from cache.base import CacheBackend
+from cache.memory import MemoryCache
+from cache.redis import RedisCache, RedisError
+from core.utils import import_string
+from settings import settings
+
+if TYPE_CHECKING:
+    from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
+
+    from database import Session
+
+    T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+FOLDER_NAMESPACE = "folder"
+NOTE_NAMESPACE = "note"
+# Errors of the backend, on which the cache is bypassed rather than failing
+CACHE_ERRORS = (OSError, TimeoutError, RedisError)
+
+_CODEC_OPTIONS = CodecOptions(tz_aware=True)
+_cache: "Optional[CacheBackend]" = None
+
+
+def init() -> "CacheBackend":
+    """Resolve the cache backend configured by `CACHE_BACKEND`. Called once at
+    startup, so requests do not pay for the lookup."""
+    global _cache
+    _cache = import_string(settings.CACHE_BACKEND).from_settings(settings)
+    return _cache
+
+
+def get_cache() -> "CacheBackend":
+    return _cache or init()
+
+
+async def close() -> None:
+    global _cache
+    if _cache is not None:
+        await _cache.close()
+        _cache = None
+
+
+def is_cacheable(session: "Session") -> bool:
+    """Whether the values read by a session can be cached: not those read in a
+    transaction, which may see its own uncommitted writes, nor those read from
+    secondaries, which may lag behind the latest invalidation"""
+    return session.outbox is None and not session.stale_reads
+
+
+def _get_generation_key(namespace: str, owner_id: str) -> str:
+    return f"generation:{namespace}:{owner_id}"
+
+
+async def cached(
+    namespace: str,
+    owner_id: str,
+    key: str,
+    load: "Callable[[], Awaitable[T]]",
+    ttl: "Optional[float]" = None,
+) -> "T":
+    """Value of `load()`, read from the cache when it holds it, or cached for
+    `ttl` seconds (`CACHE_TTL_SECONDS` by default, at most
+    `CACHE_GENERATION_TTL_SECONDS`) otherwise
+
+    Args:
+        namespace: Kind of documents the value is made of, `FOLDER_NAMESPACE`
+            or `NOTE_NAMESPACE`
+        owner_id: Owner of the documents
+        key: Key of the value, unique within the namespace and owner
+        load: Load the value from the database, a BSON-serializable document, a
+            list of them or None
+        ttl: Seconds the value may be cached for
+    """
+    cache = get_cache()
+    try:
+        generation = await cache.get_counter(
+            _get_generation_key(namespace, owner_id),
+            settings.CACHE_GENERATION_TTL_SECONDS,
+        )
+        value_key = f"{namespace}:{owner_id}:{generation}:{key}"
+        if (content := await cache.get(value_key)) is not None:
+            return bson.decode(content, codec_options=_CODEC_OPTIONS)["value"]
+    except CACHE_ERRORS:
+        logger.warning("Cache unavailable, loading from the database", exc_info=True)
+        return await load()
+
+    value = await load()
+    try:
+        await cache.set(
+            value_key,
+            bson.encode({"value": value}),
+            min(
+                settings.CACHE_TTL_SECONDS if ttl is None else ttl,
+                settings.CACHE_GENERATION_TTL_SECONDS,
+            ),
+        )
+    except CACHE_ERRORS:
+        logger.warning("Cache unavailable, value not cached", exc_info=True)
+    return value
+
+
+async def invalidate(events: "Iterable[dict[str, Any]]") -> None:
+    """Invalidate the values of the namespaces and owners of committed events
+
+    Must run once the events are committed: invalidating earlier would let
+    concurrent requests cache the state preceding them again.
+    """
+    groups = {
+        (event["type"].split("_", 1)[0].lower(), event["owner_id"])
+        for event in events
+        if event.get("owner_id")
+    }
+    cache = get_cache()
+    for namespace, owner_id in sorted(groups):
+        if namespace not in (FOLDER_NAMESPACE, NOTE_NAMESPACE):
+            continue
+        try:
+            await cache.incr(
+                _get_generation_key(namespace, owner_id),
+                settings.CACHE_GENERATION_TTL_SECONDS,
+            )
+        except CACHE_ERRORS:
+            logger.exception(
+                f"Failed to invalidate the {namespace} cache of {owner_id}, "
+                f"stale values may be read for {settings.CACHE_TTL_SECONDS}s"
+            )
+
+
+__all__ = [
+    "CacheBackend",
+    "FOLDER_NAMESPACE",
+    "MemoryCache",
+    "NOTE_NAMESPACE",
+    "RedisCache",
+    "cached",
+    "close",
+    "get_cache",
+    "init",
+    "invalidate",
+    "is_cacheable",
+]
@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Optional
+
+    from settings import Settings
+
+
+class CacheBackend(ABC):
+    """Where cached values are kept, as bytes with a time to live.
+
+    Backends count their hits and misses, and the entries they evict before
+    their time to live, see `get_metrics`.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    @abstractmethod
+    def from_settings(cls, settings: "Settings") -> "CacheBackend": ...
+
+    @abstractmethod
+    async def get(self, key: str) -> "Optional[bytes]":
+        """Cached value of a key, or None if it is missing or expired"""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Cache a value for `ttl` seconds"""
+
+    @abstractmethod
+    async def pop(self, key: str) -> "Optional[bytes]":
+        """Remove a value and return it, or None if it is missing or expired.
+        Atomic: a value is only returned once. Not counted as a hit or miss."""
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: float) -> int:
+        """Increment the counter of a key and return it. The counter expires
+        once neither read nor incremented for `ttl` seconds."""
+
+    @abstractmethod
+    async def get_counter(self, key: str, ttl: float) -> int:
+        """Counter of a key, 0 if it was never incremented or has expired. Reading
+        it postpones its expiry to `ttl` seconds from now."""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Drop every cached value and counter"""
+
+    async def close(self) -> None:
+        pass
+
+    async def get_metrics(self) -> "dict[str, Any]":
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
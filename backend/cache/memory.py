@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from cache.base import CacheBackend
+
+if TYPE_CHECKING:
+    from typing import Optional
+
+    from settings import Settings
+
+
+class MemoryCache(CacheBackend):
+    """LRU of the values cached by this process, each expiring after its time to
+    live. Counters are kept apart, so they are never evicted before they expire.
+    """
+
+    def __init__(self, max_size: int):
+        super().__init__()
+        self.max_size = max_size
+        # `key: (value, expires_at)`, least recently used first
+        self._entries: "OrderedDict[str, tuple[bytes, float]]" = OrderedDict()
+        # `key: (counter, expires_at)`, least recently used first
+        self._counters: "OrderedDict[str, tuple[int, float]]" = OrderedDict()
+
+    @classmethod
+    def from_settings(cls, settings: "Settings") -> "MemoryCache":
+        return cls(max_size=settings.CACHE_MAX_SIZE)
+
+    async def get(self, key: str) -> "Optional[bytes]":
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() >= entry[1]:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def pop(self, key: str) -> "Optional[bytes]":
+        entry = self._entries.pop(key, None)
+        if entry is None or time.monotonic() >= entry[1]:
+            return None
+        return entry[0]
+
+    def _touch_counter(self, key: str, counter: int, ttl: float) -> int:
+        now = time.monotonic()
+        self._counters[key] = (counter, now + ttl)
+        self._counters.move_to_end(key)
+        # Counters share the same time to live, so the least recently used expire
+        # first
+        while self._counters and next(iter(self._counters.values()))[1] <= now:
+            self._counters.popitem(last=False)
+        return counter
+
+    def _get_counter(self, key: str) -> int:
+        counter, expires_at = self._counters.get(key, (0, 0.0))
+        return counter if time.monotonic() < expires_at else 0
+
+    async def incr(self, key: str, ttl: float) -> int:
+        return self._touch_counter(key, self._get_counter(key) + 1, ttl)
+
+    async def get_counter(self, key: str, ttl: float) -> int:
+        if key not in self._counters:
+            return 0
+        return self._touch_counter(key, self._get_counter(key), ttl)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._counters.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
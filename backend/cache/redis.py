@@ -0,0 +1,200 @@
+import asyncio
+from typing import TYPE_CHECKING
+from urllib.parse import unquote, urlsplit
+
+from cache.base import CacheBackend
+
+if TYPE_CHECKING:
+    from typing import Any, Optional
+
+    from settings import Settings
+
+    Connection = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+DEFAULT_PORT = 6379
+# Keys deleted per `DEL` when clearing the cache
+SCAN_COUNT = 1000
+
+
+class RedisError(Exception):
+    """Error reply of the server"""
+
+
+def encode_command(*args: "Any") -> bytes:
+    """Command as a RESP array of bulk strings"""
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        value = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts += [f"${len(value)}\r\n".encode(), value, b"\r\n"]
+    return b"".join(parts)
+
+
+async def read_reply(reader: "asyncio.StreamReader") -> "Any":
+    """Read a RESP reply. Error replies are returned, not raised, so the
+    connection can be reused."""
+    line = await reader.readuntil(b"\r\n")
+    prefix, value = line[:1], line[1:-2]
+    if prefix == b"+":
+        return value.decode()
+    if prefix == b"-":
+        return RedisError(value.decode())
+    if prefix == b":":
+        return int(value)
+    if prefix == b"$":
+        if int(value) < 0:
+            return None
+        return (await reader.readexactly(int(value) + 2))[:-2]
+    if prefix == b"*":
+        if int(value) < 0:
+            return None
+        return [await read_reply(reader) for _ in range(int(value))]
+    raise RedisError(f"Unexpected reply: {line!r}")
+
+
+class RedisCache(CacheBackend):
+    """Cache values in Redis, or any server speaking its protocol (Valkey,
+    KeyDB, Dragonfly...), so they are shared by every process.
+
+    Commands are sent over a pool of up to `pool_size` connections. Values
+    expire on the server, which may also evict them under memory pressure: the
+    evictions reported are those of the whole server.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        key_prefix: str = "",
+        pool_size: int = 10,
+        timeout: float = 1.0,
+    ):
+        parts = urlsplit(url)
+        if parts.scheme not in ("redis", "rediss"):
+            raise ValueError(f"Unsupported Redis URL scheme: {parts.scheme}")
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or DEFAULT_PORT
+        self.ssl = parts.scheme == "rediss"
+        self.username = unquote(parts.username) if parts.username else None
+        self.password = unquote(parts.password) if parts.password else None
+        self.database = int(parts.path.strip("/") or 0)
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        super().__init__()
+        self._idle: "list[Connection]" = []
+        self._slots = asyncio.Semaphore(pool_size)
+
+    @classmethod
+    def from_settings(cls, settings: "Settings") -> "RedisCache":
+        return cls(
+            url=settings.CACHE_REDIS_URL,
+            key_prefix=settings.CACHE_KEY_PREFIX,
+            pool_size=settings.CACHE_REDIS_POOL_SIZE,
+            timeout=settings.CACHE_REDIS_TIMEOUT_SECONDS,
+        )
+
+    async def _connect(self) -> "Connection":
+        connection = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        try:
+            if self.password:
+                credentials = [self.username] if self.username else []
+                await self._send(connection, "AUTH", *credentials, self.password)
+            if self.database:
+                await self._send(connection, "SELECT", self.database)
+        except BaseException:
+            connection[1].close()
+            raise
+        return connection
+
+    async def _send(self, connection: "Connection", *args: "Any") -> "Any":
+        reader, writer = connection
+        writer.write(encode_command(*args))
+        await writer.drain()
+        reply = await read_reply(reader)
+        if isinstance(reply, RedisError):
+            raise reply
+        return reply
+
+    async def execute(self, *args: "Any") -> "Any":
+        """Send a command over a pooled connection and return its reply
+
+        Raises:
+            RedisError: If the server replies with an error
+            OSError: If the server cannot be reached
+            TimeoutError: If the server does not reply within `timeout` seconds
+        """
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                async with asyncio.timeout(self.timeout):
+                    connection = connection or await self._connect()
+                    reply = await self._send(connection, *args)
+            except RedisError:
+                # Replied to in full, so the connection can be reused
+                if connection:
+                    self._idle.append(connection)
+                raise
+            except BaseException:
+                # The connection may be left mid-reply, so it is not reused
+                if connection:
+                    connection[1].close()
+                raise
+            self._idle.append(connection)
+            return reply
+
+    async def get(self, key: str) -> "Optional[bytes]":
+        value = await self.execute("GET", f"{self.key_prefix}{key}")
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.execute(
+            "SET", f"{self.key_prefix}{key}", value, "PX", max(int(ttl * 1000), 1)
+        )
+
+    async def pop(self, key: str) -> "Optional[bytes]":
+        # Redis 6.2 or later
+        return await self.execute("GETDEL", f"{self.key_prefix}{key}")
+
+    async def incr(self, key: str, ttl: float) -> int:
+        counter = await self.execute("INCR", f"{self.key_prefix}{key}")
+        await self.execute(
+            "PEXPIRE", f"{self.key_prefix}{key}", max(int(ttl * 1000), 1)
+        )
+        return counter
+
+    async def get_counter(self, key: str, ttl: float) -> int:
+        # Redis 6.2 or later
+        counter = await self.execute(
+            "GETEX", f"{self.key_prefix}{key}", "PX", max(int(ttl * 1000), 1)
+        )
+        return int(counter or 0)
+
+    async def clear(self) -> None:
+        cursor = "0"
+        while True:
+            cursor, keys = await self.execute(
+                "SCAN", cursor, "MATCH", f"{self.key_prefix}*", "COUNT", SCAN_COUNT
+            )
+            if keys:
+                await self.execute("DEL", *keys)
+            if cursor in (b"0", "0"):
+                return
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+    async def get_metrics(self) -> "dict[str, Any]":
+        metrics = await super().get_metrics()
+        try:
+            info = (await self.execute("INFO", "stats")).decode()
+        except (OSError, TimeoutError, RedisError):
+            return metrics
+        for line in info.splitlines():
+            name, _, value = line.partition(":")
+            if name == "evicted_keys":
+                metrics["evictions"] = int(value)
+        return metrics
@@ -0,0 +1,221 @@
+"""Archival of the events past their retention.
+
+Events older than the retention of their type are moved out of the `events`
+collection to gzipped NDJSON segments in the storage backend, so the collection
+and its indexes stay the size of the retention window. The aggregates of the
+archived events are snapshotted first, so replays do not need them anymore.
+Segments are append-only: each archival writes new ones, and they are listed in
+the `event_segments` collection, which is enough to query them on demand.
+
+Usage: `ENVIRONMENT=production uv run python -m core.archive`, e.g. daily.
+"""
+
+import asyncio
+import gzip
+import logging
+from datetime import timedelta, timezone
+from typing import TYPE_CHECKING
+
+import pymongo
+from bson import json_util
+
+import database
+from core import constants, pagination, replay
+from core.services import SORT_KEY, with_transaction
+from core.utils import get_now_utc
+from file_storage import get_storage
+from file_storage.base import PRIVATE_DIR_NAME
+from settings import settings
+
+if TYPE_CHECKING:
+    from datetime import datetime
+    from typing import Any, AsyncIterator, Optional
+
+    from database import Client, Session
+
+logger = logging.getLogger(__name__)
+
+SEGMENTS_DIR_NAME = f"{PRIVATE_DIR_NAME}/events"
+
+_JSON_OPTIONS = json_util.RELAXED_JSON_OPTIONS.with_options(
+    tz_aware=True, tzinfo=timezone.utc
+)
+
+
+def get_retention(event_type: str) -> "timedelta":
+    return timedelta(
+        days=settings.EVENT_RETENTION_DAYS.get(
+            event_type, settings.EVENT_DEFAULT_RETENTION_DAYS
+        )
+    )
+
+
+def _get_expired_query(now: "datetime") -> "dict[str, Any]":
+    """Filter matching the events past the retention of their type"""
+    retained_types = list(settings.EVENT_RETENTION_DAYS)
+    return {
+        "$or": [
+            {"type": event_type, SORT_KEY: {"$lt": now - get_retention(event_type)}}
+            for event_type in retained_types
+        ]
+        + [
+            {
+                "type": {"$nin": retained_types},
+                SORT_KEY: {
+                    "$lt": now - timedelta(days=settings.EVENT_DEFAULT_RETENTION_DAYS)
+                },
+            }
+        ]
+    }
+
+
+def encode_segment(events: "list[dict[str, Any]]") -> bytes:
+    return gzip.compress(
+        "".join(
+            f"{json_util.dumps(event, json_options=_JSON_OPTIONS)}\n"
+            for event in events
+        ).encode()
+    )
+
+
+def decode_segment(content: bytes) -> "list[dict[str, Any]]":
+    return [
+        json_util.loads(line, json_options=_JSON_OPTIONS)
+        for line in gzip.decompress(content).decode().splitlines()
+    ]
+
+
+async def _archive_segment(
+    events: "list[dict[str, Any]]", session: "Session"
+) -> "dict[str, Any]":
+    first, last = events[0], events[-1]
+    segment = {
+        "key": (
+            f"{SEGMENTS_DIR_NAME}/{first[SORT_KEY]:%Y/%m/%d}/"
+            f"{first['_id']}-{last['_id']}.ndjson.gz"
+        ),
+        "count": len(events),
+        "first_created_at": first[SORT_KEY],
+        "last_created_at": last[SORT_KEY],
+        "last_event_id": last["_id"],
+        "aggregate_ids": sorted({event["aggregate_id"] for event in events}),
+        "created_at": get_now_utc(),
+    }
+    # Written before the events are deleted, so they are never lost. Should the
+    # deletion fail, the next archival writes the same segment again.
+    await get_storage().save(segment["key"], encode_segment(events))
+
+    async def commit(s: "Session") -> None:
+        await s.event_segments.insert_one(segment, session=s)
+        await s.events.delete_many(
+            {"_id": {"$in": [event["_id"] for event in events]}}, session=s
+        )
+
+    await with_transaction(session, commit)
+    return segment
+
+
+async def archive_events(
+    client: "Client",
+    now: "Optional[datetime]" = None,
+    segment_max_events: int = constants.ARCHIVE_SEGMENT_MAX_EVENTS,
+) -> int:
+    """Move the events past their retention to segments, oldest first
+
+    Args:
+        client: Database client
+        now: Time the retention is counted from, now by default
+        segment_max_events: Maximum number of events per segment
+    Returns:
+        int: Number of archived events
+    """
+    query = _get_expired_query(now or get_now_utc())
+    archived_count = 0
+    async with await client.start_session() as session:
+        while events := (
+            await session.events.find(query, session=session)
+            .sort(pagination.keyset_sort(SORT_KEY))
+            .limit(segment_max_events)
+            .to_list()
+        ):
+            # Snapshot the aggregates past their latest event, so their state no
+            # longer depends on the archived ones
+            for aggregate_id in sorted({event["aggregate_id"] for event in events}):
+                await replay.replay(aggregate_id, session, snapshot_interval=1)
+            segment = await _archive_segment(events, session)
+            archived_count += segment["count"]
+            logger.info(f"Archived {segment['count']} events to {segment['key']}")
+    return archived_count
+
+
+def _matches(
+    event: "dict[str, Any]",
+    owner_id: "Optional[str]" = None,
+    aggregate_id: "Optional[str]" = None,
+    type: "Optional[str]" = None,
+    created_after: "Optional[datetime]" = None,
+    created_before: "Optional[datetime]" = None,
+) -> bool:
+    return (
+        (owner_id is None or event.get("owner_id") == owner_id)
+        and (aggregate_id is None or event["aggregate_id"] == aggregate_id)
+        and (type is None or event["type"] == type)
+        and (created_after is None or event[SORT_KEY] >= created_after)
+        and (created_before is None or event[SORT_KEY] < created_before)
+    )
+
+
+async def iter_archived_events(
+    session: "Session", **filters: "Any"
+) -> "AsyncIterator[list[dict[str, Any]]]":
+    """Iterate over the archived events matching the filters, newest first, one
+    segment at a time. Only the segments that may hold matching events are read.
+
+    Args:
+        session: Database session
+        filters: `owner_id`, `aggregate_id`, `type`, `created_after` and
+            `created_before`, as for `core.services.get_events`
+    """
+    query = {}
+    if filters.get("aggregate_id"):
+        query["aggregate_ids"] = filters["aggregate_id"]
+    if filters.get("created_after"):
+        query["last_created_at"] = {"$gte": filters["created_after"]}
+    if filters.get("created_before"):
+        query["first_created_at"] = {"$lt": filters["created_before"]}
+
+    storage = get_storage()
+    async for segment in session.event_segments.find(
+        query, {"key": 1}, session=session
+    ).sort("last_created_at", pymongo.DESCENDING):
+        content = b"".join([chunk async for chunk in storage.download(segment["key"])])
+        if events := [
+            event
+            for event in reversed(decode_segment(content))
+            if _matches(event, **filters)
+        ]:
+            yield events
+
+
+async def get_horizon(session: "Session") -> "Optional[pagination.Cursor]":
+    """Position of the most recent archived event, if any. Changes up to it can
+    no longer be read from the events collection."""
+    segment = await session.event_segments.find_one(
+        {},
+        {"last_created_at": 1, "last_event_id": 1},
+        sort=[("last_created_at", pymongo.DESCENDING)],
+        session=session,
+    )
+    if segment is None:
+        return None
+    return segment["last_created_at"], segment["last_event_id"]
+
+
+async def main() -> None:
+    archived_count = await archive_events(database.get_client())
+    logger.info(f"Archived {archived_count} events")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -1,9 +1,34 @@
+import asyncio
+import hashlib
+import logging
+import re
+import secrets
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+
 import firebase_admin
-from fastapi import Header
-from firebase_admin import auth as firebase_auth, credentials
+import httpx
+import jwt
+from cryptography import x509
+from fastapi import Header, HTTPException, Query, status
+from firebase_admin import credentials
 from settings import settings
 from pydantic import BaseModel
 
+import cache
+
+if TYPE_CHECKING:
+    from typing import Any, Awaitable, Callable
+
+    from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = "RS256"
+ISSUER_PREFIX = "https://securetoken.google.com/"
+STREAM_TICKET_KEY_PREFIX = "stream-ticket:"
+
 
 def init() -> None:
     credential = credentials.Certificate(settings.FIREBASE_CONFIG.dict())
@@ -14,19 +39,300 @@ class AuthUser(BaseModel):
     name: str
     email: str
     user_id: str
+    # Expiration time of the token, in seconds since the epoch
+    exp: Optional[int] = None
 
     class Config:
         extra = "ignore"
 
 
-def get_auth_user(authorization: str = Header(...)) -> AuthUser:
-    """Get decoded token from authorization header
+def _parse_max_age(cache_control: str) -> int:
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else 0
+
+
+class KeysUnavailableError(Exception):
+    """The public keys could not be fetched, and none were fetched before"""
+
+
+class PublicKeyStore:
+    """In-process set of the public keys Firebase signs ID tokens with.
+
+    Keys are fetched ahead of time and kept for as long as Google's
+    `Cache-Control: max-age` allows, but at least `min_refresh_interval`
+    seconds. Once they get close to expiring, or expired, a refresh runs in the
+    background while the current keys keep being served, so requests only wait
+    for a fetch when there are no keys yet, or a key is missing.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        fetch: "Optional[Callable[[], Awaitable[tuple[dict[str, str], int]]]]" = None,
+        refresh_margin: int = 300,
+        min_refresh_interval: int = 60,
+    ):
+        self.url = url
+        self._fetch = fetch or self._fetch_certificates
+        self._refresh_margin = refresh_margin
+        self._min_refresh_interval = min_refresh_interval
+        self._keys: "dict[str, RSAPublicKey]" = {}
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._refreshed_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self._background_refresh: "Optional[asyncio.Task]" = None
+
+    async def get(self, kid: str) -> "Optional[RSAPublicKey]":
+        """Key of a given id, or None if there is no such key
+
+        Raises:
+            KeysUnavailableError: If there are no keys, and fetching them failed
+        """
+        now = time.monotonic()
+        if not self._keys:
+            try:
+                await self.refresh()
+            except Exception as error:
+                raise KeysUnavailableError() from error
+        elif (
+            kid not in self._keys
+            and now - self._refreshed_at >= self._min_refresh_interval
+        ):
+            # Keys can be rotated before the current set expires
+            await self._refresh_quietly()
+        elif now >= self._refresh_at:
+            self._schedule_refresh()
+        return self._keys.get(kid)
+
+    async def refresh(self) -> None:
+        expires_at = self._expires_at
+        async with self._lock:
+            if self._expires_at != expires_at:
+                # Another coroutine refreshed the keys while we were waiting
+                return
+            certificates, max_age = await self._fetch()
+            self.load(certificates, max_age)
+
+    def load(self, certificates: "dict[str, str]", max_age: int) -> None:
+        """Replace the key set with the given PEM encoded certificates.
+
+        Args:
+            certificates: Mapping of key id to PEM encoded X.509 certificate
+            max_age: Seconds the certificates can be used for
+        """
+        self._keys = {
+            kid: x509.load_pem_x509_certificate(pem.encode()).public_key()
+            for kid, pem in certificates.items()
+        }
+        self._refreshed_at = time.monotonic()
+        # Without `max-age`, keys would be fetched again on every request
+        self._expires_at = self._refreshed_at + max(max_age, self._min_refresh_interval)
+        self._refresh_at = self._refreshed_at + max(
+            max_age - self._refresh_margin, self._min_refresh_interval
+        )
+
+    def _schedule_refresh(self) -> None:
+        if self._background_refresh and not self._background_refresh.done():
+            return
+        self._background_refresh = asyncio.create_task(self._refresh_quietly())
+
+    async def _refresh_quietly(self) -> None:
+        """Refresh the keys, keeping the current ones if that fails"""
+        try:
+            await self.refresh()
+        except Exception:
+            logger.exception("Unable to refresh the Firebase public keys")
+            # Not retried by every request while the key host is down
+            self._refreshed_at = time.monotonic()
+            self._refresh_at = self._refreshed_at + self._min_refresh_interval
+
+    async def _fetch_certificates(self) -> "tuple[dict[str, str], int]":
+        async with httpx.AsyncClient(timeout=10) as http_client:
+            response = await http_client.get(self.url)
+            response.raise_for_status()
+        max_age = _parse_max_age(response.headers.get("cache-control", ""))
+        return response.json(), max_age
+
+
+class TokenCache:
+    """LRU of verified tokens, keyed by the token hash and bounded by `exp`."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, tuple[AuthUser, float]]" = OrderedDict()
+
+    def get(self, token: str) -> "Optional[AuthUser]":
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        auth_user, expires_at = entry
+        if time.time() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return auth_user
+
+    def set(self, token: str, auth_user: "AuthUser", expires_at: float) -> None:
+        key = self._key(token)
+        self._entries[key] = (auth_user, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+
+class TokenVerifier:
+    """Verify Firebase ID tokens locally, following the same rules as
+    `firebase_admin.auth.verify_id_token` without leaving the event loop."""
+
+    def __init__(
+        self,
+        project_id: str,
+        key_store: "PublicKeyStore",
+        cache: "TokenCache",
+        leeway: int = 0,
+    ):
+        self.project_id = project_id
+        self.key_store = key_store
+        self.cache = cache
+        self.leeway = leeway
+
+    async def verify(self, token: str) -> "AuthUser":
+        """Verify a token and return the user it was issued to
+
+        Args:
+            token: Firebase ID token
+        Returns:
+            AuthUser: User the token belongs to
+        Raises:
+            jwt.InvalidTokenError: If the token is not valid
+        """
+        if auth_user := self.cache.get(token):
+            return auth_user
+
+        header = jwt.get_unverified_header(token)
+        if header.get("alg") != ALGORITHM:
+            raise jwt.InvalidAlgorithmError(f"Unexpected algorithm {header.get('alg')}")
+        key = await self.key_store.get(header.get("kid", ""))
+        if key is None:
+            raise jwt.InvalidTokenError("Token was not signed by a known key")
+
+        claims = self._decode(token, key)
+        auth_user = AuthUser(**claims)
+        self.cache.set(token, auth_user, claims["exp"])
+        return auth_user
+
+    def _decode(self, token: str, key: "RSAPublicKey") -> "dict[str, Any]":
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[ALGORITHM],
+            audience=self.project_id,
+            issuer=f"{ISSUER_PREFIX}{self.project_id}",
+            leeway=self.leeway,
+            options={"require": ["exp", "iat", "sub"]},
+        )
+        if not claims["sub"] or len(claims["sub"]) > 128:
+            raise jwt.InvalidTokenError("Invalid subject")
+        if claims.get("auth_time", 0) > time.time() + self.leeway:
+            raise jwt.ImmatureSignatureError("Authentication time is in the future")
+        return claims
+
+
+verifier = TokenVerifier(
+    project_id=settings.FIREBASE_CONFIG.project_id,
+    key_store=PublicKeyStore(settings.FIREBASE_PUBLIC_KEYS_URL),
+    cache=TokenCache(settings.AUTH_TOKEN_CACHE_SIZE),
+)
+
+
+async def warm_up() -> None:
+    """Fetch the Firebase public keys before the first request needs them."""
+    try:
+        await verifier.key_store.refresh()
+    except Exception:
+        logger.warning("Unable to prefetch the Firebase public keys", exc_info=True)
+
+
+async def _authenticate(token: str) -> AuthUser:
+    try:
+        return await verifier.verify(token)
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    except KeysUnavailableError:
+        logger.exception("Unable to verify a token without the Firebase public keys")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+async def get_auth_user(authorization: str = Header(...)) -> AuthUser:
+    """Get the authenticated user from the authorization header
 
     Args:
         authorization: Authorization header
     Returns:
-        dict: Decoded token
+        AuthUser: User the token was issued to
     """
-    token = authorization.replace("Bearer ", "")
-    decoded_token = firebase_auth.verify_id_token(token)
-    return AuthUser(**decoded_token)
+    return await _authenticate(authorization.replace("Bearer ", ""))
+
+
+async def create_stream_ticket(auth_user: AuthUser, ttl: int) -> "tuple[str, int]":
+    """Create a ticket standing for the token of a user, to open a stream with.
+
+    Clients that cannot send headers, e.g. `EventSource`, pass it in the URL
+    instead of the token, so the token never ends up in access logs. It can
+    only be used once, within `ttl` seconds, and never past the token's `exp`.
+
+    Returns:
+        tuple: Ticket, and the seconds it can be redeemed within
+    Raises:
+        OSError, TimeoutError, RedisError: If the cache, where tickets are kept
+            so every process can redeem them, is unavailable
+    """
+    if auth_user.exp is not None:
+        ttl = max(min(ttl, auth_user.exp - int(time.time())), 1)
+    ticket = secrets.token_urlsafe(32)
+    await cache.get_cache().set(
+        f"{STREAM_TICKET_KEY_PREFIX}{ticket}", auth_user.model_dump_json().encode(), ttl
+    )
+    return ticket, ttl
+
+
+async def redeem_stream_ticket(ticket: str) -> "Optional[AuthUser]":
+    """User a ticket was created for, or None if it expired or was redeemed"""
+    content = await cache.get_cache().pop(f"{STREAM_TICKET_KEY_PREFIX}{ticket}")
+    return AuthUser.model_validate_json(content) if content else None
+
+
+async def get_stream_auth_user(
+    authorization: Optional[str] = Header(None),
+    ticket: Optional[str] = Query(
+        None,
+        description="Ticket created with `POST /api/stream/tickets`, for clients "
+        "that cannot send headers, e.g. `EventSource`",
+    ),
+) -> AuthUser:
+    """Get the authenticated user from the authorization header, or else from
+    a stream ticket"""
+    if authorization:
+        return await _authenticate(authorization.replace("Bearer ", ""))
+    if not ticket:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    try:
+        auth_user = await redeem_stream_ticket(ticket)
+    except cache.CACHE_ERRORS:
+        logger.exception("Unable to redeem a stream ticket")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if auth_user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    return auth_user
@@ -1 +1,11 @@
 API_PREFIX = "/api/core"
+EVENTS_STREAM_BATCH_SIZE = 500
+BATCH_MAX_OPERATIONS = 500
+EVENTS_QUEUE_MAX_SIZE = 10_000
+EVENTS_DISPATCH_BATCH_SIZE = 100
+# Number of events replayed past the latest snapshot of an aggregate before a
+# new snapshot is saved
+SNAPSHOT_INTERVAL = 100
+REPLAY_CONCURRENCY = 8
+# Maximum number of events archived to a single segment
+ARCHIVE_SEGMENT_MAX_EVENTS = 10_000
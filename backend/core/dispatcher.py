@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import TYPE_CHECKING
+
+from core import constants
+
+if TYPE_CHECKING:
+    from typing import Any, Awaitable, Callable, Optional
+
+    Subscriber = Callable[[list[dict[str, Any]]], Awaitable[None]]
+    DropSubscriber = Callable[[list[dict[str, Any]]], None]
+
+logger = logging.getLogger(__name__)
+
+
+class EventDispatcher:
+    """Fan committed events out to subscribers (projections, webhooks, cache
+    invalidation...) in batches, in the background.
+
+    Events are only published once their transaction committed, so subscribers
+    never see events that were rolled back. The queue is bounded: when it is
+    full, newly published events are dropped (and counted) instead of growing
+    the memory of the process, and handed to the drop subscribers, so they can
+    tell their consumers that they missed changes.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = constants.EVENTS_QUEUE_MAX_SIZE,
+        batch_size: int = constants.EVENTS_DISPATCH_BATCH_SIZE,
+    ):
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        # `(published_at, event)` pairs, oldest first
+        self._queue: "deque[tuple[float, dict[str, Any]]]" = deque()
+        self._ready = asyncio.Event()
+        self._subscribers: "list[Subscriber]" = []
+        self._drop_subscribers: "list[DropSubscriber]" = []
+        self._task: "Optional[asyncio.Task]" = None
+        self._stopping = False
+        self.published_count = 0
+        self.dispatched_count = 0
+        self.dropped_count = 0
+        self.failed_count = 0
+        self.last_lag = 0.0
+
+    def subscribe(self, subscriber: "Subscriber") -> None:
+        self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: "Subscriber") -> None:
+        self._subscribers.remove(subscriber)
+
+    def subscribe_dropped(self, subscriber: "DropSubscriber") -> None:
+        self._drop_subscribers.append(subscriber)
+
+    def unsubscribe_dropped(self, subscriber: "DropSubscriber") -> None:
+        self._drop_subscribers.remove(subscriber)
+
+    def publish(self, events: "list[dict[str, Any]]") -> None:
+        now = time.monotonic()
+        dropped = []
+        for event in events:
+            if len(self._queue) >= self.max_queue_size:
+                dropped.append(event)
+                continue
+            self._queue.append((now, event))
+            self.published_count += 1
+        if self._queue:
+            self._ready.set()
+        if dropped:
+            self.dropped_count += len(dropped)
+            for subscriber in list(self._drop_subscribers):
+                try:
+                    subscriber(dropped)
+                except Exception:
+                    logger.exception(f"Subscriber {subscriber} failed to handle drops")
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def lag(self) -> float:
+        """Seconds the oldest queued event has been waiting for"""
+        if not self._queue:
+            return 0.0
+        return time.monotonic() - self._queue[0][0]
+
+    async def dispatch(self) -> int:
+        """Hand the next batch of queued events to every subscriber
+
+        Returns:
+            int: Number of dispatched events
+        """
+        self.last_lag = self.lag
+        batch = [
+            self._queue.popleft()[1]
+            for _ in range(min(self.batch_size, len(self._queue)))
+        ]
+        if not batch:
+            return 0
+        for subscriber in list(self._subscribers):
+            try:
+                await subscriber(batch)
+            except Exception:
+                self.failed_count += 1
+                logger.exception(f"Subscriber {subscriber} failed to handle events")
+        self.dispatched_count += len(batch)
+        return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            await self._ready.wait()
+            while self._queue:
+                await self.dispatch()
+            self._ready.clear()
+            if self._stopping:
+                return
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Dispatch the queued events, then stop the background task
+
+        The task is not cancelled, which could lose a batch already taken off
+        the queue but not yet handed to every subscriber: it is asked to stop
+        once the queue is drained, and awaited.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        self._ready.set()
+        task, self._task = self._task, None
+        await task
+
+    def get_metrics(self) -> "dict[str, Any]":
+        return {
+            "queue_depth": self.queue_depth,
+            "lag_seconds": self.lag,
+            "last_dispatch_lag_seconds": self.last_lag,
+            "published": self.published_count,
+            "dispatched": self.dispatched_count,
+            "dropped": self.dropped_count,
+            "failed": self.failed_count,
+        }
+
+
+dispatcher = EventDispatcher()
@@ -9,9 +9,18 @@ class NoteEventType(EventType):
     CREATED = "NOTE_CREATED"
     UPDATED = "NOTE_UPDATED"
     DELETED = "NOTE_DELETED"
+    RESTORED = "NOTE_RESTORED"
 
 
 class FolderEventType(EventType):
     CREATED = "FOLDER_CREATED"
     UPDATED = "FOLDER_UPDATED"
     DELETED = "FOLDER_DELETED"
+    RESTORED = "FOLDER_RESTORED"
+
+
+class BatchOperationStatus(Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    NOT_FOUND = "not_found"
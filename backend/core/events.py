@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from typing import Any
+    from typing import Any, Optional
 
     from bson import ObjectId
 
@@ -14,3 +14,23 @@ class Event:
     aggregate_id: "ObjectId"
     payload: "dict[str, Any]"
     type: "EventType"
+    # Owner of the aggregate, so each user can follow the changes of their own
+    owner_id: "Optional[str]" = None
+
+
+# Fields maintained by the services rather than written by clients
+_SERVICE_FIELDS = {
+    "_id",
+    "created_at",
+    "last_updated_at",
+    "revision",
+    "deleted_at",
+    "image_keys",
+}
+
+
+def get_restored_payload(document: "dict[str, Any]") -> "dict[str, Any]":
+    """Payload of the event restoring a Folder or a Note from the trash: its
+    written fields, like the payload of its creation, since its state was
+    dropped by the deletion"""
+    return {key: value for key, value in document.items() if key not in _SERVICE_FIELDS}
@@ -0,0 +1,94 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from database.indexes import QueryShape
+
+NEWEST_FIRST = (("created_at", DESCENDING), ("_id", DESCENDING))
+
+INDEXES = {
+    "events": [
+        IndexModel(list(NEWEST_FIRST), name="created_at"),
+        IndexModel([("aggregate_id", ASCENDING), *NEWEST_FIRST], name="aggregate_id"),
+        IndexModel([("type", ASCENDING), *NEWEST_FIRST], name="type"),
+        IndexModel([("owner_id", ASCENDING), *NEWEST_FIRST], name="owner_id"),
+        IndexModel(
+            [("owner_id", ASCENDING), ("aggregate_id", ASCENDING), *NEWEST_FIRST],
+            name="owner_id_aggregate_id",
+        ),
+        IndexModel(
+            [("owner_id", ASCENDING), ("type", ASCENDING), *NEWEST_FIRST],
+            name="owner_id_type",
+        ),
+    ],
+    "snapshots": [
+        IndexModel([("aggregate_id", ASCENDING)], name="aggregate_id", unique=True),
+    ],
+    "event_segments": [
+        IndexModel([("last_created_at", DESCENDING)], name="last_created_at"),
+        # Multikey, to find the segments holding the history of an aggregate
+        IndexModel(
+            [("aggregate_ids", ASCENDING), ("last_created_at", DESCENDING)],
+            name="aggregate_ids",
+        ),
+    ],
+}
+
+QUERY_SHAPES = [
+    QueryShape(
+        "events",
+        filter=("owner_id",),
+        sort=NEWEST_FIRST,
+        description="core.services.get_events",
+    ),
+    QueryShape(
+        "events",
+        filter=("owner_id", "aggregate_id"),
+        sort=NEWEST_FIRST,
+        description="core.services.get_events by aggregate",
+    ),
+    QueryShape(
+        "events",
+        filter=("owner_id", "type"),
+        sort=NEWEST_FIRST,
+        description="core.services.get_events by type",
+    ),
+    QueryShape(
+        "events",
+        filter=("aggregate_id",),
+        sort=(("created_at", ASCENDING), ("_id", ASCENDING)),
+        description="core.replay.replay",
+    ),
+    QueryShape(
+        "events",
+        filter=("owner_id",),
+        sort=(("created_at", ASCENDING), ("_id", ASCENDING)),
+        description="sync.services.get_changes",
+    ),
+    QueryShape(
+        "events",
+        filter=("owner_id",),
+        sort=(("created_at", ASCENDING), ("_id", ASCENDING)),
+        description="sync.services.get_events_since",
+    ),
+    QueryShape(
+        "snapshots",
+        filter=("aggregate_id",),
+        description="core.replay.get_snapshot",
+    ),
+    QueryShape(
+        "events",
+        filter=("type",),
+        description="core.archive.archive_events",
+    ),
+    QueryShape(
+        "event_segments",
+        filter=(),
+        sort=(("last_created_at", DESCENDING),),
+        description="core.archive.iter_archived_events",
+    ),
+    QueryShape(
+        "event_segments",
+        filter=("aggregate_ids",),
+        sort=(("last_created_at", DESCENDING),),
+        description="core.archive.iter_archived_events by aggregate",
+    ),
+]
@@ -0,0 +1,113 @@
+import base64
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import pymongo
+from bson import ObjectId, errors, json_util
+from fastapi import HTTPException, Query, status
+
+# Position of a document in a listing: its sort key value and its `_id`
+Cursor = tuple[Any, ObjectId]
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Types of the values listings are sorted by, `None` standing for a missing key
+SORT_VALUE_TYPES = (type(None), str, int, float, datetime)
+
+_JSON_OPTIONS = json_util.JSONOptions(tz_aware=True, tzinfo=timezone.utc)
+
+
+def encode_cursor(sort_value: "Any", _id: "ObjectId") -> str:
+    """Encode the position of a document in a listing as an opaque string
+
+    Args:
+        sort_value: Value of the sort key of the document
+        _id: Id of the document, used as tie-breaker
+    Returns:
+        str: URL safe cursor
+    """
+    raw = json_util.dumps([sort_value, _id], json_options=_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, sort_value_types: "tuple[type, ...]" = SORT_VALUE_TYPES
+) -> "Cursor":
+    """Decode a cursor created by `encode_cursor`
+
+    Args:
+        cursor: Cursor to decode
+        sort_value_types: Types the sort key of the listing can hold. Any other
+            sort value, e.g. a regular expression in a forged cursor, would
+            change the meaning of the `keyset_filter` built from it.
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        sort_value, _id = json_util.loads(
+            base64.urlsafe_b64decode(padded), json_options=_JSON_OPTIONS
+        )
+    except (TypeError, ValueError, OverflowError, errors.BSONError):
+        raise ValueError("Malformed cursor")
+    if (
+        not isinstance(_id, ObjectId)
+        or isinstance(sort_value, bool)
+        or not isinstance(sort_value, sort_value_types)
+    ):
+        raise ValueError("Malformed cursor")
+    return sort_value, _id
+
+
+def get_cursor(
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor returned in the `X-Next-Cursor` header"
+    ),
+) -> "Optional[Cursor]":
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def keyset_sort(
+    sort_key: str, direction: int = pymongo.ASCENDING
+) -> "list[tuple[str, int]]":
+    return [(sort_key, direction), ("_id", direction)]
+
+
+def keyset_filter(
+    sort_key: str, cursor: "Cursor", direction: int = pymongo.ASCENDING
+) -> "dict[str, Any]":
+    """Build the filter matching the documents after `cursor` when sorting by
+    `keyset_sort(sort_key, direction)`.
+
+    Documents without a sort key sort as `null`, which comes first in ascending
+    order and last in descending order.
+    """
+    sort_value, _id = cursor
+    operator = "$gt" if direction == pymongo.ASCENDING else "$lt"
+    tie_breaker = {sort_key: sort_value, "_id": {operator: _id}}
+    if sort_value is None:
+        if direction == pymongo.ASCENDING:
+            return {"$or": [tie_breaker, {sort_key: {"$ne": None}}]}
+        return tie_breaker
+
+    after = [{sort_key: {operator: sort_value}}, tie_breaker]
+    if direction == pymongo.DESCENDING:
+        after.append({sort_key: None})
+    return {"$or": after}
+
+
+def get_next_cursor(
+    documents: "list[dict[str, Any]]", sort_key: str, limit: int
+) -> "Optional[str]":
+    """Cursor of the page after `documents`, if there might be one"""
+    if len(documents) < limit:
+        return None
+    last_document = documents[-1]
+    return encode_cursor(last_document.get(sort_key), last_document["_id"])
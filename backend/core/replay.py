@@ -0,0 +1,190 @@
+import asyncio
+import copy
+from typing import TYPE_CHECKING
+
+from pymongo.errors import DuplicateKeyError
+
+from core import constants, pagination
+from core.enums import FolderEventType, NoteEventType
+from core.services import SORT_KEY
+from core.utils import get_now_utc
+from notes.delta import apply_operations
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Optional
+
+    from database import Client, Session
+
+    State = Optional[dict[str, Any]]
+    Reducer = Callable[[State, dict[str, Any]], State]
+
+
+def _create(state: "State", payload: "dict[str, Any]") -> "State":
+    return copy.deepcopy(payload)
+
+
+def _update(state: "State", payload: "dict[str, Any]") -> "State":
+    if state is None:
+        return None
+    return {**state, **copy.deepcopy(payload)}
+
+
+def _update_note(state: "State", payload: "dict[str, Any]") -> "State":
+    if state is None or "operations" not in payload:
+        return _update(state, payload)
+    # Delta updates carry text operations rather than the new content
+    fields = {key: value for key, value in payload.items() if key != "operations"}
+    return {
+        **_update(state, fields),
+        "content": apply_operations(state.get("content") or "", payload["operations"]),
+    }
+
+
+def _delete(state: "State", payload: "dict[str, Any]") -> "State":
+    return None
+
+
+# Folders and Notes events carry the written fields as payload, except Notes
+# delta updates. Restorations from the trash carry all of them, like creations.
+REDUCERS: "dict[str, Reducer]" = {
+    FolderEventType.CREATED.value: _create,
+    FolderEventType.UPDATED.value: _update,
+    FolderEventType.DELETED.value: _delete,
+    FolderEventType.RESTORED.value: _create,
+    NoteEventType.CREATED.value: _create,
+    NoteEventType.UPDATED.value: _update_note,
+    NoteEventType.DELETED.value: _delete,
+    NoteEventType.RESTORED.value: _create,
+}
+
+
+def apply_event(state: "State", event: "dict[str, Any]") -> "State":
+    """State of an aggregate after an event. Unknown event types are ignored."""
+    reducer = REDUCERS.get(event["type"])
+    if reducer is None:
+        return state
+    return reducer(state, event["payload"])
+
+
+async def get_snapshot(
+    aggregate_id: str, session: "Session"
+) -> "Optional[dict[str, Any]]":
+    return await session.snapshots.find_one(
+        {"aggregate_id": aggregate_id}, session=session
+    )
+
+
+async def save_snapshot(snapshot: "dict[str, Any]", session: "Session") -> None:
+    """Save the snapshot of an aggregate, unless a more recent one exists"""
+    try:
+        await session.snapshots.replace_one(
+            {
+                "aggregate_id": snapshot["aggregate_id"],
+                "version": {"$lt": snapshot["version"]},
+            },
+            snapshot,
+            upsert=True,
+            session=session,
+        )
+    except DuplicateKeyError:
+        # A more recent snapshot was saved concurrently
+        pass
+
+
+async def replay(
+    aggregate_id: str,
+    session: "Session",
+    snapshot_interval: int = constants.SNAPSHOT_INTERVAL,
+) -> "State":
+    """Rebuild the state of a Folder or a Note from its events.
+
+    Replay starts from the latest snapshot of the aggregate and only reads the
+    events after it. A new snapshot is saved once `snapshot_interval` events were
+    replayed past the previous one, so the cost of a replay is bounded by the
+    interval rather than by the length of the history.
+
+    Args:
+        aggregate_id: Id of the Folder or Note
+        session: Database session
+        snapshot_interval: Number of replayed events after which to snapshot
+    Returns:
+        dict: State of the aggregate, or None if it does not exist (anymore)
+    """
+    aggregate_id = str(aggregate_id)
+    state, version = None, 0
+    query = {"aggregate_id": aggregate_id}
+    if snapshot := await get_snapshot(aggregate_id, session):
+        state, version = snapshot["state"], snapshot["version"]
+        query.update(
+            pagination.keyset_filter(
+                SORT_KEY, (snapshot["event_created_at"], snapshot["event_id"])
+            )
+        )
+
+    replayed_count, last_event = 0, None
+    async for event in session.events.find(query, session=session).sort(
+        pagination.keyset_sort(SORT_KEY)
+    ):
+        state = apply_event(state, event)
+        replayed_count += 1
+        last_event = event
+
+    if last_event and replayed_count >= snapshot_interval:
+        await save_snapshot(
+            {
+                "aggregate_id": aggregate_id,
+                "version": version + replayed_count,
+                "state": state,
+                "event_created_at": last_event[SORT_KEY],
+                "event_id": last_event["_id"],
+                "created_at": get_now_utc(),
+            },
+            session,
+        )
+    return state
+
+
+async def rebuild_all(
+    client: "Client",
+    concurrency: int = constants.REPLAY_CONCURRENCY,
+    snapshot_interval: int = 1,
+) -> int:
+    """Replay every aggregate of the event log, `concurrency` at a time, and
+    snapshot those with new events.
+
+    Each aggregate is replayed in its own session, since a session cannot be
+    used by concurrent operations. At most `concurrency` aggregates are in
+    flight, so memory does not grow with the size of the store.
+
+    Returns:
+        int: Number of replayed aggregates
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: "set[asyncio.Task]" = set()
+    errors: "list[BaseException]" = []
+
+    async def rebuild(aggregate_id: str) -> None:
+        try:
+            async with await client.start_session() as session:
+                await replay(aggregate_id, session, snapshot_interval)
+        finally:
+            semaphore.release()
+
+    def on_done(task: "asyncio.Task") -> None:
+        tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            errors.append(task.exception())
+
+    aggregate_count = 0
+    async for group in client.db.events.aggregate(
+        [{"$group": {"_id": "$aggregate_id"}}]
+    ):
+        await semaphore.acquire()
+        task = asyncio.create_task(rebuild(group["_id"]))
+        tasks.add(task)
+        task.add_done_callback(on_done)
+        aggregate_count += 1
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if errors:
+        raise errors[0]
+    return aggregate_count
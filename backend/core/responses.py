@@ -0,0 +1,33 @@
+from typing import TYPE_CHECKING
+
+from fastapi import Response
+
+if TYPE_CHECKING:
+    from typing import Any, Mapping, Optional
+
+    from pydantic import TypeAdapter
+
+
+class ModelResponse(Response):
+    """JSON response of content validated by a `TypeAdapter`, then serialized by
+    it straight to bytes, ObjectIds and datetimes included.
+
+    FastAPI does not validate the responses routes return, so routes returning
+    one still declare their `response_model`, for the docs, without validating
+    their content twice, nor encoding it with `jsonable_encoder` and `json`.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: "Any",
+        adapter: "TypeAdapter",
+        status_code: int = 200,
+        headers: "Optional[Mapping[str, str]]" = None,
+    ):
+        self.adapter = adapter
+        super().__init__(content, status_code, headers)
+
+    def render(self, content: "Any") -> bytes:
+        return self.adapter.dump_json(self.adapter.validate_python(content))
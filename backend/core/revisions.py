@@ -0,0 +1,87 @@
+import hashlib
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import Header, HTTPException, Response, status
+
+if TYPE_CHECKING:
+    from typing import Any
+
+ETAG_HEADER = "ETag"
+
+
+class RevisionConflictError(Exception):
+    """The document was updated since the revision a change was based on"""
+
+    def __init__(self, revision: "Optional[int]" = None):
+        super().__init__(
+            "Revision conflict"
+            if revision is None
+            else f"Document is at revision {revision}"
+        )
+        self.revision = revision
+
+
+def get_revision_query(revision: int) -> "dict[str, Any]":
+    """Filter matching a document only if it is at the given revision"""
+    # Documents created before revisions were introduced are at revision 0
+    if revision == 0:
+        return {"revision": {"$in": [0, None]}}
+    return {"revision": revision}
+
+
+def get_etag(document: "dict[str, Any]") -> str:
+    """Strong ETag of a Folder or a Note, which changes with its revision"""
+    return f'"{document.get("revision", 0)}"'
+
+
+def get_list_etag(documents: "list[dict[str, Any]]", variant: str = "") -> str:
+    """Weak ETag of a page of Folders or Notes, which changes when any of them is
+    added, removed or updated. Each `variant` of a page, e.g. a view of it, has
+    its own ETag."""
+    digest = hashlib.sha1(usedforsecurity=False)
+    digest.update(f"{variant};".encode() if variant else b"")
+    for document in documents:
+        digest.update(f"{document['_id']}:{document.get('revision', 0)};".encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def matches(if_none_match: "Optional[str]", etag: str) -> bool:
+    """Whether an `If-None-Match` header matches an ETag, using the weak
+    comparison of RFC 9110"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag.removeprefix("W/")
+        for candidate in if_none_match.split(",")
+    )
+
+
+def get_if_match_revision(
+    if_match: Optional[str] = Header(
+        None, description="ETag of the revision the update is based on"
+    ),
+) -> "Optional[int]":
+    """Revision required by the `If-Match` header, or None if any revision is"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    etag = if_match.strip()
+    if etag.startswith('"') and etag.endswith('"') and etag[1:-1].isdigit():
+        return int(etag[1:-1])
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid If-Match header"
+    )
+
+
+def get_not_modified_response(
+    response: "Response", etag: str, if_none_match: "Optional[str]"
+) -> "Optional[Response]":
+    """Set the ETag of a response, and return a `304 Not Modified` response to
+    send instead if the client already has this version"""
+    if matches(if_none_match, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={ETAG_HEADER: etag}
+        )
+    response.headers[ETAG_HEADER] = etag
+    return None
@@ -1,18 +1,110 @@
 from typing import TYPE_CHECKING
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 
-from core import constants, schemas, services
-from database import get_session
+import cache
+from core import archive, constants, pagination, schemas, services
+from core.auth import get_auth_user
+from core.dispatcher import dispatcher
+from core.responses import ModelResponse
+from database import get_secondary_session
+from database.monitoring import pool_metrics
 
 if TYPE_CHECKING:
+    from typing import AsyncIterator, Optional
+
+    from core.auth import AuthUser
     from database import Session
 
 router = APIRouter(prefix=constants.API_PREFIX)
 
+EVENTS = TypeAdapter(list[schemas.EventRetrieve])
+EVENT = TypeAdapter(schemas.EventRetrieve)
+
 
-@router.get("/events", response_model=list[schemas.EventRetrieve])
+@router.get(
+    "/events",
+    description="Retrieve the Events of the user, newest first, given filters, "
+    "limit and cursor",
+    response_model=list[schemas.EventRetrieve],
+)
 async def get_events(
-    session: "Session" = Depends(get_session),
+    response: Response,
+    filters: "schemas.EventFilters" = Depends(),
+    limit: int = Query(20, ge=1),
+    cursor: "Optional[pagination.Cursor]" = Depends(pagination.get_cursor),
+    session: "Session" = Depends(get_secondary_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
 ) -> list["schemas.EventRetrieve"]:
-    return await services.get_events(session)
+    events = await services.get_events(
+        session, limit, cursor, owner_id=auth_user.user_id, **filters.model_dump()
+    )
+    if next_cursor := pagination.get_next_cursor(events, services.SORT_KEY, limit):
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return ModelResponse(events, EVENTS, headers=response.headers)
+
+
+@router.get(
+    "/events/stream",
+    description="Stream all Events of the user matching the filters, newest first, "
+    "as NDJSON",
+    response_class=StreamingResponse,
+)
+async def stream_events(
+    filters: "schemas.EventFilters" = Depends(),
+    session: "Session" = Depends(get_secondary_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "StreamingResponse":
+    async def serialize() -> "AsyncIterator[bytes]":
+        async for batch in services.iter_events(
+            session,
+            constants.EVENTS_STREAM_BATCH_SIZE,
+            owner_id=auth_user.user_id,
+            **filters.model_dump(),
+        ):
+            yield b"".join(
+                EVENT.dump_json(event) + b"\n"
+                for event in EVENTS.validate_python(batch)
+            )
+
+    return StreamingResponse(serialize(), media_type="application/x-ndjson")
+
+
+@router.get(
+    "/events/archive",
+    description="Stream the archived Events of the user matching the filters, "
+    "newest first, as NDJSON",
+    response_class=StreamingResponse,
+)
+async def stream_archived_events(
+    filters: "schemas.EventFilters" = Depends(),
+    session: "Session" = Depends(get_secondary_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "StreamingResponse":
+    async def serialize() -> "AsyncIterator[bytes]":
+        async for batch in archive.iter_archived_events(
+            session, owner_id=auth_user.user_id, **filters.model_dump()
+        ):
+            yield b"".join(
+                EVENT.dump_json(event) + b"\n"
+                for event in EVENTS.validate_python(batch)
+            )
+
+    return StreamingResponse(serialize(), media_type="application/x-ndjson")
+
+
+@router.get(
+    "/metrics",
+    description="Retrieve the depth, lag and counters of the Event dispatcher, the "
+    "counters of the cache, and those of the database connection pool",
+    response_model=schemas.Metrics,
+    dependencies=[Depends(get_auth_user)],
+)
+async def get_metrics() -> "schemas.Metrics":
+    return {
+        "events": dispatcher.get_metrics(),
+        "cache": await cache.get_cache().get_metrics(),
+        "database_pool": pool_metrics.get_metrics(),
+    }
@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic import AwareDatetime, BaseModel, BeforeValidator, ConfigDict, Field
 from pydantic.types import Annotated
 
@@ -17,3 +19,81 @@ class EventRetrieve(BaseModel):
     created_at: AwareDatetime = Field(examples=["2022-01-01T00:00:00Z"])
 
     model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class EventFilters(BaseModel):
+    aggregate_id: Optional[str] = Field(
+        default=None, examples=["3g690d0c-23e01-54e4-8c36-abad040a0a0c"]
+    )
+    type: Optional[str] = Field(default=None, examples=["NOTE_CREATED"])
+    created_after: Optional[AwareDatetime] = Field(
+        default=None, examples=["2022-01-01T00:00:00Z"]
+    )
+    created_before: Optional[AwareDatetime] = Field(
+        default=None, examples=["2022-02-01T00:00:00Z"]
+    )
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class BatchOperationResult(BaseModel):
+    index: int = Field(examples=[0])
+    op: Literal["create", "update", "delete"] = Field(examples=["create"])
+    id: Optional[StrObjectId] = Field(
+        default=None, examples=["db490d0c-8e01-4ee4-8c36-abad040a0a0c"]
+    )
+    status: str = Field(examples=["created"])
+    job_id: Optional[StrObjectId] = Field(
+        default=None,
+        description="Job finishing the operation in the background, if any",
+        examples=[None],
+    )
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class BatchResult(BaseModel):
+    results: list[BatchOperationResult]
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class EventDispatcherMetrics(BaseModel):
+    queue_depth: int = Field(examples=[12])
+    lag_seconds: float = Field(examples=[0.05])
+    last_dispatch_lag_seconds: float = Field(examples=[0.01])
+    published: int = Field(examples=[1200])
+    dispatched: int = Field(examples=[1188])
+    dropped: int = Field(examples=[0])
+    failed: int = Field(examples=[0])
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class CacheMetrics(BaseModel):
+    hits: int = Field(examples=[950])
+    misses: int = Field(examples=[50])
+    evictions: int = Field(examples=[0])
+    hit_ratio: float = Field(examples=[0.95])
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class DatabasePoolMetrics(BaseModel):
+    connections: int = Field(examples=[12])
+    in_use: int = Field(examples=[3])
+    waiting: int = Field(examples=[0])
+    checkouts: int = Field(examples=[5400])
+    failed_checkouts: int = Field(examples=[0])
+    average_wait_seconds: float = Field(examples=[0.0002])
+    max_wait_seconds: float = Field(examples=[0.05])
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class Metrics(BaseModel):
+    events: EventDispatcherMetrics
+    cache: CacheMetrics
+    database_pool: DatabasePoolMetrics
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
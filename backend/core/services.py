@@ -1,23 +1,155 @@
 from typing import TYPE_CHECKING
 
+import pymongo
+
+import cache
+from core import pagination
+from core.dispatcher import dispatcher
 from core.utils import get_now_utc
 
 if TYPE_CHECKING:
+    from datetime import datetime
+    from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
     from events import Event
 
     from database import Session
 
+    T = TypeVar("T")
 
-async def get_events(session: "Session") -> "list[Event]":
-    return await session.events.find().sort("created_at", -1).to_list()
+SORT_KEY = "created_at"
 
 
-async def create_event(event: "Event", session: "Session") -> None:
-    await session.events.insert_one(
-        {
-            "aggregate_id": str(event.aggregate_id),
-            "type": event.type.value,
-            "payload": event.payload,
-            "created_at": get_now_utc(),
+def _get_events_query(
+    owner_id: "Optional[str]" = None,
+    aggregate_id: "Optional[str]" = None,
+    type: "Optional[str]" = None,
+    created_after: "Optional[datetime]" = None,
+    created_before: "Optional[datetime]" = None,
+) -> "dict[str, Any]":
+    query = {}
+    if owner_id:
+        query["owner_id"] = owner_id
+    if aggregate_id:
+        query["aggregate_id"] = aggregate_id
+    if type:
+        query["type"] = type
+    if created_after or created_before:
+        query[SORT_KEY] = {}
+        if created_after:
+            query[SORT_KEY]["$gte"] = created_after
+        if created_before:
+            query[SORT_KEY]["$lt"] = created_before
+    return query
+
+
+async def get_events(
+    session: "Session",
+    limit: int = 20,
+    cursor: "Optional[pagination.Cursor]" = None,
+    **filters: "Any",
+) -> "list[Event]":
+    """Get a page of events, newest first
+
+    Args:
+        session: Database session
+        limit: Maximum number of events
+        cursor: Position of the last event of the previous page
+        filters: `owner_id`, `aggregate_id`, `type`, `created_after` and
+            `created_before`
+    """
+    query = _get_events_query(**filters)
+    if cursor:
+        query = {
+            "$and": [
+                query,
+                pagination.keyset_filter(SORT_KEY, cursor, pymongo.DESCENDING),
+            ]
         }
+    return (
+        await session.events.find(query)
+        .sort(pagination.keyset_sort(SORT_KEY, pymongo.DESCENDING))
+        .limit(limit)
+        .to_list()
     )
+
+
+async def iter_events(
+    session: "Session", batch_size: int, **filters: "Any"
+) -> "AsyncIterator[list[Event]]":
+    """Iterate over all events matching the filters, newest first, in batches of
+    at most `batch_size` events. Only one batch is held in memory at a time."""
+    cursor = (
+        session.events.find(_get_events_query(**filters))
+        .sort(pagination.keyset_sort(SORT_KEY, pymongo.DESCENDING))
+        .batch_size(batch_size)
+    )
+    batch = []
+    async for event in cursor:
+        batch.append(event)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _get_event_document(event: "Event") -> "dict[str, Any]":
+    document = {
+        "aggregate_id": str(event.aggregate_id),
+        "type": event.type.value,
+        "payload": event.payload,
+        "created_at": get_now_utc(),
+    }
+    if event.owner_id is not None:
+        document["owner_id"] = event.owner_id
+    return document
+
+
+async def create_event(event: "Event", session: "Session") -> None:
+    await create_events([event], session)
+
+
+async def create_events(events: "list[Event]", session: "Session") -> None:
+    """Write events, published to the dispatcher once written.
+
+    Within `with_transaction`, they are buffered in the session's outbox instead,
+    to be written along with the other events of the transaction, and published
+    once it committed."""
+    documents = [_get_event_document(event) for event in events]
+    if session.outbox is not None:
+        session.outbox.extend(documents)
+    elif documents:
+        await session.events.insert_many(documents, session=session)
+        await cache.invalidate(documents)
+        dispatcher.publish(documents)
+
+
+async def with_transaction(
+    session: "Session", callback: "Callable[[Session], Awaitable[T]]"
+) -> "T":
+    """Run `callback` in a transaction, like `session.with_transaction`, with a
+    transactional outbox for the events it creates.
+
+    The events are written with a single insert at the end of the transaction,
+    so they are committed (or rolled back) along with the changes they describe,
+    and are published to the dispatcher, and invalidate the cache, only once the
+    transaction committed.
+    """
+
+    async def run(s: "Session") -> "tuple[T, list[dict[str, Any]]]":
+        # The callback may be retried, so each attempt starts with an empty outbox
+        s.outbox = []
+        try:
+            result = await callback(s)
+            events = s.outbox
+        finally:
+            s.outbox = None
+        if events:
+            await s.events.insert_many(events, session=s)
+        return result, events
+
+    result, events = await session.with_transaction(run)
+    await cache.invalidate(events)
+    dispatcher.publish(events)
+    return result
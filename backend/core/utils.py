@@ -1,5 +1,19 @@
 from datetime import datetime, timezone
+from importlib import import_module
 
 
 def get_now_utc() -> "datetime":
     return datetime.now(timezone.utc)
+
+
+def truncate_to_milliseconds(value: "datetime") -> "datetime":
+    """Truncate a datetime to the millisecond precision of BSON dates, so it is
+    equal to its stored value"""
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def import_string(dotted_path: str):
+    """Object at a dotted path, e.g. a backend class named by a setting"""
+    module_path, _, attr = dotted_path.rpartition(".")
+    module = import_module(module_path)
+    return getattr(module, attr)
@@ -2,26 +2,77 @@ from typing import TYPE_CHECKING
 
 from motor import motor_asyncio
 from pymongo.driver_info import DriverInfo
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import (
+    ReadPreference,
+    make_read_preference,
+    read_pref_mode_from_name,
+)
 
 from __version__ import __version__
+from database.monitoring import pool_metrics
 from settings import settings
 
 if TYPE_CHECKING:
-    from typing import AsyncGenerator, Optional
+    from typing import Any, AsyncGenerator, Optional
 
     from motor.core import TransactionOptions
+    from pymongo.client_session import ClientSession
+    from pymongo.read_preferences import _ServerMode
 
 
 class Session(motor_asyncio.AsyncIOMotorClientSession):
     events: "motor_asyncio.AsyncIOMotorCollection"
     notes: "motor_asyncio.AsyncIOMotorCollection"
     folders: "motor_asyncio.AsyncIOMotorCollection"
+    snapshots: "motor_asyncio.AsyncIOMotorCollection"
+    jobs: "motor_asyncio.AsyncIOMotorCollection"
+    event_segments: "motor_asyncio.AsyncIOMotorCollection"
+    uploads: "motor_asyncio.AsyncIOMotorCollection"
+    # Events buffered by the transaction in progress, see `core.services`
+    outbox: "Optional[list[dict[str, Any]]]"
+    # Whether its reads may go to secondaries, and lag behind writes
+    stale_reads: bool
+
+
+COLLECTION_NAMES = (
+    "events",
+    "notes",
+    "folders",
+    "snapshots",
+    "jobs",
+    "event_segments",
+    "uploads",
+)
 
 
 class Client(motor_asyncio.AsyncIOMotorClient):
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        secondary_read_preference: "_ServerMode" = ReadPreference.PRIMARY,
+        secondary_read_concern: "Optional[ReadConcern]" = None,
+        **kwargs,
+    ):
+        """
+        Args:
+            secondary_read_preference: Read preference of the sessions of the
+                reads tolerating to lag behind writes, see `get_secondary_session`
+            secondary_read_concern: Read concern of those sessions, that of the
+                client by default
+        """
         super().__init__(*args, **kwargs)
         self.db = self.get_database()
+        # Collection handles are created once, and shared by every Session
+        self.collections = {name: self.db[name] for name in COLLECTION_NAMES}
+        self.secondary_reads = secondary_read_preference != ReadPreference.PRIMARY
+        self.secondary_collections = {
+            name: collection.with_options(
+                read_preference=secondary_read_preference,
+                read_concern=secondary_read_concern,
+            )
+            for name, collection in self.collections.items()
+        }
 
     async def start_session(
         self,
@@ -32,30 +83,124 @@ class Client(motor_asyncio.AsyncIOMotorClient):
         session = await super().start_session(
             causal_consistency, default_transaction_options, snapshot
         )
-        await self._add_collection_attrs_to_session(session)
+        self._add_collection_attrs_to_session(session)
+        session.outbox = None
         return session
 
-    async def _add_collection_attrs_to_session(self, session: "Session"):
+    def _add_collection_attrs_to_session(
+        self, session: "Session", secondary: bool = False
+    ):
         """Since all Collections are in a single Database,
         dynamically add attributes to each Session object for each Collection.
 
         Instead of doing `session.client.database_name.collection_name`,
         do `session.collection_name` for simplicity."""
-        session.events = self.db.events
-        session.notes = self.db.notes
-        session.folders = self.db.folders
+        vars(session).update(
+            self.secondary_collections if secondary else self.collections
+        )
+        session.stale_reads = secondary and self.secondary_reads
+
+
+class LazyMotorClientSession(Session):
+    """Session only started on first use, i.e. when an operation or a transaction
+    needs it, so requests that never reach the database do not pay for it.
+
+    Without `explicit`, it is never started: operations run in the implicit
+    sessions of the driver, and transactions are not supported, which is all
+    read-only requests need. With `secondary`, its reads follow the secondary
+    read preference of the client.
+
+    Motor only unwraps the sessions passed to operations when the name of their
+    class ends with `MotorClientSession`.
+    """
+
+    def __init__(
+        self, motor_client: "Client", explicit: bool = True, secondary: bool = False
+    ):
+        self._client = motor_client
+        self._delegate: "Optional[ClientSession]" = None
+        self.explicit = explicit
+        motor_client._add_collection_attrs_to_session(self, secondary)
+        self.outbox = None
+
+    @property
+    def delegate(self) -> "Optional[ClientSession]":
+        # Starting a driver session is synchronous and does no I/O, its server
+        # session is only checked out of the pool by its first operation
+        if self._delegate is None and self.explicit:
+            self._delegate = self._client.delegate.start_session()
+        return self._delegate
+
+    @property
+    def started(self) -> bool:
+        return self._delegate is not None
+
+    def start_transaction(self, *args, **kwargs):
+        if not self.explicit:
+            raise RuntimeError("Transactions need an explicit session")
+        return super().start_transaction(*args, **kwargs)
+
+    async def end_session(self) -> None:
+        if self._delegate is None:
+            return
+        if self._delegate.in_transaction:
+            # Aborting the transaction is a round trip to the server
+            await super().end_session()
+        else:
+            self._delegate.end_session()
+
+
+def get_read_preference(name: str, max_staleness_seconds: int = -1) -> "_ServerMode":
+    """Read preference given its name, e.g. `secondaryPreferred`
+
+    Args:
+        name: Name of the read preference mode
+        max_staleness_seconds: Maximum replication lag of the secondaries to read
+            from, -1 for no maximum. Must be -1 for `primary`.
+    """
+    return make_read_preference(
+        read_pref_mode_from_name(name), None, max_staleness_seconds
+    )
 
 
 client = Client(
     host=settings.MONGODB_CONNECTION_STRING,
     driver=DriverInfo(name=settings.ROOT_DIR_NAME, version=__version__),
     tz_aware=True,
+    maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+    minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+    waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+    compressors=settings.MONGODB_COMPRESSORS,
+    event_listeners=[pool_metrics],
+    secondary_read_preference=get_read_preference(
+        settings.MONGODB_SECONDARY_READ_PREFERENCE,
+        settings.MONGODB_SECONDARY_MAX_STALENESS_SECONDS,
+    ),
+    secondary_read_concern=(
+        ReadConcern(settings.MONGODB_SECONDARY_READ_CONCERN)
+        if settings.MONGODB_SECONDARY_READ_CONCERN
+        else None
+    ),
 )
 
 
 async def get_session() -> "AsyncGenerator[Session, None]":
-    async with await client.start_session() as session:
+    session = LazyMotorClientSession(client)
+    try:
         yield session
+    finally:
+        await session.end_session()
+
+
+async def get_read_session() -> "Session":
+    """Session of read-only requests, which do not need an explicit session"""
+    return LazyMotorClientSession(client, explicit=False)
+
+
+async def get_secondary_session() -> "Session":
+    """Session of read-only requests tolerating to lag behind writes, e.g.
+    listings, whose reads may go to secondaries to offload the primary"""
+    return LazyMotorClientSession(client, explicit=False, secondary=True)
 
 
 async def check_connection():
@@ -70,4 +215,11 @@ def get_client() -> Client:
     return client
 
 
-__all__ = ["get_client", "get_session", "check_connection", "close_connection"]
+__all__ = [
+    "get_client",
+    "get_read_session",
+    "get_secondary_session",
+    "get_session",
+    "check_connection",
+    "close_connection",
+]
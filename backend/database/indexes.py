@@ -0,0 +1,138 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Iterable
+
+    from motor.motor_asyncio import AsyncIOMotorDatabase
+    from pymongo import IndexModel
+
+    IndexKeys = list[tuple[str, Any]]
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    """Filter and sort of a query issued by the services.
+
+    Only the fields matter, not their values: `filter` holds the fields matched
+    by equality and `sort` the `(field, direction)` pairs the results are
+    sorted by. `text` marks `$text` queries, which only a text index serves.
+    """
+
+    collection: str
+    filter: "tuple[str, ...]"
+    sort: "tuple[tuple[str, int], ...]" = ()
+    description: str = ""
+    text: bool = False
+
+    def __str__(self) -> str:
+        return (
+            f"{self.description or self.collection}: "
+            f"filter={list(self.filter)} sort={list(self.sort)}"
+        )
+
+
+def _is_text_key(field: str, direction: "Any") -> bool:
+    # The server reports the fields of a text index as `_fts` and `_ftsx`
+    return direction == "text" or field in ("_fts", "_ftsx")
+
+
+def supports(keys: "IndexKeys", shape: "QueryShape") -> bool:
+    """Whether an index with the given keys can serve a query shape without a
+    collection scan or an in-memory sort.
+
+    Args:
+        keys: `(field, direction)` pairs of the index
+        shape: Query shape to check
+    Returns:
+        bool: True if the equality fields are a prefix of the index, followed
+        by the sort fields in the same (or the exact reverse) order
+    """
+    text_keys = [key for key in keys if _is_text_key(*key)]
+    if shape.text:
+        # The equality fields must be the prefix before the text keys
+        prefix = keys[: keys.index(text_keys[0])] if text_keys else None
+        return prefix is not None and {field for field, _ in prefix} == set(
+            shape.filter
+        )
+    if text_keys:
+        return False
+
+    if "_id" in shape.filter and not shape.sort:
+        # Point lookups are served by the default `_id` index
+        return True
+
+    equality_count = len(shape.filter)
+    if {field for field, _ in keys[:equality_count]} != set(shape.filter):
+        return False
+
+    sort_keys = keys[equality_count : equality_count + len(shape.sort)]
+    if len(sort_keys) < len(shape.sort) or any(
+        field != sort_field
+        for (field, _), (sort_field, _) in zip(sort_keys, shape.sort)
+    ):
+        return False
+
+    directions = [direction for _, direction in sort_keys]
+    sort_directions = [direction for _, direction in shape.sort]
+    return directions == sort_directions or directions == [
+        -direction for direction in sort_directions
+    ]
+
+
+def find_unsupported_query_shapes(
+    indexes: "dict[str, list[IndexKeys]]", shapes: "Iterable[QueryShape]"
+) -> "list[QueryShape]":
+    """Query shapes that none of the indexes of their collection support
+
+    Args:
+        indexes: Keys of the existing indexes, by collection name
+        shapes: Query shapes issued by the services
+    """
+    return [
+        shape
+        for shape in shapes
+        if not any(supports(keys, shape) for keys in indexes.get(shape.collection, []))
+    ]
+
+
+def get_registry_keys(
+    registry: "dict[str, list[IndexModel]]",
+) -> "dict[str, list[IndexKeys]]":
+    return {
+        collection: [list(model.document["key"].items()) for model in models]
+        for collection, models in registry.items()
+    }
+
+
+async def get_existing_keys(
+    db: "AsyncIOMotorDatabase", collections: "Iterable[str]"
+) -> "dict[str, list[IndexKeys]]":
+    indexes = {}
+    for collection in collections:
+        information = await db[collection].index_information()
+        indexes[collection] = [list(index["key"]) for index in information.values()]
+    return indexes
+
+
+async def apply_indexes(
+    db: "AsyncIOMotorDatabase", registry: "dict[str, list[IndexModel]]"
+) -> None:
+    """Create the indexes of a registry. Indexes that already exist with the same
+    keys and options are left untouched, so this is safe to run on every start."""
+    for collection, models in registry.items():
+        await db[collection].create_indexes(models)
+
+
+async def drop_indexes(
+    db: "AsyncIOMotorDatabase", names: "dict[str, list[str]]"
+) -> None:
+    """Drop the indexes with the given names, by collection name, if they exist.
+    Indexes are renamed when their options change, since an index cannot be
+    created with the same name and other options, and the old ones dropped
+    before the new ones are created."""
+    for collection, index_names in names.items():
+        information = await db[collection].index_information()
+        for name in index_names:
+            if name in information:
+                await db[collection].drop_index(name)
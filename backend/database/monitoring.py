@@ -0,0 +1,95 @@
+import threading
+from typing import TYPE_CHECKING
+
+from pymongo import monitoring
+
+if TYPE_CHECKING:
+    from typing import Any
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool counters of the client, summed over its servers, to size
+    `MONGODB_MAX_POOL_SIZE` per worker: checkouts waiting for a connection for
+    long, or failing, mean the pool is too small for the load.
+
+    Events are published by the threads of the driver, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.failed_checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def get_metrics(self) -> "dict[str, Any]":
+        with self._lock:
+            return {
+                "connections": self.connections,
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "failed_checkouts": self.failed_checkouts,
+                "average_wait_seconds": (
+                    self.wait_seconds / self.checkouts if self.checkouts else 0.0
+                ),
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+    def connection_created(self, event: "monitoring.ConnectionCreatedEvent") -> None:
+        with self._lock:
+            self.connections += 1
+
+    def connection_closed(self, event: "monitoring.ConnectionClosedEvent") -> None:
+        with self._lock:
+            self.connections -= 1
+
+    def connection_check_out_started(
+        self, event: "monitoring.ConnectionCheckOutStartedEvent"
+    ) -> None:
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(
+        self, event: "monitoring.ConnectionCheckedOutEvent"
+    ) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.in_use += 1
+            self.checkouts += 1
+            self.wait_seconds += event.duration or 0.0
+            self.max_wait_seconds = max(self.max_wait_seconds, event.duration or 0.0)
+
+    def connection_check_out_failed(
+        self, event: "monitoring.ConnectionCheckOutFailedEvent"
+    ) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.failed_checkouts += 1
+
+    def connection_checked_in(
+        self, event: "monitoring.ConnectionCheckedInEvent"
+    ) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def pool_created(self, event: "monitoring.PoolCreatedEvent") -> None:
+        pass
+
+    def pool_ready(self, event: "monitoring.PoolReadyEvent") -> None:
+        pass
+
+    def pool_cleared(self, event: "monitoring.PoolClearedEvent") -> None:
+        pass
+
+    def pool_closed(self, event: "monitoring.PoolClosedEvent") -> None:
+        pass
+
+    def connection_ready(self, event: "monitoring.ConnectionReadyEvent") -> None:
+        pass
+
+
+pool_metrics = PoolMetrics()
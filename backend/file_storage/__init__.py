@@ -0,0 +1,84 @@
+from typing import TYPE_CHECKING
+
+from core.utils import import_string
+from file_storage import images
+from file_storage.base import StorageBackend
+from file_storage.filesystem import FileSystemStorage
+from file_storage.memory import MemoryStorage
+from file_storage.s3 import S3Storage
+from settings import settings
+
+if TYPE_CHECKING:
+    from typing import Any, Optional
+
+    from fastapi import File
+
+_storage: "Optional[StorageBackend]" = None
+
+
+def init() -> "StorageBackend":
+    """Resolve the storage backend configured by `FILE_STORAGE_BACKEND`. Called
+    once at startup, so requests do not pay for the lookup."""
+    global _storage
+    _storage = import_string(settings.FILE_STORAGE_BACKEND).from_settings(settings)
+    return _storage
+
+
+def get_storage() -> "StorageBackend":
+    return _storage or init()
+
+
+async def close() -> None:
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
+
+
+async def upload(_file: "File") -> str:
+    storage = get_storage()
+    return storage.get_url(await storage.upload(_file))
+
+
+async def upload_image(_file: "File") -> "dict[str, Any]":
+    """Store an image along with its thumbnail and responsive variants
+
+    Returns:
+        dict: `key` of the original image and its URL as `path`, the URL of its
+        `thumbnail`, and the `srcset` of the variants of each format as
+        `sources`, most compact first
+    """
+    storage = get_storage()
+    key = await storage.upload(_file)
+    await _file.seek(0)
+    variants = await images.create_variants(storage, key, await _file.read())
+
+    thumbnail, sources = None, {}
+    for variant in variants:
+        url = storage.get_url(variant["key"])
+        if variant["key"].endswith(f"/thumbnail.{variant['format']}"):
+            thumbnail = thumbnail or url
+            continue
+        sources.setdefault(variant["format"], []).append(f"{url} {variant['width']}w")
+    return {
+        "key": key,
+        "path": storage.get_url(key),
+        "thumbnail": thumbnail,
+        "sources": [
+            {"type": f"image/{image_format}", "srcset": ", ".join(srcset)}
+            for image_format, srcset in sources.items()
+        ],
+    }
+
+
+__all__ = [
+    "FileSystemStorage",
+    "MemoryStorage",
+    "S3Storage",
+    "StorageBackend",
+    "close",
+    "get_storage",
+    "init",
+    "upload",
+    "upload_image",
+]
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import AsyncIterator, Optional
+
+    from fastapi import UploadFile
+
+    from settings import Settings
+
+# Uploads are read and hashed 1 MiB at a time
+CHUNK_SIZE = 1024 * 1024
+BLOBS_DIR_NAME = "blobs"
+# Files derived from a blob, e.g. image thumbnails, stored by the blob's hash
+VARIANTS_DIR_NAME = "variants"
+# Files stored by the backend itself, e.g. archived events, never served
+PRIVATE_DIR_NAME = "private"
+
+_EXTENSION = re.compile(r"\.[a-z0-9]{1,10}")
+_BLOB_KEY = re.compile(
+    rf"{BLOBS_DIR_NAME}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(?:\.[a-z0-9]{{1,10}})?"
+)
+
+
+def get_extension(filename: "Optional[str]") -> str:
+    """Lowercased extension of a filename, or "" if it has no sensible one"""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return extension if _EXTENSION.fullmatch(extension) else ""
+
+
+def get_digest(key: str) -> str:
+    """SHA-256 of the content of the blob with the given key"""
+    return os.path.splitext(os.path.basename(key))[0]
+
+
+def get_blob_key(digest: str, extension: str) -> str:
+    """Key of a blob given the SHA-256 of its content. Blobs are spread over two
+    levels of prefixes, so no directory holds too many files."""
+    return f"{BLOBS_DIR_NAME}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def find_blob_keys(text: "Optional[str]") -> "list[str]":
+    """Keys of the blobs a text links to, e.g. the images of a note, sorted"""
+    return sorted(set(_BLOB_KEY.findall(text or "")))
+
+
+def get_content_etag(key: str) -> "Optional[str]":
+    """Strong ETag of a content-addressed file, a blob or a variant of one, which
+    never changes. None for other files."""
+    parts = key.split("/")
+    if parts[0] == BLOBS_DIR_NAME and len(parts) == 4:
+        return f'"{get_digest(key)}"'
+    if parts[0] == VARIANTS_DIR_NAME and len(parts) == 5:
+        return f'"{parts[3]}-{parts[4]}"'
+    return None
+
+
+async def hash_file(_file: "UploadFile") -> str:
+    """SHA-256 of the content of a file, read from its current position"""
+    digest = hashlib.sha256()
+    while chunk := await _file.read(CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class StorageBackend(ABC):
+    """Where uploaded files are stored.
+
+    Files are stored by the hash of their content (see `get_blob_key`), so
+    identical files are only stored once and a key always refers to the same
+    content.
+    """
+
+    @classmethod
+    @abstractmethod
+    def from_settings(cls, settings: "Settings") -> "StorageBackend": ...
+
+    @abstractmethod
+    async def upload(self, _file: "UploadFile") -> str:
+        """Store a file, unless the same content is already stored
+
+        Returns:
+            str: Key of the stored file
+        """
+
+    @abstractmethod
+    async def save(self, key: str, content: bytes) -> None:
+        """Store content under a given key, replacing any previous content"""
+
+    @abstractmethod
+    def download(self, key: str) -> "AsyncIterator[bytes]":
+        """Stream the content of a stored file
+
+        Raises:
+            FileNotFoundError: If no file is stored under the key
+        """
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Delete a stored file. Deleting a missing file is not an error."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def get_url(self, key: str) -> str:
+        """Stable URL a client can download a stored file from. It never expires,
+        so it can be embedded in notes and cached indefinitely."""
+
+    def get_local_path(self, key: str) -> "Optional[str]":
+        """Path of a stored file on the local file system, if it is stored there"""
+        return None
+
+    def get_redirect_url(self, key: str) -> "Optional[str]":
+        """URL to redirect downloads of a stored file to, when another server
+        serves the files. It may expire, so it must not be cached for long."""
+        return None
+
+    async def close(self) -> None:
+        pass
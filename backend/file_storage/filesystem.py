@@ -0,0 +1,106 @@
+import hashlib
+import os
+import uuid
+from typing import TYPE_CHECKING
+
+import aiofiles
+
+from file_storage.base import (
+    CHUNK_SIZE,
+    StorageBackend,
+    get_blob_key,
+    get_extension,
+)
+
+if TYPE_CHECKING:
+    from typing import AsyncIterator
+
+    from fastapi import UploadFile
+
+    from settings import Settings
+
+TMP_DIR_NAME = ".tmp"
+
+
+class FileSystemStorage(StorageBackend):
+    """Store files in a local directory, served by `file_storage.routes`"""
+
+    def __init__(self, location: str, base_url: str):
+        self.location = location
+        self.base_url = base_url
+
+    @classmethod
+    def from_settings(cls, settings: "Settings") -> "FileSystemStorage":
+        return cls(
+            location=settings.UPLOAD_DIR_NAME,
+            base_url=f"{settings.UPLOAD_URL}/{settings.UPLOAD_DIR_NAME}",
+        )
+
+    def get_path(self, key: str) -> str:
+        return f"{self.location}/{key}"
+
+    async def upload(self, _file: "UploadFile") -> str:
+        """Store a file by the hash of its content.
+
+        The file is streamed to a temporary file while being hashed, then
+        atomically renamed to its content-addressed path, so a blob is either
+        complete or absent.
+        """
+        tmp_dir = f"{self.location}/{TMP_DIR_NAME}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_location = f"{tmp_dir}/{uuid.uuid4().hex}"
+
+        digest = hashlib.sha256()
+        try:
+            async with aiofiles.open(tmp_location, "wb") as buffer:
+                while chunk := await _file.read(CHUNK_SIZE):
+                    digest.update(chunk)
+                    await buffer.write(chunk)
+
+            key = get_blob_key(digest.hexdigest(), get_extension(_file.filename))
+            file_location = self.get_path(key)
+            if os.path.exists(file_location):
+                os.remove(tmp_location)
+            else:
+                os.makedirs(os.path.dirname(file_location), exist_ok=True)
+                os.replace(tmp_location, file_location)
+        except BaseException:
+            if os.path.exists(tmp_location):
+                os.remove(tmp_location)
+            raise
+
+        return key
+
+    async def save(self, key: str, content: bytes) -> None:
+        tmp_dir = f"{self.location}/{TMP_DIR_NAME}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp_location = f"{tmp_dir}/{uuid.uuid4().hex}"
+        try:
+            async with aiofiles.open(tmp_location, "wb") as buffer:
+                await buffer.write(content)
+            os.makedirs(os.path.dirname(self.get_path(key)), exist_ok=True)
+            os.replace(tmp_location, self.get_path(key))
+        except BaseException:
+            if os.path.exists(tmp_location):
+                os.remove(tmp_location)
+            raise
+
+    async def download(self, key: str) -> "AsyncIterator[bytes]":
+        async with aiofiles.open(self.get_path(key), "rb") as stored_file:
+            while chunk := await stored_file.read(CHUNK_SIZE):
+                yield chunk
+
+    async def delete(self, key: str) -> None:
+        try:
+            os.remove(self.get_path(key))
+        except FileNotFoundError:
+            pass
+
+    async def exists(self, key: str) -> bool:
+        return os.path.isfile(self.get_path(key))
+
+    def get_url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def get_local_path(self, key: str) -> str:
+        return self.get_path(key)
@@ -0,0 +1,188 @@
+import asyncio
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from file_storage.base import VARIANTS_DIR_NAME, get_digest
+from settings import settings
+
+if TYPE_CHECKING:
+    from typing import Any, Optional
+
+    from file_storage.base import StorageBackend
+
+# Widths of the responsive variants, never larger than the original image
+VARIANT_WIDTHS = (320, 640, 1280)
+# Bounding box of the thumbnail
+THUMBNAIL_SIZE = (160, 160)
+# Most compact format first, AVIF only when Pillow was built with it
+FORMATS = [
+    image_format
+    for image_format in ("avif", "webp")
+    if image_format in features.modules and features.check_module(image_format)
+]
+QUALITY = 80
+MANIFEST_NAME = "manifest.json"
+
+_pool: "Optional[ProcessPoolExecutor]" = None
+# Generations in progress, so concurrent uploads of an image generate it once
+_pending: "dict[str, asyncio.Future]" = {}
+
+
+def _encode(image: "Image.Image", image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format.upper(), quality=QUALITY)
+    return buffer.getvalue()
+
+
+def generate_variants(
+    content: bytes,
+    widths: "tuple[int, ...]" = VARIANT_WIDTHS,
+    formats: "list[str]" = FORMATS,
+) -> "list[dict[str, Any]]":
+    """Resize an image into a thumbnail and responsive variants of each format.
+
+    CPU bound, so it is meant to run in a worker process (see `create_variants`).
+
+    Returns:
+        list: `name`, `width`, `format` and encoded `content` of each variant.
+        Empty if `content` is not an image Pillow can decode.
+    """
+    try:
+        image = Image.open(io.BytesIO(content))
+        image = ImageOps.exif_transpose(image)
+        # Decodes the pixels, which fails on truncated or corrupt images
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        return []
+
+    # Never upscale: images narrower than every width get a single variant
+    variant_widths = sorted(
+        {width for width in widths if width <= image.width} or {image.width}
+    )
+    thumbnail = image.copy()
+    thumbnail.thumbnail(THUMBNAIL_SIZE)
+
+    variants = []
+    for image_format in formats:
+        variants.append(
+            {
+                "name": f"thumbnail.{image_format}",
+                "width": thumbnail.width,
+                "format": image_format,
+                "content": _encode(thumbnail, image_format),
+            }
+        )
+        for width in variant_widths:
+            height = max(1, round(image.height * width / image.width))
+            variants.append(
+                {
+                    "name": f"{width}w.{image_format}",
+                    "width": width,
+                    "format": image_format,
+                    "content": _encode(
+                        image.resize((width, height), Image.Resampling.LANCZOS),
+                        image_format,
+                    ),
+                }
+            )
+    return variants
+
+
+def init_pool(max_workers: int = settings.IMAGE_PROCESS_POOL_SIZE) -> None:
+    global _pool
+    _pool = ProcessPoolExecutor(max_workers=max_workers)
+
+
+def close_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _get_manifest_key(digest: str) -> str:
+    return f"{VARIANTS_DIR_NAME}/{digest[:2]}/{digest[2:4]}/{digest}/{MANIFEST_NAME}"
+
+
+async def _read_manifest(
+    storage: "StorageBackend", digest: str
+) -> "Optional[list[dict[str, Any]]]":
+    try:
+        content = b"".join(
+            [chunk async for chunk in storage.download(_get_manifest_key(digest))]
+        )
+    except FileNotFoundError:
+        return None
+    return json.loads(content)
+
+
+async def _generate(
+    storage: "StorageBackend", digest: str, content: bytes
+) -> "list[dict[str, Any]]":
+    if _pool is None:
+        init_pool()
+    variants = await asyncio.get_running_loop().run_in_executor(
+        _pool, generate_variants, content
+    )
+    variants_dir = _get_manifest_key(digest).rpartition("/")[0]
+    manifest = []
+    for variant in variants:
+        key = f"{variants_dir}/{variant.pop('name')}"
+        await storage.save(key, variant.pop("content"))
+        manifest.append({**variant, "key": key})
+    # Written last: its presence means every variant is stored
+    await storage.save(_get_manifest_key(digest), json.dumps(manifest).encode())
+    return manifest
+
+
+async def create_variants(
+    storage: "StorageBackend", key: str, content: bytes
+) -> "list[dict[str, Any]]":
+    """Thumbnail and responsive variants of a stored image.
+
+    Variants are generated in a process pool, off the event loop, and stored
+    along with a manifest, by the hash of the image. Each image is therefore
+    only processed once, whoever uploads it.
+
+    Args:
+        storage: Storage backend of the image
+        key: Key of the stored image
+        content: Content of the image
+    Returns:
+        list: `key`, `width` and `format` of each variant. The thumbnail's key
+        ends with `thumbnail.<format>`.
+    """
+    digest = get_digest(key)
+    if (manifest := await _read_manifest(storage, digest)) is not None:
+        return manifest
+    if digest in _pending:
+        return await asyncio.shield(_pending[digest])
+
+    future = asyncio.get_running_loop().create_future()
+    _pending[digest] = future
+    try:
+        manifest = await _generate(storage, digest, content)
+        future.set_result(manifest)
+        return manifest
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as error:
+        future.set_exception(error)
+        # Marks the error as retrieved, uploads waiting for it re-raise it
+        future.exception()
+        raise
+    finally:
+        del _pending[digest]
+
+
+async def delete_variants(storage: "StorageBackend", key: str) -> None:
+    """Delete the variants of a stored image, and their manifest last"""
+    digest = get_digest(key)
+    for variant in await _read_manifest(storage, digest) or []:
+        await storage.delete(variant["key"])
+    await storage.delete(_get_manifest_key(digest))
@@ -0,0 +1,54 @@
+from typing import TYPE_CHECKING
+
+from file_storage.base import (
+    CHUNK_SIZE,
+    StorageBackend,
+    get_blob_key,
+    get_extension,
+    hash_file,
+)
+
+if TYPE_CHECKING:
+    from typing import AsyncIterator
+
+    from fastapi import UploadFile
+
+    from settings import Settings
+
+
+class MemoryStorage(StorageBackend):
+    """Keep files in memory, for tests"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.files: "dict[str, bytes]" = {}
+
+    @classmethod
+    def from_settings(cls, settings: "Settings") -> "MemoryStorage":
+        return cls(base_url=f"{settings.UPLOAD_URL}/{settings.UPLOAD_DIR_NAME}")
+
+    async def upload(self, _file: "UploadFile") -> str:
+        key = get_blob_key(await hash_file(_file), get_extension(_file.filename))
+        if key not in self.files:
+            await _file.seek(0)
+            self.files[key] = await _file.read()
+        return key
+
+    async def save(self, key: str, content: bytes) -> None:
+        self.files[key] = content
+
+    async def download(self, key: str) -> "AsyncIterator[bytes]":
+        if key not in self.files:
+            raise FileNotFoundError(key)
+        content = self.files[key]
+        for start in range(0, len(content), CHUNK_SIZE):
+            yield content[start : start + CHUNK_SIZE]
+
+    async def delete(self, key: str) -> None:
+        self.files.pop(key, None)
+
+    async def exists(self, key: str) -> bool:
+        return key in self.files
+
+    def get_url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
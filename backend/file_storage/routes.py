@@ -0,0 +1,109 @@
+import mimetypes
+import os
+import stat
+from typing import TYPE_CHECKING
+
+import anyio
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
+
+from core.revisions import matches
+from file_storage import get_storage
+from file_storage.base import CHUNK_SIZE, PRIVATE_DIR_NAME, get_content_etag
+from file_storage.filesystem import TMP_DIR_NAME
+from settings import settings
+
+if TYPE_CHECKING:
+    from starlette.types import Receive, Scope, Send
+
+# Content-addressed files never change, so they can be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Redirects point to URLs that may expire, so they must not be reused
+REDIRECT_CACHE_CONTROL = "no-cache"
+PATHSEND_EXTENSION = "http.response.pathsend"
+
+router = APIRouter(prefix=f"/{settings.UPLOAD_DIR_NAME}")
+
+
+class PathSendFileResponse(FileResponse):
+    """`FileResponse` letting the server send the file itself, with `sendfile`,
+    when it supports the ASGI `pathsend` extension (e.g. Granian). Otherwise,
+    and for range requests, the file is read in chunks as usual."""
+
+    chunk_size = CHUNK_SIZE
+
+    async def __call__(self, scope: "Scope", receive: "Receive", send: "Send") -> None:
+        if (
+            PATHSEND_EXTENSION not in scope.get("extensions", {})
+            or scope["method"].upper() == "HEAD"
+            or any(name == b"range" for name, _ in scope["headers"])
+        ):
+            return await super().__call__(scope, receive, send)
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        await send({"type": PATHSEND_EXTENSION, "path": str(self.path)})
+
+
+def _is_valid_key(key: str) -> bool:
+    parts = key.split("/")
+    return (
+        bool(key)
+        and not key.startswith("/")
+        and parts[0] not in (TMP_DIR_NAME, PRIVATE_DIR_NAME)
+        and not any(part in ("", ".", "..") for part in parts)
+    )
+
+
+@router.api_route(
+    "/{key:path}",
+    methods=["GET", "HEAD"],
+    description="Download an uploaded file. Supports conditional and range requests.",
+    include_in_schema=False,
+)
+async def serve_upload(key: str, request: Request) -> Response:
+    if not _is_valid_key(key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    storage = get_storage()
+    headers = {}
+    if etag := get_content_etag(key):
+        headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        # The ETag is known without touching the storage
+        if matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if redirect_url := storage.get_redirect_url(key):
+        return RedirectResponse(
+            redirect_url, headers={"Cache-Control": REDIRECT_CACHE_CONTROL}
+        )
+
+    if path := storage.get_local_path(key):
+        try:
+            stat_result = await anyio.to_thread.run_sync(os.stat, path)
+        except (FileNotFoundError, NotADirectoryError):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        response = PathSendFileResponse(path, headers=headers, stat_result=stat_result)
+        if not etag and matches(
+            request.headers.get("if-none-match"), response.headers["etag"]
+        ):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers={"ETag": response.headers["etag"]},
+            )
+        return response
+
+    if not await storage.exists(key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return StreamingResponse(
+        storage.download(key),
+        headers=headers,
+        media_type=mimetypes.guess_type(key)[0] or "application/octet-stream",
+    )
@@ -0,0 +1,294 @@
+import asyncio
+import hashlib
+import hmac
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+from urllib.parse import quote, urlsplit
+from xml.etree import ElementTree
+
+import httpx
+
+from file_storage.base import (
+    CHUNK_SIZE,
+    StorageBackend,
+    get_blob_key,
+    get_extension,
+    hash_file,
+)
+
+if TYPE_CHECKING:
+    from typing import AsyncIterator, Optional
+
+    from fastapi import UploadFile
+
+    from settings import Settings
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+# S3 rejects multipart uploads with parts (but the last) smaller than 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def _quote(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+def _get_canonical_query(params: "dict[str, str]") -> str:
+    return "&".join(
+        f"{_quote(name)}={_quote(value)}" for name, value in sorted(params.items())
+    )
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+class S3Storage(StorageBackend):
+    """Store files in an S3-compatible object storage (AWS S3, MinIO, R2...).
+
+    Requests are signed with AWS Signature Version 4. Files larger than
+    `part_size` are sent as multipart uploads, with up to `max_concurrency`
+    parts in flight. Files are linked to at `base_url`, where downloads are
+    redirected to URLs presigned for `url_expires_in` seconds.
+    """
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key_id: str,
+        secret_access_key: str,
+        base_url: str,
+        region: str = "us-east-1",
+        path_style: bool = True,
+        part_size: int = 8 * 1024 * 1024,
+        max_concurrency: int = 4,
+        url_expires_in: int = 3600,
+        transport: "Optional[httpx.AsyncBaseTransport]" = None,
+    ):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"Parts must be at least {MIN_PART_SIZE} bytes")
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.base_url = base_url
+        self.region = region
+        self.path_style = path_style
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.url_expires_in = url_expires_in
+        self.client = httpx.AsyncClient(transport=transport)
+
+    @classmethod
+    def from_settings(cls, settings: "Settings") -> "S3Storage":
+        return cls(
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            bucket=settings.S3_BUCKET,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            base_url=f"{settings.UPLOAD_URL}/{settings.UPLOAD_DIR_NAME}",
+            region=settings.S3_REGION,
+            path_style=settings.S3_PATH_STYLE,
+            part_size=settings.S3_MULTIPART_PART_SIZE,
+            max_concurrency=settings.S3_MULTIPART_CONCURRENCY,
+            url_expires_in=settings.S3_URL_EXPIRES_IN,
+        )
+
+    def _get_object_url(self, key: str) -> "tuple[str, str]":
+        """Host and URL-encoded path of an object"""
+        endpoint = urlsplit(self.endpoint_url)
+        path = _quote(f"/{key}", safe="/-_.~")
+        if self.path_style:
+            return endpoint.netloc, f"/{self.bucket}{path}"
+        return f"{self.bucket}.{endpoint.netloc}", path
+
+    def _get_scope(self, now: "datetime") -> str:
+        return f"{now:%Y%m%d}/{self.region}/s3/aws4_request"
+
+    def _get_signature(self, now: "datetime", canonical_request: str) -> str:
+        string_to_sign = "\n".join(
+            [
+                ALGORITHM,
+                f"{now:%Y%m%dT%H%M%SZ}",
+                self._get_scope(now),
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            ]
+        )
+        key = _hmac(f"AWS4{self.secret_access_key}".encode(), f"{now:%Y%m%d}")
+        for part in (self.region, "s3", "aws4_request"):
+            key = _hmac(key, part)
+        return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    def presign(
+        self,
+        method: str,
+        key: str,
+        expires_in: int,
+        now: "Optional[datetime]" = None,
+    ) -> str:
+        """URL allowing anyone to send the given request on an object until it
+        expires, without credentials"""
+        now = now or datetime.now(timezone.utc)
+        host, path = self._get_object_url(key)
+        params = {
+            "X-Amz-Algorithm": ALGORITHM,
+            "X-Amz-Credential": f"{self.access_key_id}/{self._get_scope(now)}",
+            "X-Amz-Date": f"{now:%Y%m%dT%H%M%SZ}",
+            "X-Amz-Expires": str(expires_in),
+            "X-Amz-SignedHeaders": "host",
+        }
+        query = _get_canonical_query(params)
+        canonical_request = "\n".join(
+            [method, path, query, f"host:{host}\n", "host", UNSIGNED_PAYLOAD]
+        )
+        signature = self._get_signature(now, canonical_request)
+        scheme = urlsplit(self.endpoint_url).scheme
+        return f"{scheme}://{host}{path}?{query}&X-Amz-Signature={signature}"
+
+    async def _request(
+        self,
+        method: str,
+        key: str,
+        params: "Optional[dict[str, str]]" = None,
+        content: bytes = b"",
+        stream: bool = False,
+    ) -> "httpx.Response":
+        now = datetime.now(timezone.utc)
+        host, path = self._get_object_url(key)
+        query = _get_canonical_query(params or {})
+        headers = {
+            "host": host,
+            "x-amz-content-sha256": hashlib.sha256(content).hexdigest(),
+            "x-amz-date": f"{now:%Y%m%dT%H%M%SZ}",
+        }
+        signed_headers = ";".join(sorted(headers))
+        canonical_request = "\n".join(
+            [
+                method,
+                path,
+                query,
+                "".join(f"{name}:{headers[name]}\n" for name in sorted(headers)),
+                signed_headers,
+                headers["x-amz-content-sha256"],
+            ]
+        )
+        headers["authorization"] = (
+            f"{ALGORITHM} Credential={self.access_key_id}/{self._get_scope(now)}, "
+            f"SignedHeaders={signed_headers}, "
+            f"Signature={self._get_signature(now, canonical_request)}"
+        )
+        scheme = urlsplit(self.endpoint_url).scheme
+        url = f"{scheme}://{host}{path}" + (f"?{query}" if query else "")
+        request = self.client.build_request(
+            method, url, headers=headers, content=content
+        )
+        return await self.client.send(request, stream=stream)
+
+    async def _read_part(self, _file: "UploadFile") -> bytes:
+        chunks, size = [], 0
+        while size < self.part_size and (
+            chunk := await _file.read(min(CHUNK_SIZE, self.part_size - size))
+        ):
+            chunks.append(chunk)
+            size += len(chunk)
+        return b"".join(chunks)
+
+    async def _upload_multipart(self, key: str, _file: "UploadFile") -> None:
+        response = await self._request("POST", key, {"uploads": ""})
+        response.raise_for_status()
+        upload_id = ElementTree.fromstring(response.content).findtext("{*}UploadId")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        etags: "dict[int, str]" = {}
+
+        async def upload_part(number: int, content: bytes) -> None:
+            try:
+                response = await self._request(
+                    "PUT",
+                    key,
+                    {"partNumber": str(number), "uploadId": upload_id},
+                    content,
+                )
+                response.raise_for_status()
+                etags[number] = response.headers["etag"]
+            finally:
+                semaphore.release()
+
+        try:
+            async with asyncio.TaskGroup() as tasks:
+                number = 1
+                # Only `max_concurrency` parts are held in memory at a time
+                await semaphore.acquire()
+                while content := await self._read_part(_file):
+                    tasks.create_task(upload_part(number, content))
+                    number += 1
+                    await semaphore.acquire()
+                semaphore.release()
+
+            parts = "".join(
+                f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+                for number, etag in sorted(etags.items())
+            )
+            response = await self._request(
+                "POST",
+                key,
+                {"uploadId": upload_id},
+                f"<CompleteMultipartUpload>{parts}</CompleteMultipartUpload>".encode(),
+            )
+            response.raise_for_status()
+        except BaseException:
+            await self._request("DELETE", key, {"uploadId": upload_id})
+            raise
+
+    async def upload(self, _file: "UploadFile") -> str:
+        """Store a file by the hash of its content.
+
+        The file is read once to hash it, then, unless the same content is
+        already stored, a second time to send it.
+        """
+        key = get_blob_key(await hash_file(_file), get_extension(_file.filename))
+        if await self.exists(key):
+            return key
+
+        await _file.seek(0)
+        if _file.size is not None and _file.size <= self.part_size:
+            await self.save(key, await _file.read())
+        else:
+            await self._upload_multipart(key, _file)
+        return key
+
+    async def save(self, key: str, content: bytes) -> None:
+        response = await self._request("PUT", key, content=content)
+        response.raise_for_status()
+
+    async def download(self, key: str) -> "AsyncIterator[bytes]":
+        response = await self._request("GET", key, stream=True)
+        try:
+            if response.status_code == httpx.codes.NOT_FOUND:
+                raise FileNotFoundError(key)
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                yield chunk
+        finally:
+            await response.aclose()
+
+    async def delete(self, key: str) -> None:
+        response = await self._request("DELETE", key)
+        if response.status_code != httpx.codes.NOT_FOUND:
+            response.raise_for_status()
+
+    async def exists(self, key: str) -> bool:
+        response = await self._request("HEAD", key)
+        if response.status_code == httpx.codes.NOT_FOUND:
+            return False
+        response.raise_for_status()
+        return True
+
+    def get_url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def get_redirect_url(self, key: str) -> str:
+        return self.presign("GET", key, self.url_expires_in)
+
+    async def close(self) -> None:
+        await self.client.aclose()
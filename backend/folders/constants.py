@@ -1 +1,5 @@
 API_PREFIX = "/api/folders"
+SORT_KEY = "created_at"
+# Notes of a Folder are moved to and out of the trash along with it by batches
+# of this size, each in its own transaction
+CONTENT_BATCH_SIZE = 500
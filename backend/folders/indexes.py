@@ -0,0 +1,74 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from database.indexes import QueryShape
+from trash.constants import LIVE_FILTER, TRASHED_FILTER
+
+INDEXES = {
+    "folders": [
+        IndexModel(
+            [("owner_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+            name="live_owner_id_created_at",
+            partialFilterExpression=LIVE_FILTER,
+        ),
+        # Lists all the folders of an owner, to sync from scratch
+        IndexModel(
+            [("owner_id", ASCENDING), ("_id", ASCENDING)],
+            name="live_owner_id",
+            partialFilterExpression=LIVE_FILTER,
+        ),
+        IndexModel(
+            [
+                ("owner_id", ASCENDING),
+                ("deleted_at", DESCENDING),
+                ("_id", DESCENDING),
+            ],
+            name="trashed_owner_id_deleted_at",
+            partialFilterExpression=TRASHED_FILTER,
+        ),
+        # Finds the owners whose trash expired, to purge it
+        IndexModel(
+            [("deleted_at", ASCENDING)],
+            name="trashed_deleted_at",
+            partialFilterExpression=TRASHED_FILTER,
+        ),
+    ],
+}
+
+# Indexes replaced by those above
+DROPPED_INDEXES = {"folders": ["owner_id_created_at", "deleted_at_ttl"]}
+
+QUERY_SHAPES = [
+    QueryShape(
+        "folders",
+        filter=("owner_id",),
+        sort=(("created_at", ASCENDING), ("_id", ASCENDING)),
+        description="folders.services.get_folders",
+    ),
+    QueryShape(
+        "folders",
+        filter=("owner_id",),
+        sort=(("_id", ASCENDING),),
+        description="sync.services.get_snapshot",
+    ),
+    QueryShape(
+        "folders",
+        filter=("_id", "owner_id"),
+        description="folders.services.get_user_folder",
+    ),
+    QueryShape(
+        "folders",
+        filter=("owner_id",),
+        sort=(("deleted_at", DESCENDING), ("_id", DESCENDING)),
+        description="folders.services.get_trashed_folders",
+    ),
+    QueryShape(
+        "folders",
+        filter=("owner_id", "deleted_at"),
+        description="trash.services.purge_trash",
+    ),
+    QueryShape(
+        "folders",
+        filter=("deleted_at",),
+        description="trash.services.purge_expired_trash",
+    ),
+]
@@ -1,20 +1,38 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
 from fastapi import (
     APIRouter,
     Body,
     Depends,
+    Header,
     Query,
     status,
     HTTPException,
+    Response,
     UploadFile,
     File,
 )
-from file_storage import upload
-from database import get_session
+from pydantic import TypeAdapter
+
+import file_storage
+from database import get_read_session, get_secondary_session, get_session
 from folders import constants, schemas, services
-from notes import schemas as note_schemas, services as note_services
+from jobs import constants as job_constants, schemas as job_schemas
+from jobs.runner import runner
+from notes.enums import NoteView
+from notes import (
+    constants as note_constants,
+    schemas as note_schemas,
+    services as note_services,
+)
+from core import (
+    pagination,
+    revisions,
+    schemas as core_schemas,
+    services as core_services,
+)
 from core.auth import get_auth_user
+from core.responses import ModelResponse
 
 if TYPE_CHECKING:
     from database import Session
@@ -22,6 +40,11 @@ if TYPE_CHECKING:
 
 router = APIRouter(prefix=constants.API_PREFIX)
 
+# Adapters of the list routes, built once, see `ModelResponse`
+FOLDERS = TypeAdapter(list[schemas.FolderRetrieve])
+NOTES = TypeAdapter(list[note_schemas.NoteRetrieve])
+NOTE_SUMMARIES = TypeAdapter(list[note_schemas.NoteSummary])
+
 
 @router.post(
     "",
@@ -34,52 +57,143 @@ async def create_folder(
     session: "Session" = Depends(get_session),
     auth_user: "AuthUser" = Depends(get_auth_user),
 ) -> "schemas.FolderRetrieve":
-    return await session.with_transaction(
-        lambda s: services.create_folder(auth_user.user_id, folder.model_dump(), s)
+    return await core_services.with_transaction(
+        session,
+        lambda s: services.create_folder(auth_user.user_id, folder.model_dump(), s),
     )
 
 
 @router.get(
     "",
-    description="Retrieve Folders given limit and offset",
+    description="Retrieve Folders given limit and either a cursor or an offset",
     response_model=list[schemas.FolderRetrieve],
 )
 async def get_folders(
+    response: Response,
+    if_none_match: "Optional[str]" = Header(None),
     limit: int = Query(20, ge=1),
     offset: int = Query(0, ge=0),
-    session: "Session" = Depends(get_session),
+    cursor: "Optional[pagination.Cursor]" = Depends(pagination.get_cursor),
+    read_session: "Session" = Depends(get_read_session),
+    secondary_session: "Session" = Depends(get_secondary_session),
     auth_user: "AuthUser" = Depends(get_auth_user),
 ) -> "list[schemas.FolderRetrieve]":
-    return await services.get_folders(auth_user.user_id, session, limit, offset)
+    # First pages are read from the primary, so they can be cached, and the next
+    # ones from secondaries
+    session = secondary_session if cursor or offset else read_session
+    folders = await services.get_folders(
+        auth_user.user_id, session, limit, offset, cursor
+    )
+    if next_cursor := pagination.get_next_cursor(folders, constants.SORT_KEY, limit):
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return revisions.get_not_modified_response(
+        response, revisions.get_list_etag(folders), if_none_match
+    ) or ModelResponse(folders, FOLDERS, headers=response.headers)
+
+
+@router.post(
+    ":batch",
+    description="Create, update and delete Folders in a single transaction",
+    response_model=core_schemas.BatchResult,
+)
+async def batch_folders(
+    batch: "schemas.FolderBatch" = Body(...),
+    session: "Session" = Depends(get_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "core_schemas.BatchResult":
+    operations = batch.model_dump(exclude_unset=True)["operations"]
+    results = await core_services.with_transaction(
+        session, lambda s: services.apply_folder_batch(auth_user.user_id, operations, s)
+    )
+    for result in results:
+        if job := result.pop("job", None):
+            runner.submit(job)
+            result["job_id"] = job["_id"]
+    return {"results": results}
 
 
-@router.put("/{folder_id}", description="Update a given Folder")
+@router.get(
+    "/{folder_id}",
+    description="Retrieve a given Folder",
+    response_model=schemas.FolderRetrieve,
+)
+async def get_folder(
+    folder_id: str,
+    response: Response,
+    if_none_match: "Optional[str]" = Header(None),
+    session: "Session" = Depends(get_read_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "schemas.FolderRetrieve":
+    folder = await services.get_user_folder(auth_user.user_id, folder_id, session)
+    if folder is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return (
+        revisions.get_not_modified_response(
+            response, revisions.get_etag(folder), if_none_match
+        )
+        or folder
+    )
+
+
+@router.put(
+    "/{folder_id}",
+    description="Update a given Folder. With an `If-Match` header, only if it is "
+    "still at the given revision.",
+    response_model=Optional[schemas.FolderRetrieve],
+    responses={
+        status.HTTP_409_CONFLICT: {"description": "Folder is at another revision"}
+    },
+)
 async def update_folder(
     folder_id: str,
+    response: Response,
     folder: "schemas.FolderUpdate" = Body(...),
+    revision: "Optional[int]" = Depends(revisions.get_if_match_revision),
     session: "Session" = Depends(get_session),
     auth_user: "AuthUser" = Depends(get_auth_user),
-) -> None:
-    return await session.with_transaction(
-        lambda s: services.update_folder(
-            auth_user.user_id, folder_id, folder.model_dump(exclude_unset=True), s
+) -> "Optional[schemas.FolderRetrieve]":
+    try:
+        document = await core_services.with_transaction(
+            session,
+            lambda s: services.update_folder(
+                auth_user.user_id,
+                folder_id,
+                folder.model_dump(exclude_unset=True),
+                s,
+                revision,
+            ),
         )
-    )
+    except revisions.RevisionConflictError as error:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
+    if document is not None:
+        response.headers[revisions.ETAG_HEADER] = revisions.get_etag(document)
+    return document
 
 
 @router.delete(
     "/{folder_id}",
-    description="Delete a given Folder",
-    status_code=status.HTTP_204_NO_CONTENT,
+    description="Move a given Folder to the trash. Its Notes follow it in the "
+    "background, by the returned Job.",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=Optional[job_schemas.JobRetrieve],
+    responses={
+        status.HTTP_204_NO_CONTENT: {"description": "No such Folder out of the trash"}
+    },
 )
 async def delete_folder(
     folder_id: str,
+    response: Response,
     session: "Session" = Depends(get_session),
     auth_user: "AuthUser" = Depends(get_auth_user),
-) -> None:
-    await session.with_transaction(
-        lambda s: services.delete_folder(auth_user.user_id, folder_id, s)
+) -> "Optional[job_schemas.JobRetrieve]":
+    job = await core_services.with_transaction(
+        session, lambda s: services.delete_folder(auth_user.user_id, folder_id, s)
     )
+    if job is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    runner.submit(job)
+    response.headers["Location"] = f"{job_constants.API_PREFIX}/{job['_id']}"
+    return job
 
 
 @router.post(
@@ -97,54 +211,210 @@ async def create_note(
     if not await services.get_user_folder(auth_user.user_id, folder_id, session):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
 
-    return await session.with_transaction(
-        lambda s: note_services.create_note(folder_id, note.model_dump(), s)
+    return await core_services.with_transaction(
+        session,
+        lambda s: note_services.create_note(
+            auth_user.user_id, folder_id, note.model_dump(), s
+        ),
     )
 
 
+@router.post(
+    "/{folder_id}/notes:batch",
+    description="Create, update and delete Notes of a given Folder in a single "
+    "transaction",
+    response_model=core_schemas.BatchResult,
+)
+async def batch_notes(
+    folder_id: str,
+    batch: "note_schemas.NoteBatch" = Body(...),
+    session: "Session" = Depends(get_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "core_schemas.BatchResult":
+    async def apply_batch(s: "Session") -> "list[dict]":
+        if not await services.get_user_folder(auth_user.user_id, folder_id, s):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+        return await note_services.apply_note_batch(
+            auth_user.user_id, folder_id, operations, s
+        )
+
+    operations = batch.model_dump(exclude_unset=True)["operations"]
+    return {"results": await core_services.with_transaction(session, apply_batch)}
+
+
 @router.get(
     "/{folder_id}/notes",
-    description="Retrieve all Notes of a given Folder",
+    description="Retrieve the Notes of a given Folder given limit and either a "
+    "cursor or an offset. The `summary` view only retrieves what lists of Notes "
+    "show, as `NoteSummary` objects, without their content.",
     response_model=list[note_schemas.NoteRetrieve],
+    responses={
+        status.HTTP_200_OK: {
+            "description": "Notes, or Note summaries with the `summary` view"
+        }
+    },
 )
 async def get_notes(
     folder_id: str,
+    response: Response,
+    if_none_match: "Optional[str]" = Header(None),
     limit: int = Query(20, ge=1),
     offset: int = Query(0, ge=0),
-    session: "Session" = Depends(get_session),
+    cursor: "Optional[pagination.Cursor]" = Depends(pagination.get_cursor),
+    view: NoteView = Query(NoteView.FULL),
+    preview: bool = Query(
+        False, description="With the `summary` view, preview the content"
+    ),
+    read_session: "Session" = Depends(get_read_session),
+    secondary_session: "Session" = Depends(get_secondary_session),
     auth_user: "AuthUser" = Depends(get_auth_user),
 ) -> list["note_schemas.NoteRetrieve"]:
-    if not await services.get_user_folder(auth_user.user_id, folder_id, session):
+    # The Notes of a trashed Folder are moved to the trash by a job, so they may
+    # still be out of it: the Folder itself must be checked, from the cache
+    if not await services.get_user_folder(auth_user.user_id, folder_id, read_session):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    # First pages are read from the primary, so they can be cached, and the next
+    # ones from secondaries
+    session = secondary_session if cursor or offset else read_session
+    notes = await note_services.get_folder_notes(
+        auth_user.user_id, folder_id, session, limit, offset, cursor, view, preview
+    )
 
-    return await note_services.get_folder_notes(folder_id, session, limit, offset)
+    if next_cursor := pagination.get_next_cursor(notes, note_constants.SORT_KEY, limit):
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    variant = ""
+    if view == NoteView.SUMMARY:
+        variant = f"{view.value}:preview" if preview else view.value
+    return revisions.get_not_modified_response(
+        response, revisions.get_list_etag(notes, variant), if_none_match
+    ) or ModelResponse(
+        notes,
+        NOTE_SUMMARIES if view == NoteView.SUMMARY else NOTES,
+        headers=response.headers,
+    )
+
+
+@router.get(
+    "/{folder_id}/notes/{note_id}",
+    description="Retrieve a given Note in a given Folder",
+    response_model=note_schemas.NoteRetrieve,
+)
+async def get_note(
+    folder_id: str,
+    note_id: str,
+    response: Response,
+    if_none_match: "Optional[str]" = Header(None),
+    session: "Session" = Depends(get_read_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "note_schemas.NoteRetrieve":
+    note = await note_services.get_folder_note(
+        auth_user.user_id, note_id, folder_id, session
+    )
+    if note is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return (
+        revisions.get_not_modified_response(
+            response, revisions.get_etag(note), if_none_match
+        )
+        or note
+    )
 
 
 @router.put(
     "/{folder_id}/notes/{note_id}",
-    description="Update a given Note in a given Folder",
-    response_model=note_schemas.NoteUpdate,
+    description="Update a given Note in a given Folder. With an `If-Match` header, "
+    "only if it is still at the given revision.",
+    response_model=note_schemas.NoteRetrieve,
+    responses={
+        status.HTTP_409_CONFLICT: {"description": "Note is at another revision"}
+    },
 )
 async def update_note(
     folder_id: str,
     note_id: str,
+    response: Response,
     note: "note_schemas.NoteUpdate" = Body(...),
+    revision: "Optional[int]" = Depends(revisions.get_if_match_revision),
     session: "Session" = Depends(get_session),
     auth_user: "AuthUser" = Depends(get_auth_user),
-) -> "note_schemas.NoteUpdate":
-    if not await services.get_user_folder(auth_user.user_id, folder_id, session):
+) -> "note_schemas.NoteRetrieve":
+    if note.folder_id not in (None, folder_id) and not await services.get_user_folder(
+        auth_user.user_id, note.folder_id, session
+    ):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
 
-    return await session.with_transaction(
-        lambda s: note_services.update_note(
-            note_id, folder_id, note.model_dump(exclude_unset=True), s
+    try:
+        document = await core_services.with_transaction(
+            session,
+            lambda s: note_services.update_note(
+                auth_user.user_id,
+                note_id,
+                folder_id,
+                note.model_dump(exclude_unset=True),
+                s,
+                revision,
+            ),
         )
-    )
+    except revisions.RevisionConflictError as error:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
+    if document is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    response.headers[revisions.ETAG_HEADER] = revisions.get_etag(document)
+    return document
+
+
+@router.patch(
+    "/{folder_id}/notes/{note_id}",
+    description="Apply text operations to the content of a given Note in a given "
+    "Folder, if it is still at the given revision",
+    response_model=note_schemas.NoteDeltaResult,
+    responses={
+        status.HTTP_409_CONFLICT: {"description": "Note is at another revision"}
+    },
+)
+async def patch_note(
+    folder_id: str,
+    note_id: str,
+    response: Response,
+    note: "note_schemas.NoteDelta" = Body(...),
+    session: "Session" = Depends(get_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "note_schemas.NoteDeltaResult":
+    try:
+        document = await core_services.with_transaction(
+            session,
+            lambda s: note_services.apply_note_delta(
+                auth_user.user_id,
+                note_id,
+                folder_id,
+                {
+                    "revision": note.revision,
+                    "title": note.title,
+                    # Without defaults, to keep the stored operations compact
+                    "operations": [
+                        operation.model_dump(exclude_defaults=True)
+                        for operation in note.operations
+                    ],
+                },
+                s,
+            ),
+        )
+    except revisions.RevisionConflictError as error:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(error)
+        )
+    if document is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    response.headers[revisions.ETAG_HEADER] = revisions.get_etag(document)
+    return document
 
 
 @router.post(
     "/{folder_id}/notes/{note_id}/images",
-    description="Uploads an image from a given Note in a given Folder",
+    description="Uploads an image from a given Note in a given Folder, along with "
+    "its thumbnail and responsive variants",
     response_model=note_schemas.ImageUpload,
 )
 async def upload_image(
@@ -154,18 +424,19 @@ async def upload_image(
     auth_user: "AuthUser" = Depends(get_auth_user),
     session: "Session" = Depends(get_session),
 ) -> "note_schemas.ImageUpload":
-    if not await services.get_user_folder(
-        auth_user.user_id, folder_id, session
-    ) or not await note_services.get_folder_note(note_id, folder_id, session):
+    if not await note_services.get_folder_note(
+        auth_user.user_id, note_id, folder_id, session
+    ):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
 
-    upload_path = await upload(auth_user.user_id, image_file)
-    return {"path": upload_path}
+    image = await file_storage.upload_image(image_file)
+    await note_services.record_image_upload(image["key"], session)
+    return image
 
 
 @router.delete(
     "/{folder_id}/notes/{note_id}",
-    description="Delete a given Note in a given Folder",
+    description="Move a given Note in a given Folder to the trash",
     status_code=status.HTTP_204_NO_CONTENT,
 )
 async def delete_note(
@@ -174,9 +445,8 @@ async def delete_note(
     session: "Session" = Depends(get_session),
     auth_user: "AuthUser" = Depends(get_auth_user),
 ) -> None:
-    if not await services.get_user_folder(auth_user.user_id, folder_id, session):
+    if not await core_services.with_transaction(
+        session,
+        lambda s: note_services.delete_note(auth_user.user_id, note_id, folder_id, s),
+    ):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
-
-    await session.with_transaction(
-        lambda s: note_services.delete_note(note_id, folder_id, s)
-    )
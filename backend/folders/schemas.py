@@ -1,5 +1,8 @@
+from typing import Annotated, Literal, Union
+
 from pydantic import BaseModel, ConfigDict, Field
 
+from core.constants import BATCH_MAX_OPERATIONS
 from core.schemas import StrObjectId
 
 
@@ -8,6 +11,7 @@ class FolderRetrieve(BaseModel):
         validation_alias="_id", examples=["db490d0c-8e01-4ee4-8c36-abad040a0a0c"]
     )
     name: str = Field(examples=["Vacations 2024"])
+    revision: int = Field(default=0, examples=[3])
 
     model_config = ConfigDict(extra="ignore", frozen=True)
 
@@ -22,3 +26,36 @@ class FolderUpdate(BaseModel):
     name: str = Field(examples=["Vacations 2024"])
 
     model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class FolderBatchCreate(BaseModel):
+    op: Literal["create"]
+    folder: FolderCreate
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class FolderBatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: str = Field(examples=["db490d0c-8e01-4ee4-8c36-abad040a0a0c"])
+    folder: FolderUpdate
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class FolderBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: str = Field(examples=["db490d0c-8e01-4ee4-8c36-abad040a0a0c"])
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class FolderBatch(BaseModel):
+    operations: list[
+        Annotated[
+            Union[FolderBatchCreate, FolderBatchUpdate, FolderBatchDelete],
+            Field(discriminator="op"),
+        ]
+    ] = Field(min_length=1, max_length=BATCH_MAX_OPERATIONS)
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
@@ -1,15 +1,25 @@
 import copy
 import typing
 
+import pymongo
 from bson import ObjectId
+from pymongo import InsertOne, ReturnDocument, UpdateOne
 
-from core.enums import FolderEventType
-from core.events import Event
-from core.services import create_event
-from core.utils import get_now_utc
+import cache
+from core import pagination
+from core.enums import BatchOperationStatus, FolderEventType, NoteEventType
+from core.events import Event, get_restored_payload
+from core.revisions import RevisionConflictError, get_revision_query
+from core.services import create_event, create_events, with_transaction
+from core.utils import get_now_utc, truncate_to_milliseconds
+from folders.constants import CONTENT_BATCH_SIZE, SORT_KEY
+from jobs import services as job_services
+from jobs.enums import JobType
+from jobs.runner import runner
+from trash.constants import LIVE_FILTER, SORT_KEY as TRASH_SORT_KEY, TRASHED_FILTER
 
 if typing.TYPE_CHECKING:
-    from database import Session
+    from database import Client, Session
 
 
 async def create_folder(
@@ -17,14 +27,15 @@ async def create_folder(
 ) -> "dict[str, typing.Any]":
     folder.update({"owner_id": owner_id})
     event_payload = copy.deepcopy(folder)
-    document = {**folder, "created_at": get_now_utc()}
-    insert_result = await session.folders.insert_one(document)
+    document = {**folder, "created_at": get_now_utc(), "revision": 0}
+    insert_result = await session.folders.insert_one(document, session=session)
     if insert_result.inserted_id:
         await create_event(
             Event(
                 aggregate_id=insert_result.inserted_id,
                 type=FolderEventType.CREATED,
                 payload=event_payload,
+                owner_id=owner_id,
             ),
             session,
         )
@@ -37,49 +48,396 @@ async def get_folders(
     session: "Session",
     limit: int = 20,
     offset: int = 0,
+    cursor: "typing.Optional[pagination.Cursor]" = None,
 ) -> "list[dict[str, typing.Any]]":
-    return (
-        await session.folders.find({"owner_id": owner_id})
-        .sort("created_at")
-        .limit(limit)
-        .skip(offset)
-        .to_list()
-    )
+    query = {"owner_id": owner_id, **LIVE_FILTER}
+    if cursor:
+        query.update(pagination.keyset_filter(SORT_KEY, cursor))
+
+    async def load() -> "list[dict[str, typing.Any]]":
+        return (
+            await session.folders.find(query)
+            .sort(pagination.keyset_sort(SORT_KEY))
+            .limit(limit)
+            .skip(offset)
+            .to_list()
+        )
+
+    # Only the first page is requested often enough to be worth caching
+    if cursor or offset or not cache.is_cacheable(session):
+        return await load()
+    return await cache.cached(cache.FOLDER_NAMESPACE, owner_id, f"list:{limit}", load)
 
 
 async def update_folder(
-    owner_id: str, folder_id: str, folder: "dict[str, typing.Any]", session: "Session"
-) -> None:
+    owner_id: str,
+    folder_id: str,
+    folder: "dict[str, typing.Any]",
+    session: "Session",
+    revision: "typing.Optional[int]" = None,
+) -> "typing.Optional[dict[str, typing.Any]]":
+    """Update a folder of a given owner
+
+    Args:
+        owner_id: Owner of the folder
+        folder_id: Id of the folder
+        folder: Fields to update
+        session: Database session
+        revision: Revision the folder must be at, if any
+    Returns:
+        dict: Updated folder, or None if the owner has no such folder
+    Raises:
+        RevisionConflictError: If the folder is not at `revision`
+    """
+    query = {"_id": ObjectId(folder_id), "owner_id": owner_id, **LIVE_FILTER}
     event_payload = copy.deepcopy(folder)
+    document = await session.folders.find_one_and_update(
+        query if revision is None else {**query, **get_revision_query(revision)},
+        {
+            "$set": {**folder, "last_updated_at": get_now_utc()},
+            "$inc": {"revision": 1},
+        },
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+    if document is None:
+        if revision is not None and (
+            current := await session.folders.find_one(
+                query, {"revision": 1}, session=session
+            )
+        ):
+            raise RevisionConflictError(current.get("revision", 0))
+        return None
+    await create_event(
+        Event(
+            aggregate_id=folder_id,
+            type=FolderEventType.UPDATED,
+            payload=event_payload,
+            owner_id=owner_id,
+        ),
+        session,
+    )
+    return document
+
+
+async def delete_folder(
+    owner_id: str, folder_id: str, session: "Session"
+) -> "typing.Optional[dict[str, typing.Any]]":
+    """Move a folder of a given owner to the trash. Its notes follow it
+    afterwards, in the background, by the returned job (see
+    `trash_folder_content`).
+
+    Returns:
+        dict: Job trashing the notes of the folder, or None if the owner has no
+        such folder out of the trash
+    """
+    deleted_at = truncate_to_milliseconds(get_now_utc())
     update_result = await session.folders.update_one(
-        {"_id": ObjectId(folder_id), "owner_id": owner_id},
-        {"$set": {**folder, "last_updated_at": get_now_utc()}},
+        {"_id": ObjectId(folder_id), "owner_id": owner_id, **LIVE_FILTER},
+        {"$set": {"deleted_at": deleted_at}, "$inc": {"revision": 1}},
+        session=session,
+    )
+    if not update_result.modified_count:
+        return None
+    await create_event(
+        Event(
+            aggregate_id=folder_id,
+            type=FolderEventType.DELETED,
+            payload={},
+            owner_id=owner_id,
+        ),
+        session,
+    )
+    return await job_services.create_job(
+        owner_id,
+        JobType.TRASH_FOLDER_CONTENT,
+        {"folder_id": folder_id, "deleted_at": deleted_at},
+        session,
     )
-    if update_result.modified_count:
-        await create_event(
-            Event(
-                aggregate_id=folder_id,
-                type=FolderEventType.UPDATED,
-                payload=event_payload,
-            ),
-            session,
-        )
 
 
-async def delete_folder(owner_id: str, folder_id: str, session: "Session") -> None:
-    delete_result = await session.folders.delete_one(
-        {"_id": ObjectId(folder_id), "owner_id": owner_id}
+async def restore_folder(
+    owner_id: str, folder_id: str, session: "Session"
+) -> "typing.Optional[dict[str, typing.Any]]":
+    """Move a folder of a given owner out of the trash. The notes trashed along
+    with it follow it afterwards, in the background, by the returned job (see
+    `restore_folder_content`).
+
+    Returns:
+        dict: Job restoring the notes of the folder, or None if the owner has no
+        such folder in the trash
+    """
+    folder = await session.folders.find_one_and_update(
+        {"_id": ObjectId(folder_id), "owner_id": owner_id, **TRASHED_FILTER},
+        {"$unset": {"deleted_at": ""}, "$inc": {"revision": 1}},
+        session=session,
     )
-    if delete_result.deleted_count:
-        await create_event(
-            Event(aggregate_id=folder_id, type=FolderEventType.DELETED, payload={}),
-            session,
+    if folder is None:
+        return None
+    await create_event(
+        Event(
+            aggregate_id=folder_id,
+            type=FolderEventType.RESTORED,
+            payload=get_restored_payload(folder),
+            owner_id=owner_id,
+        ),
+        session,
+    )
+    return await job_services.create_job(
+        owner_id,
+        JobType.RESTORE_FOLDER_CONTENT,
+        {"folder_id": folder_id, "deleted_at": folder["deleted_at"]},
+        session,
+    )
+
+
+async def _move_notes_batch(
+    job: "dict[str, typing.Any]",
+    to_trash: bool,
+    batch_size: int,
+    session: "Session",
+) -> int:
+    """Move a batch of the notes of a folder to or out of the trash, along with
+    the folder. Stops once the folder has moved back.
+
+    Notes are trashed with the `deleted_at` of their folder, so restoring the
+    folder only restores them, not the notes trashed on their own before.
+    """
+    owner_id, folder_id = job["owner_id"], job["params"]["folder_id"]
+    deleted_at = job["params"]["deleted_at"]
+    if not await session.folders.find_one(
+        {
+            "_id": ObjectId(folder_id),
+            "owner_id": owner_id,
+            **({"deleted_at": deleted_at} if to_trash else LIVE_FILTER),
+        },
+        {"_id": 1},
+        session=session,
+    ):
+        return 0
+
+    notes = (
+        await session.notes.find(
+            {
+                "folder_id": folder_id,
+                "owner_id": owner_id,
+                **(LIVE_FILTER if to_trash else {"deleted_at": deleted_at}),
+            },
+            {"_id": 1} if to_trash else None,
+            session=session,
         )
+        .limit(batch_size)
+        .to_list()
+    )
+    if not notes:
+        return 0
+    await session.notes.update_many(
+        {"_id": {"$in": [note["_id"] for note in notes]}},
+        {
+            **(
+                {"$set": {"deleted_at": deleted_at}}
+                if to_trash
+                else {"$unset": {"deleted_at": ""}}
+            ),
+            "$inc": {"revision": 1},
+        },
+        session=session,
+    )
+    await create_events(
+        [
+            Event(
+                aggregate_id=note["_id"],
+                type=NoteEventType.DELETED if to_trash else NoteEventType.RESTORED,
+                payload={} if to_trash else get_restored_payload(note),
+                owner_id=owner_id,
+            )
+            for note in notes
+        ],
+        session,
+    )
+    await job_services.update_job(
+        job["_id"],
+        session,
+        progress={("trashed_notes" if to_trash else "restored_notes"): len(notes)},
+    )
+    return len(notes)
+
+
+async def _move_notes(
+    job: "dict[str, typing.Any]", client: "Client", to_trash: bool, batch_size: int
+) -> None:
+    # One transaction per batch, so none grows with the size of the folder and an
+    # interrupted job resumes where it stopped
+    async with await client.start_session() as session:
+        while await with_transaction(
+            session, lambda s: _move_notes_batch(job, to_trash, batch_size, s)
+        ):
+            pass
+
+
+@runner.handler(JobType.TRASH_FOLDER_CONTENT)
+async def trash_folder_content(
+    job: "dict[str, typing.Any]",
+    client: "Client",
+    batch_size: int = CONTENT_BATCH_SIZE,
+) -> None:
+    """Move the notes of a trashed folder to the trash, `batch_size` at a time"""
+    await _move_notes(job, client, True, batch_size)
+
+
+@runner.handler(JobType.RESTORE_FOLDER_CONTENT)
+async def restore_folder_content(
+    job: "dict[str, typing.Any]",
+    client: "Client",
+    batch_size: int = CONTENT_BATCH_SIZE,
+) -> None:
+    """Move the notes trashed along with a restored folder out of the trash,
+    `batch_size` at a time"""
+    await _move_notes(job, client, False, batch_size)
+
+
+async def get_trashed_folders(
+    owner_id: str,
+    session: "Session",
+    limit: int = 20,
+    cursor: "typing.Optional[pagination.Cursor]" = None,
+) -> "list[dict[str, typing.Any]]":
+    """Folders of an owner in the trash, most recently trashed first"""
+    query = {"owner_id": owner_id, **TRASHED_FILTER}
+    if cursor:
+        query.update(
+            pagination.keyset_filter(TRASH_SORT_KEY, cursor, pymongo.DESCENDING)
+        )
+    return (
+        await session.folders.find(query, session=session)
+        .sort(pagination.keyset_sort(TRASH_SORT_KEY, pymongo.DESCENDING))
+        .limit(limit)
+        .to_list()
+    )
 
 
 async def get_user_folder(
     user_id: str, folder_id: str, session: "Session"
 ) -> "typing.Optional[dict[str, typing.Any]]":
-    return await session.folders.find_one(
-        {"_id": ObjectId(folder_id), "owner_id": user_id}
+    """Folder of a given user out of the trash, or None. Read from the cache when
+    the session allows it, since nearly every request on notes checks the
+    folder."""
+    query = {"_id": ObjectId(folder_id), "owner_id": user_id, **LIVE_FILTER}
+
+    async def load() -> "typing.Optional[dict[str, typing.Any]]":
+        return await session.folders.find_one(query, session=session)
+
+    if not cache.is_cacheable(session):
+        return await load()
+    return await cache.cached(cache.FOLDER_NAMESPACE, user_id, folder_id, load)
+
+
+async def apply_folder_batch(
+    owner_id: str, operations: "list[dict[str, typing.Any]]", session: "Session"
+) -> "list[dict[str, typing.Any]]":
+    """Create, update and delete folders with a single `bulk_write`, and write
+    their events with a single insert. Must run in a transaction.
+
+    Args:
+        owner_id: Owner of the folders
+        operations: `create` operations with a `folder`, `update` operations with
+            an `id` and a `folder`, and `delete` operations with an `id`
+        session: Database session
+    Returns:
+        list: Result of each operation, in order. Those of `delete` operations,
+        which move folders to the trash, hold the `job` trashing their notes.
+    """
+    folder_ids = [
+        ObjectId(operation["id"])
+        for operation in operations
+        if operation["op"] != "create" and ObjectId.is_valid(operation["id"])
+    ]
+    existing_ids = set(
+        await session.folders.distinct(
+            "_id",
+            {"_id": {"$in": folder_ids}, "owner_id": owner_id, **LIVE_FILTER},
+            session=session,
+        )
     )
+
+    now = get_now_utc()
+    deleted_at = truncate_to_milliseconds(now)
+    requests, events, results = [], [], []
+    for index, operation in enumerate(operations):
+        result = {"index": index, "op": operation["op"], "id": operation.get("id")}
+        results.append(result)
+
+        if operation["op"] == "create":
+            folder = {**operation["folder"], "owner_id": owner_id}
+            document = {
+                **folder,
+                "_id": ObjectId(),
+                "created_at": now,
+                "revision": 0,
+            }
+            requests.append(InsertOne(document))
+            events.append(
+                Event(
+                    aggregate_id=document["_id"],
+                    type=FolderEventType.CREATED,
+                    payload=copy.deepcopy(folder),
+                    owner_id=owner_id,
+                )
+            )
+            result.update(id=document["_id"], status=BatchOperationStatus.CREATED.value)
+            continue
+
+        folder_id = operation["id"]
+        if not ObjectId.is_valid(folder_id) or ObjectId(folder_id) not in existing_ids:
+            result.update(status=BatchOperationStatus.NOT_FOUND.value)
+            continue
+
+        query = {"_id": ObjectId(folder_id), "owner_id": owner_id, **LIVE_FILTER}
+        if operation["op"] == "update":
+            folder = operation["folder"]
+            requests.append(
+                UpdateOne(
+                    query,
+                    {
+                        "$set": {**folder, "last_updated_at": now},
+                        "$inc": {"revision": 1},
+                    },
+                )
+            )
+            events.append(
+                Event(
+                    aggregate_id=folder_id,
+                    type=FolderEventType.UPDATED,
+                    payload=copy.deepcopy(folder),
+                    owner_id=owner_id,
+                )
+            )
+            result.update(status=BatchOperationStatus.UPDATED.value)
+        else:
+            requests.append(
+                UpdateOne(
+                    query,
+                    {"$set": {"deleted_at": deleted_at}, "$inc": {"revision": 1}},
+                )
+            )
+            events.append(
+                Event(
+                    aggregate_id=folder_id,
+                    type=FolderEventType.DELETED,
+                    payload={},
+                    owner_id=owner_id,
+                )
+            )
+            job = await job_services.create_job(
+                owner_id,
+                JobType.TRASH_FOLDER_CONTENT,
+                {"folder_id": folder_id, "deleted_at": deleted_at},
+                session,
+            )
+            result.update(status=BatchOperationStatus.DELETED.value, job=job)
+            existing_ids.discard(ObjectId(folder_id))
+
+    if requests:
+        await session.folders.bulk_write(requests, ordered=True, session=session)
+    await create_events(events, session)
+    return results
@@ -0,0 +1,4 @@
+API_PREFIX = "/api/jobs"
+# Seconds a runner holds a job for without renewing its lease. Jobs whose lease
+# expired are resumed by another runner.
+JOB_LEASE_SECONDS = 60
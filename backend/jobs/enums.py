@@ -0,0 +1,14 @@
+from enum import Enum
+
+
+class JobType(Enum):
+    TRASH_FOLDER_CONTENT = "TRASH_FOLDER_CONTENT"
+    RESTORE_FOLDER_CONTENT = "RESTORE_FOLDER_CONTENT"
+    EMPTY_TRASH = "EMPTY_TRASH"
+
+
+class JobStatus(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
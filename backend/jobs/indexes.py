@@ -0,0 +1,33 @@
+from pymongo import ASCENDING, IndexModel
+
+from database.indexes import QueryShape
+
+INDEXES = {
+    "jobs": [
+        IndexModel(
+            [("status", ASCENDING), ("lease_expires_at", ASCENDING)],
+            name="status_lease_expires_at",
+        ),
+    ],
+}
+
+# Indexes replaced by those above
+DROPPED_INDEXES = {"jobs": ["status"]}
+
+QUERY_SHAPES = [
+    QueryShape(
+        "jobs",
+        filter=("_id", "owner_id"),
+        description="jobs.services.get_user_job",
+    ),
+    QueryShape(
+        "jobs",
+        filter=("status",),
+        description="jobs.services.claim_expired_job",
+    ),
+    QueryShape(
+        "jobs",
+        filter=("status",),
+        description="jobs.services.get_unfinished_jobs",
+    ),
+]
@@ -0,0 +1,29 @@
+from typing import TYPE_CHECKING
+
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from core.auth import get_auth_user
+from database import get_read_session
+from jobs import constants, schemas, services
+
+if TYPE_CHECKING:
+    from core.auth import AuthUser
+    from database import Session
+
+router = APIRouter(prefix=constants.API_PREFIX)
+
+
+@router.get(
+    "/{job_id}",
+    description="Retrieve the status and progress of a given background Job",
+    response_model=schemas.JobRetrieve,
+)
+async def get_job(
+    job_id: str,
+    session: "Session" = Depends(get_read_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "schemas.JobRetrieve":
+    job = await services.get_user_job(auth_user.user_id, job_id, session)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return job
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+from bson import ObjectId
+
+from jobs import services
+from jobs.constants import JOB_LEASE_SECONDS
+from jobs.enums import JobStatus
+
+if TYPE_CHECKING:
+    from typing import Any, Awaitable, Callable, Optional
+
+    from database import Client
+    from jobs.enums import JobType
+
+    Handler = Callable[[dict[str, Any], Client], Awaitable[None]]
+
+logger = logging.getLogger(__name__)
+
+
+class JobRunner:
+    """Run jobs in the background.
+
+    A job is claimed before it runs: it is taken from pending to running
+    atomically, leased to this runner for `lease_seconds`, and its lease renewed
+    while it runs. Several processes can therefore run jobs without any job
+    running twice at the same time: a job whose lease was lost, e.g. because
+    renewals failed for longer than the lease, is cancelled. Jobs whose lease
+    expired, left unfinished by a stopped or crashed process, are claimed again
+    by `resume`, on start and then every `lease_seconds`.
+
+    Handlers must be idempotent: resumed jobs are run again from the start.
+    """
+
+    def __init__(self, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.id = str(ObjectId())
+        self.lease_seconds = lease_seconds
+        self._handlers: "dict[str, Handler]" = {}
+        self._tasks: "set[asyncio.Task]" = set()
+        self._client: "Optional[Client]" = None
+        self._resume_task: "Optional[asyncio.Task]" = None
+
+    def handler(self, job_type: "JobType") -> "Callable[[Handler], Handler]":
+        """Register the decorated function as the handler of a type of job"""
+
+        def register(handler: "Handler") -> "Handler":
+            self._handlers[job_type.value] = handler
+            return handler
+
+        return register
+
+    async def _renew_lease(
+        self, job: "dict[str, Any]", handling: "asyncio.Task"
+    ) -> None:
+        """Renew the lease of a job while it runs, or cancel it once the lease
+        is lost"""
+        async with await self._client.start_session() as session:
+            while True:
+                await asyncio.sleep(self.lease_seconds / 3)
+                try:
+                    renewed = await services.renew_lease(
+                        job["_id"], self.id, self.lease_seconds, session
+                    )
+                except Exception:
+                    logger.exception(f"Unable to renew the lease of job {job['_id']}")
+                    continue
+                if not renewed:
+                    logger.warning(
+                        f"Job {job['_id']} was claimed by another runner, cancelling it"
+                    )
+                    handling.cancel()
+                    return
+
+    async def _finish(
+        self,
+        job: "dict[str, Any]",
+        status: "JobStatus",
+        error: "Optional[str]" = None,
+    ) -> None:
+        async with await self._client.start_session() as session:
+            if not await services.update_job(
+                job["_id"], session, status, error=error, runner_id=self.id
+            ):
+                logger.warning(
+                    f"Job {job['_id']} was claimed by another runner before it finished"
+                )
+
+    async def _run(self, job: "dict[str, Any]") -> None:
+        handling = asyncio.create_task(self._handlers[job["type"]](job, self._client))
+        renewal = asyncio.create_task(self._renew_lease(job, handling))
+        try:
+            await handling
+        except asyncio.CancelledError:
+            if (
+                renewal.done()
+                and not renewal.cancelled()
+                and renewal.exception() is None
+            ):
+                # The lease was lost, the job is another runner's now
+                return
+            raise
+        except Exception as error:
+            logger.exception(f"Job {job['_id']} failed")
+            await self._finish(job, JobStatus.FAILED, str(error))
+        else:
+            await self._finish(job, JobStatus.DONE)
+        finally:
+            renewal.cancel()
+
+    async def _claim_and_run(self, job: "dict[str, Any]") -> None:
+        async with await self._client.start_session() as session:
+            job = await services.claim_job(
+                job["_id"], self.id, self.lease_seconds, session
+            )
+        if job is not None:
+            await self._run(job)
+
+    def _spawn(self, coroutine: "Awaitable[None]") -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def submit(self, job: "dict[str, Any]") -> None:
+        """Claim a pending job and run it, unless another runner claimed it"""
+        if self._client is None:
+            raise RuntimeError("The job runner was not started")
+        self._spawn(self._claim_and_run(job))
+
+    async def resume(self) -> int:
+        """Claim and run the unfinished jobs whose lease expired
+
+        Returns:
+            int: Number of resumed jobs
+        """
+        count = 0
+        async with await self._client.start_session() as session:
+            while job := await services.claim_expired_job(
+                self.id, self.lease_seconds, session
+            ):
+                self._spawn(self._run(job))
+                count += 1
+        if count:
+            logger.info(f"Resumed {count} unfinished jobs")
+        return count
+
+    async def _resume_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                await self.resume()
+            except Exception:
+                logger.exception("Unable to resume unfinished jobs")
+
+    async def start(self, client: "Client") -> None:
+        """Start running jobs, beginning with those left unfinished"""
+        self._client = client
+        await self.resume()
+        self._resume_task = asyncio.create_task(self._resume_periodically())
+
+    async def join(self) -> None:
+        """Wait for the running jobs to finish"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Cancel the running jobs, and release them to be resumed by another
+        runner, or on the next start"""
+        if self._resume_task is not None:
+            self._resume_task.cancel()
+            self._resume_task = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._client is not None:
+            async with await self._client.start_session() as session:
+                await services.release_jobs(self.id, session)
+        self._client = None
+
+
+runner = JobRunner()
@@ -0,0 +1,22 @@
+from typing import Optional
+
+from pydantic import AwareDatetime, BaseModel, ConfigDict, Field
+
+from core.schemas import StrObjectId
+
+
+class JobRetrieve(BaseModel):
+    id: StrObjectId = Field(
+        validation_alias="_id", examples=["db490d0c-8e01-4ee4-8c36-abad040a0a0c"]
+    )
+    type: str = Field(examples=["TRASH_FOLDER_CONTENT"])
+    status: str = Field(examples=["running"])
+    progress: dict[str, int] = Field(
+        description="Counters of the work done so far",
+        examples=[{"trashed_notes": 1500}],
+    )
+    error: Optional[str] = Field(default=None, examples=[None])
+    created_at: AwareDatetime = Field(examples=["2022-01-01T00:00:00Z"])
+    last_updated_at: AwareDatetime = Field(examples=["2022-01-01T00:00:05Z"])
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
@@ -0,0 +1,175 @@
+import typing
+from datetime import timedelta
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from core.utils import get_now_utc
+from jobs.enums import JobStatus
+
+if typing.TYPE_CHECKING:
+    from database import Session
+    from jobs.enums import JobType
+
+
+async def create_job(
+    owner_id: str,
+    job_type: "JobType",
+    params: "dict[str, typing.Any]",
+    session: "Session",
+) -> "dict[str, typing.Any]":
+    """Record a job to run in the background, see `jobs.runner`. Created in the
+    transaction of the change that needs it, so the job exists if and only if
+    the change was committed."""
+    now = get_now_utc()
+    document = {
+        "type": job_type.value,
+        "owner_id": owner_id,
+        "params": params,
+        "status": JobStatus.PENDING.value,
+        "progress": {},
+        "created_at": now,
+        "last_updated_at": now,
+    }
+    await session.jobs.insert_one(document, session=session)
+    return document
+
+
+async def get_user_job(
+    owner_id: str, job_id: str, session: "Session"
+) -> "typing.Optional[dict[str, typing.Any]]":
+    if not ObjectId.is_valid(job_id):
+        return None
+    return await session.jobs.find_one(
+        {"_id": ObjectId(job_id), "owner_id": owner_id}, session=session
+    )
+
+
+async def update_job(
+    job_id: "ObjectId",
+    session: "Session",
+    status: "typing.Optional[JobStatus]" = None,
+    progress: "typing.Optional[dict[str, int]]" = None,
+    error: "typing.Optional[str]" = None,
+    runner_id: "typing.Optional[str]" = None,
+) -> bool:
+    """Set the status of a job and increment its progress counters
+
+    Args:
+        runner_id: Runner the job must still be leased to for it to be updated,
+            so a runner that lost its lease cannot overwrite the status set by
+            the runner that claimed the job next
+
+    Returns:
+        bool: Whether the job was updated
+    """
+    query = {"_id": job_id}
+    if runner_id is not None:
+        query["runner_id"] = runner_id
+    update = {"$set": {"last_updated_at": get_now_utc()}}
+    if status is not None:
+        update["$set"]["status"] = status.value
+    if error is not None:
+        update["$set"]["error"] = error
+    if progress:
+        update["$inc"] = {f"progress.{key}": value for key, value in progress.items()}
+    result = await session.jobs.update_one(query, update, session=session)
+    return result.matched_count == 1
+
+
+async def get_unfinished_jobs(
+    owner_id: str, job_types: "list[JobType]", session: "Session"
+) -> "list[dict[str, typing.Any]]":
+    """Pending and running jobs of an owner, of the given types"""
+    return await session.jobs.find(
+        {
+            "status": {"$in": [JobStatus.PENDING.value, JobStatus.RUNNING.value]},
+            "owner_id": owner_id,
+            "type": {"$in": [job_type.value for job_type in job_types]},
+        },
+        session=session,
+    ).to_list()
+
+
+def _get_lease(runner_id: str, lease_seconds: float) -> "dict[str, typing.Any]":
+    return {
+        "runner_id": runner_id,
+        "lease_expires_at": get_now_utc() + timedelta(seconds=lease_seconds),
+    }
+
+
+async def claim_job(
+    job_id: "ObjectId", runner_id: str, lease_seconds: float, session: "Session"
+) -> "typing.Optional[dict[str, typing.Any]]":
+    """Take a pending job to run it, leased to a runner for `lease_seconds`
+
+    Returns:
+        dict: The claimed job, or None if another runner claimed it first
+    """
+    return await session.jobs.find_one_and_update(
+        {"_id": job_id, "status": JobStatus.PENDING.value},
+        {
+            "$set": {
+                "status": JobStatus.RUNNING.value,
+                "last_updated_at": get_now_utc(),
+                **_get_lease(runner_id, lease_seconds),
+            }
+        },
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+
+
+async def claim_expired_job(
+    runner_id: str, lease_seconds: float, session: "Session"
+) -> "typing.Optional[dict[str, typing.Any]]":
+    """Take an unfinished job whose lease expired, i.e. left by a stopped or
+    crashed runner, or never claimed, to run it again
+
+    Returns:
+        dict: The claimed job, or None if there is none left
+    """
+    return await session.jobs.find_one_and_update(
+        {
+            "status": {"$in": [JobStatus.PENDING.value, JobStatus.RUNNING.value]},
+            "$or": [
+                {"lease_expires_at": None},
+                {"lease_expires_at": {"$lte": get_now_utc()}},
+            ],
+        },
+        {
+            "$set": {
+                "status": JobStatus.RUNNING.value,
+                "last_updated_at": get_now_utc(),
+                **_get_lease(runner_id, lease_seconds),
+            }
+        },
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+
+
+async def renew_lease(
+    job_id: "ObjectId", runner_id: str, lease_seconds: float, session: "Session"
+) -> bool:
+    """Extend the lease of a running job
+
+    Returns:
+        bool: Whether the runner still holds the lease
+    """
+    result = await session.jobs.update_one(
+        {"_id": job_id, "runner_id": runner_id, "status": JobStatus.RUNNING.value},
+        {"$set": _get_lease(runner_id, lease_seconds)},
+        session=session,
+    )
+    return result.matched_count == 1
+
+
+async def release_jobs(runner_id: str, session: "Session") -> None:
+    """Expire the leases of the unfinished jobs of a stopping runner, so other
+    runners resume them without waiting for the leases to run out"""
+    await session.jobs.update_many(
+        {"runner_id": runner_id, "status": JobStatus.RUNNING.value},
+        {"$set": {"lease_expires_at": get_now_utc()}},
+        session=session,
+    )
@@ -9,10 +9,22 @@ from fastapi.responses import RedirectResponse
 
 from __version__ import __version__
 from core.routes import router as core_router
-from core import auth
-from database import close_connection
+from core import auth, pagination, revisions
+from core.dispatcher import dispatcher
+import cache
+import file_storage
+from database import close_connection, get_client
+from file_storage.routes import router as file_storage_router
 from folders.routes import router as folder_router
+from jobs.routes import router as job_router
+from jobs.runner import runner
+from notes import constants as note_constants
+from notes.routes import router as note_router
 from settings import settings
+from stream.broker import broker
+from stream.routes import router as stream_router
+from sync.routes import router as sync_router
+from trash.routes import router as trash_router
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +38,22 @@ logging.basicConfig(
 @asynccontextmanager
 async def lifespan(app: "FastAPI"):
     auth.init()
+    await auth.warm_up()
+    file_storage.init()
+    file_storage.images.init_pool()
+    cache.init()
+    dispatcher.subscribe(broker.publish)
+    dispatcher.subscribe_dropped(broker.resync)
+    dispatcher.start()
+    await runner.start(get_client())
     yield
+    await runner.stop()
+    await dispatcher.stop()
+    dispatcher.unsubscribe(broker.publish)
+    dispatcher.unsubscribe_dropped(broker.resync)
+    await cache.close()
+    await file_storage.close()
+    file_storage.images.close_pool()
     await close_connection()
 
 
@@ -40,23 +67,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        pagination.NEXT_CURSOR_HEADER,
+        revisions.ETAG_HEADER,
+        note_constants.SERVER_TIMING_HEADER,
+    ],
 )
-for router in [core_router, folder_router]:
+for router in [
+    core_router,
+    folder_router,
+    note_router,
+    sync_router,
+    stream_router,
+    job_router,
+    trash_router,
+    file_storage_router,
+]:
     app.include_router(router)
 
 
-if not settings.IS_PRODUCTION_ENV:
-    from os import makedirs
-    from fastapi.staticfiles import StaticFiles
-
-    makedirs(settings.UPLOAD_DIR_NAME, exist_ok=True)
-    app.mount(
-        f"/{settings.UPLOAD_DIR_NAME}",
-        StaticFiles(directory=settings.UPLOAD_DIR_NAME),
-        name=settings.UPLOAD_DIR_NAME,
-    )
-
-
 @app.get("/", include_in_schema=False)
 async def home() -> RedirectResponse:
     return RedirectResponse(url=DOCS_URL)
@@ -0,0 +1,22 @@
+import asyncio
+import logging
+
+import database
+from notes import services as note_services
+from trash import services as trash_services
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    """Periodic maintenance, to run on a schedule, e.g. hourly"""
+    async with await database.get_client().start_session() as session:
+        deleted_count = await note_services.collect_uploads(session)
+        logger.info(f"Deleted {deleted_count} images no note links to")
+        job_count = await trash_services.purge_expired_trash(session)
+        logger.info(f"Recorded {job_count} jobs purging expired trash")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
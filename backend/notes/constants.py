@@ -0,0 +1,15 @@
+API_PREFIX = "/api/notes"
+SORT_KEY = "last_updated_at"
+# Sort key of the search results, the relevance computed by the text index
+SEARCH_SORT_KEY = "score"
+SEARCH_SNIPPET_LENGTH = 160
+# Characters of the content previewed by the summary view of notes
+SUMMARY_PREVIEW_LENGTH = 160
+SERVER_TIMING_HEADER = "Server-Timing"
+# Maximum number of text operations of a delta update
+DELTA_MAX_OPERATIONS = 1000
+# Images are kept this long after they were uploaded, even if no note links to
+# them yet: notes only link to an image once saved after its upload
+IMAGE_UPLOAD_GRACE_SECONDS = 24 * 60 * 60
+# Uploads collected at a time, see `notes.services.collect_uploads`
+UPLOAD_COLLECTION_BATCH_SIZE = 500
@@ -0,0 +1,29 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any
+
+
+def apply_operations(content: str, operations: "list[dict[str, Any]]") -> str:
+    """Apply text operations to a content, in order.
+
+    Each operation deletes `delete` characters at `position`, then inserts
+    `insert` there. Positions and lengths are counted in Unicode code points, on
+    the content as left by the previous operations.
+
+    Raises:
+        ValueError: If an operation reaches past the end of the content
+    """
+    for index, operation in enumerate(operations):
+        position, delete = operation["position"], operation.get("delete", 0)
+        if position + delete > len(content):
+            raise ValueError(
+                f"Operation {index} is out of bounds of a {len(content)} "
+                "characters content"
+            )
+        content = (
+            content[:position]
+            + operation.get("insert", "")
+            + content[position + delete :]
+        )
+    return content
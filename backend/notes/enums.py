@@ -0,0 +1,6 @@
+from enum import Enum
+
+
+class NoteView(Enum):
+    FULL = "full"
+    SUMMARY = "summary"
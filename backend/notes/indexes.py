@@ -0,0 +1,135 @@
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+from database.indexes import QueryShape
+from trash.constants import LIVE_FILTER, TRASHED_FILTER
+
+INDEXES = {
+    "notes": [
+        IndexModel(
+            [
+                ("folder_id", ASCENDING),
+                ("owner_id", ASCENDING),
+                ("last_updated_at", ASCENDING),
+                ("_id", ASCENDING),
+            ],
+            name="live_folder_id_owner_id_last_updated_at",
+            partialFilterExpression=LIVE_FILTER,
+        ),
+        # Searches are scoped to an owner, so only their notes are scanned
+        IndexModel(
+            [("owner_id", ASCENDING), ("title", TEXT), ("content", TEXT)],
+            weights={"title": 5, "content": 1},
+            default_language="english",
+            name="live_owner_id_text",
+            partialFilterExpression=LIVE_FILTER,
+        ),
+        # Lists all the notes of an owner, to sync from scratch
+        IndexModel(
+            [("owner_id", ASCENDING), ("_id", ASCENDING)],
+            name="live_owner_id",
+            partialFilterExpression=LIVE_FILTER,
+        ),
+        # Multikey, to check whether any note still links to an image. Covers the
+        # trash too, whose notes may be restored.
+        IndexModel([("image_keys", ASCENDING)], name="image_keys"),
+        IndexModel(
+            [
+                ("owner_id", ASCENDING),
+                ("deleted_at", DESCENDING),
+                ("_id", DESCENDING),
+            ],
+            name="trashed_owner_id_deleted_at",
+            partialFilterExpression=TRASHED_FILTER,
+        ),
+        IndexModel(
+            [
+                ("folder_id", ASCENDING),
+                ("owner_id", ASCENDING),
+                ("deleted_at", ASCENDING),
+            ],
+            name="trashed_folder_id_owner_id_deleted_at",
+            partialFilterExpression=TRASHED_FILTER,
+        ),
+        # Finds the owners whose trash expired, to purge it
+        IndexModel(
+            [("deleted_at", ASCENDING)],
+            name="trashed_deleted_at",
+            partialFilterExpression=TRASHED_FILTER,
+        ),
+    ],
+    "uploads": [
+        IndexModel([("uploaded_at", ASCENDING)], name="uploaded_at"),
+    ],
+}
+
+# Indexes replaced by those above
+DROPPED_INDEXES = {
+    "notes": ["folder_id_owner_id_last_updated_at", "owner_id_text", "deleted_at_ttl"]
+}
+
+QUERY_SHAPES = [
+    QueryShape(
+        "notes",
+        filter=("folder_id", "owner_id"),
+        sort=(("last_updated_at", ASCENDING), ("_id", ASCENDING)),
+        description="notes.services.get_folder_notes",
+    ),
+    QueryShape(
+        "notes",
+        filter=("_id", "folder_id", "owner_id"),
+        description="notes.services.get_folder_note",
+    ),
+    QueryShape(
+        "notes",
+        filter=("_id", "folder_id", "owner_id", "revision"),
+        description="notes.services.apply_note_delta",
+    ),
+    QueryShape(
+        "notes",
+        filter=("owner_id",),
+        description="notes.services.search_notes",
+        text=True,
+    ),
+    QueryShape(
+        "notes",
+        filter=("owner_id",),
+        sort=(("_id", ASCENDING),),
+        description="sync.services.get_snapshot",
+    ),
+    QueryShape(
+        "notes",
+        filter=("image_keys",),
+        description="notes.services.delete_unreferenced_images",
+    ),
+    QueryShape(
+        "uploads",
+        filter=("_id",),
+        description="notes.services.delete_unreferenced_images uploads",
+    ),
+    QueryShape(
+        "uploads",
+        filter=("uploaded_at",),
+        description="notes.services.collect_uploads",
+    ),
+    QueryShape(
+        "notes",
+        filter=("owner_id",),
+        sort=(("deleted_at", DESCENDING), ("_id", DESCENDING)),
+        description="notes.services.get_trashed_notes",
+    ),
+    QueryShape(
+        "notes",
+        filter=("folder_id", "owner_id", "deleted_at"),
+        description="folders.services.restore_folder_content",
+    ),
+    QueryShape(
+        "notes",
+        filter=("owner_id", "deleted_at"),
+        description="trash.services.purge_trash",
+    ),
+    QueryShape(
+        "notes",
+        filter=("deleted_at",),
+        description="trash.services.purge_expired_trash",
+    ),
+]
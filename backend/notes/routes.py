@@ -0,0 +1,47 @@
+import logging
+import time
+from typing import TYPE_CHECKING
+
+from fastapi import APIRouter, Depends, Query, Response
+
+from core import pagination
+from core.auth import get_auth_user
+from database import get_secondary_session
+from notes import constants, schemas, services
+
+if TYPE_CHECKING:
+    from typing import Optional
+
+    from core.auth import AuthUser
+    from database import Session
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix=constants.API_PREFIX)
+
+
+@router.get(
+    "/search",
+    description="Search the Notes of the user by title and content, most relevant "
+    "first, given limit and cursor",
+    response_model=list[schemas.NoteSearchResult],
+)
+async def search_notes(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=256),
+    limit: int = Query(20, ge=1),
+    cursor: "Optional[pagination.Cursor]" = Depends(pagination.get_cursor),
+    session: "Session" = Depends(get_secondary_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> list["schemas.NoteSearchResult"]:
+    start = time.perf_counter()
+    notes = await services.search_notes(auth_user.user_id, q, session, limit, cursor)
+    duration = (time.perf_counter() - start) * 1000
+    logger.info(f"Searched {len(notes)} notes in {duration:.1f}ms")
+    response.headers[constants.SERVER_TIMING_HEADER] = f"search;dur={duration:.1f}"
+
+    if next_cursor := pagination.get_next_cursor(
+        notes, constants.SEARCH_SORT_KEY, limit
+    ):
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return notes
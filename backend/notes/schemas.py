@@ -1,8 +1,10 @@
-from typing import Optional
+from typing import Annotated, Literal, Optional, Union
 
 from pydantic import AwareDatetime, BaseModel, ConfigDict, Field
 
+from core.constants import BATCH_MAX_OPERATIONS
 from core.schemas import StrObjectId
+from notes.constants import DELTA_MAX_OPERATIONS
 
 
 class NoteCreate(BaseModel):
@@ -14,9 +16,6 @@ class NoteCreate(BaseModel):
 class NoteUpdate(BaseModel):
     title: Optional[str] = Field(default=None, examples=["My first note"])
     content: Optional[str] = Field(default=None, examples=["Once upon a time..."])
-    last_updated_at: Optional[AwareDatetime] = Field(
-        default=None, examples=["2022-01-01T00:00:00Z"]
-    )
     folder_id: Optional[StrObjectId] = Field(
         default=None, examples=["db490d0c-8e01-4ee4-8c36-abad040a0a0c"]
     )
@@ -37,11 +36,145 @@ class NoteRetrieve(BaseModel):
     created_at: Optional[AwareDatetime] = Field(
         examples=["2022-01-01T00:00:00Z"], default=None
     )
+    revision: int = Field(default=0, examples=[3])
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class NoteSummary(BaseModel):
+    id: StrObjectId = Field(
+        validation_alias="_id", examples=["db490d0c-8e01-4ee4-8c36-abad040a0a0c"]
+    )
+    title: str = Field(examples=["Vacations"])
+    last_updated_at: Optional[AwareDatetime] = Field(
+        default=None, examples=["2022-01-01T00:00:00Z"]
+    )
+    revision: int = Field(default=0, examples=[3])
+    preview: Optional[str] = Field(
+        default=None,
+        description="First characters of the content, if requested",
+        examples=["I will go to the beach."],
+    )
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class TextOperation(BaseModel):
+    position: int = Field(
+        ge=0,
+        description="Offset in the content, in Unicode code points, after the "
+        "previous operations",
+        examples=[16],
+    )
+    delete: int = Field(default=0, ge=0, description="Characters to delete")
+    insert: str = Field(default="", description="Text to insert", examples=["sea"])
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class NoteDelta(BaseModel):
+    revision: int = Field(
+        ge=0, description="Revision of the note the operations apply to", examples=[3]
+    )
+    title: Optional[str] = Field(default=None, examples=["My first note"])
+    operations: list[TextOperation] = Field(default=[], max_length=DELTA_MAX_OPERATIONS)
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class NoteDeltaResult(BaseModel):
+    revision: int = Field(examples=[4])
+    last_updated_at: AwareDatetime = Field(examples=["2022-01-01T00:00:00Z"])
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class ImageSource(BaseModel):
+    type: str = Field(examples=["image/webp"])
+    srcset: str = Field(
+        examples=[
+            "http://localhost:8000/uploads/variants/9f/86/9f86d081/320w.webp 320w, "
+            "http://localhost:8000/uploads/variants/9f/86/9f86d081/640w.webp 640w"
+        ]
+    )
 
     model_config = ConfigDict(extra="ignore", frozen=True)
 
 
 class ImageUpload(BaseModel):
-    path: str = Field(examples="uploads/db490d0c-8e01-4ee4-8c36-abad040a0a0c/image.png")
+    path: str = Field(
+        examples=[
+            "http://localhost:8000/uploads/blobs/9f/86/"
+            "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08.png"
+        ]
+    )
+    thumbnail: Optional[str] = Field(
+        default=None,
+        examples=[
+            "http://localhost:8000/uploads/variants/9f/86/9f86d081/thumbnail.webp"
+        ],
+    )
+    sources: list[ImageSource] = Field(
+        default=[], description="Responsive variants, most compact format first"
+    )
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class SearchSnippet(BaseModel):
+    field: Literal["title", "content"] = Field(examples=["content"])
+    text: str = Field(examples=["I will go to the beach."])
+    highlights: list[tuple[int, int]] = Field(
+        description="`(start, end)` offsets of the matched words in `text`",
+        examples=[[(16, 21)]],
+    )
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class NoteSearchResult(BaseModel):
+    id: StrObjectId = Field(
+        validation_alias="_id", examples=["db490d0c-8e01-4ee4-8c36-abad040a0a0c"]
+    )
+    title: str = Field(examples=["Vacations"])
+    folder_id: StrObjectId = Field(examples=["db490d0c-8e01-4ee4-8c36-abad040a0a0c"])
+    last_updated_at: Optional[AwareDatetime] = Field(
+        default=None, examples=["2022-01-01T00:00:00Z"]
+    )
+    score: float = Field(examples=[1.5])
+    snippets: list[SearchSnippet]
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class NoteBatchCreate(BaseModel):
+    op: Literal["create"]
+    note: NoteCreate
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class NoteBatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: str = Field(examples=["db490d0c-8e01-4ee4-8c36-abad040a0a0c"])
+    note: NoteUpdate
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class NoteBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: str = Field(examples=["db490d0c-8e01-4ee4-8c36-abad040a0a0c"])
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class NoteBatch(BaseModel):
+    operations: list[
+        Annotated[
+            Union[NoteBatchCreate, NoteBatchUpdate, NoteBatchDelete],
+            Field(discriminator="op"),
+        ]
+    ] = Field(min_length=1, max_length=BATCH_MAX_OPERATIONS)
 
     model_config = ConfigDict(extra="ignore", frozen=True)
@@ -0,0 +1,59 @@
+import re
+from typing import TYPE_CHECKING
+
+from notes.constants import SEARCH_SNIPPET_LENGTH
+
+if TYPE_CHECKING:
+    from typing import Any, Optional
+
+_WORD = re.compile(r"\w+")
+# Words prefixed by `-` are excluded from the results, so never highlighted
+_NEGATED_WORD = re.compile(r"(?:^|\s)-\"?(\w+)")
+
+
+def get_search_terms(query: str) -> "list[str]":
+    """Lowercased words of a text search query, without the negated ones"""
+    negated = {word.lower() for word in _NEGATED_WORD.findall(query)}
+    return [
+        word
+        for word in dict.fromkeys(word.lower() for word in _WORD.findall(query))
+        if word not in negated
+    ]
+
+
+def get_snippet(
+    text: str, terms: "list[str]", length: int = SEARCH_SNIPPET_LENGTH
+) -> "Optional[dict[str, Any]]":
+    """Excerpt of `text` around the first search term it contains
+
+    Words starting with a term are highlighted, as the text index also matches
+    other forms of a word (e.g. "run" matches "running").
+
+    Returns:
+        dict: `text` of the excerpt and `highlights`, the `(start, end)` offsets
+        of the matched words within it. None if no term appears in `text`.
+    """
+    if not text or not terms:
+        return None
+    pattern = re.compile(
+        r"\b(?:" + "|".join(map(re.escape, terms)) + r")\w*", re.IGNORECASE
+    )
+    first_match = pattern.search(text)
+    if not first_match:
+        return None
+
+    # Center the excerpt on the first match, then widen it to whole words
+    start = max(0, first_match.start() - (length - len(first_match.group())) // 2)
+    end = min(len(text), start + length)
+    start = max(0, end - length)
+    if start > 0 and (space := text.rfind(" ", 0, start)) != -1:
+        start = space + 1
+    if end < len(text) and (space := text.find(" ", end)) != -1:
+        end = space
+    excerpt = text[start:end]
+    return {
+        "text": excerpt,
+        "highlights": [
+            (match.start(), match.end()) for match in pattern.finditer(excerpt)
+        ],
+    }
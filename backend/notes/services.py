@@ -1,85 +1,710 @@
 import copy
 import typing
+from datetime import timedelta
 
+import pymongo
 from bson import ObjectId
+from pymongo import InsertOne, ReturnDocument, UpdateOne
 
-from core.enums import NoteEventType
-from core.events import Event
-from core.services import create_event
+import cache
+from core import pagination
+from core.enums import BatchOperationStatus, NoteEventType
+from core.events import Event, get_restored_payload
+from core.revisions import RevisionConflictError, get_revision_query
+from core.services import create_event, create_events
 from core.utils import get_now_utc
+from file_storage import get_storage, images
+from file_storage.base import find_blob_keys
+from notes import delta, search
+from notes.constants import (
+    IMAGE_UPLOAD_GRACE_SECONDS,
+    SEARCH_SORT_KEY,
+    SORT_KEY,
+    SUMMARY_PREVIEW_LENGTH,
+    UPLOAD_COLLECTION_BATCH_SIZE,
+)
+from notes.enums import NoteView
+from trash.constants import LIVE_FILTER, SORT_KEY as TRASH_SORT_KEY, TRASHED_FILTER
 
 if typing.TYPE_CHECKING:
     from database import Session
 
 
+class FolderInTrashError(Exception):
+    """The folder of a note is in the trash, so the note cannot be restored"""
+
+    def __init__(self, folder_id: str):
+        super().__init__(f"Folder {folder_id} is in the trash")
+        self.folder_id = folder_id
+
+
+def _get_note_query(
+    owner_id: str, note_id: str, folder_id: str
+) -> "dict[str, typing.Any]":
+    """Filter matching a note only if it belongs to the given owner and folder,
+    and is not in the trash, so the checks happen in the same operation as the
+    read/write."""
+    return {
+        "_id": ObjectId(note_id),
+        "folder_id": folder_id,
+        "owner_id": owner_id,
+        **LIVE_FILTER,
+    }
+
+
+def _get_image_keys(note: "dict[str, typing.Any]") -> "dict[str, typing.Any]":
+    """`image_keys` field of a note whose content is written, listing the blobs
+    it links to so they are only deleted once no note links to them"""
+    if "content" not in note:
+        return {}
+    return {"image_keys": find_blob_keys(note["content"])}
+
+
 async def create_note(
-    folder_id: str, note: "dict[str, typing.Any]", session: "Session"
+    owner_id: str, folder_id: str, note: "dict[str, typing.Any]", session: "Session"
 ) -> "dict[str, typing.Any]":
-    note.update({"folder_id": folder_id})
+    note.update({"folder_id": folder_id, "owner_id": owner_id})
     event_payload = copy.deepcopy(note)
-    document = {**note, "created_at": get_now_utc(), "last_updated_at": get_now_utc()}
-    insert_result = await session.notes.insert_one(document)
+    document = {
+        **note,
+        "created_at": get_now_utc(),
+        "last_updated_at": get_now_utc(),
+        "revision": 0,
+        **_get_image_keys(note),
+    }
+    insert_result = await session.notes.insert_one(document, session=session)
     if insert_result.inserted_id:
         await create_event(
             Event(
                 aggregate_id=insert_result.inserted_id,
                 type=NoteEventType.CREATED,
                 payload=event_payload,
+                owner_id=owner_id,
             ),
             session,
         )
     return document
 
 
+def get_summary_projection(preview: bool = False) -> "dict[str, typing.Any]":
+    """Projection of the summary view of notes: what lists of notes show, with
+    the first characters of the content as `preview` if requested, computed by
+    the server so the content is never sent"""
+    projection = {"title": 1, SORT_KEY: 1, "revision": 1}
+    if preview:
+        projection["preview"] = {
+            "$substrCP": [{"$ifNull": ["$content", ""]}, 0, SUMMARY_PREVIEW_LENGTH]
+        }
+    return projection
+
+
 async def get_folder_notes(
+    owner_id: str,
     folder_id: str,
     session: "Session",
     limit: int = 20,
     offset: int = 0,
+    cursor: "typing.Optional[pagination.Cursor]" = None,
+    view: "NoteView" = NoteView.FULL,
+    preview: bool = False,
 ) -> "list[dict[str, typing.Any]]":
-    return (
-        await session.notes.find(
-            {"folder_id": folder_id},
+    """Notes of a folder of a given owner, out of the trash
+
+    Args:
+        view: `FULL` for whole documents, `SUMMARY` for the fields of
+            `get_summary_projection`
+        preview: Whether the summary view includes a preview of the content
+    """
+    query = {"folder_id": folder_id, "owner_id": owner_id, **LIVE_FILTER}
+    if cursor:
+        query.update(pagination.keyset_filter(SORT_KEY, cursor))
+    # Each view of a page is cached apart
+    projection, variant = None, view.value
+    if view == NoteView.SUMMARY:
+        projection = get_summary_projection(preview)
+        variant += ":preview" if preview else ""
+
+    async def load() -> "list[dict[str, typing.Any]]":
+        return (
+            await session.notes.find(query, projection)
+            .sort(pagination.keyset_sort(SORT_KEY))
+            .limit(limit)
+            .skip(offset)
+            .to_list()
         )
-        .sort("last_updated_at")
-        .limit(limit)
-        .skip(offset)
-        .to_list()
+
+    # Only the first page is requested often enough to be worth caching
+    if cursor or offset or not cache.is_cacheable(session):
+        return await load()
+    return await cache.cached(
+        cache.NOTE_NAMESPACE, owner_id, f"list:{folder_id}:{limit}:{variant}", load
     )
 
 
 async def update_note(
-    note_id: str, folder_id: str, note: "dict[str, typing.Any]", session: "Session"
-) -> "dict[str, typing.Any]":
+    owner_id: str,
+    note_id: str,
+    folder_id: str,
+    note: "dict[str, typing.Any]",
+    session: "Session",
+    revision: "typing.Optional[int]" = None,
+) -> "typing.Optional[dict[str, typing.Any]]":
+    """Update a note of a given owner and folder
+
+    Args:
+        owner_id: Owner of the note
+        note_id: Id of the note
+        folder_id: Folder of the note
+        note: Fields to update
+        session: Database session
+        revision: Revision the note must be at, if any
+    Returns:
+        dict: Updated note, or None if the owner has no such note
+    Raises:
+        RevisionConflictError: If the note is not at `revision`
+    """
+    query = _get_note_query(owner_id, note_id, folder_id)
     event_payload = copy.deepcopy(note)
-    document = {**note, "last_updated_at": get_now_utc()}
+    document = await session.notes.find_one_and_update(
+        query if revision is None else {**query, **get_revision_query(revision)},
+        {
+            "$set": {
+                **note,
+                **_get_image_keys(note),
+                "last_updated_at": get_now_utc(),
+            },
+            "$inc": {"revision": 1},
+        },
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+    if document is None:
+        if revision is not None and (
+            current := await session.notes.find_one(
+                query, {"revision": 1}, session=session
+            )
+        ):
+            raise RevisionConflictError(current.get("revision", 0))
+        return None
+    await create_event(
+        Event(
+            aggregate_id=note_id,
+            type=NoteEventType.UPDATED,
+            payload=event_payload,
+            owner_id=owner_id,
+        ),
+        session,
+    )
+
+    return document
+
+
+async def apply_note_delta(
+    owner_id: str,
+    note_id: str,
+    folder_id: str,
+    note_delta: "dict[str, typing.Any]",
+    session: "Session",
+) -> "typing.Optional[dict[str, typing.Any]]":
+    """Apply text operations to the content of a note, and optionally replace its
+    title, if the note is still at the revision the operations were based on.
+
+    Only the operations are stored in the `NOTE_UPDATED` event, not the content.
+
+    Args:
+        owner_id: Owner of the note
+        note_id: Id of the note
+        folder_id: Folder of the note
+        note_delta: `revision`, `operations` (see `delta.apply_operations`) and
+            optional `title`
+        session: Database session
+    Returns:
+        dict: New `revision` and `last_updated_at`, or None if the owner has no
+        such note
+    Raises:
+        RevisionConflictError: If the note is at another revision
+        ValueError: If an operation is out of the bounds of the content
+    """
+    query = _get_note_query(owner_id, note_id, folder_id)
+    note = await session.notes.find_one(
+        query, {"content": 1, "revision": 1}, session=session
+    )
+    if note is None:
+        return None
+    revision = note.get("revision", 0)
+    if revision != note_delta["revision"]:
+        raise RevisionConflictError(revision)
+
+    operations = note_delta.get("operations", [])
+    changes = {}
+    if operations:
+        changes["content"] = delta.apply_operations(
+            note.get("content") or "", operations
+        )
+        changes.update(_get_image_keys(changes))
+    if note_delta.get("title") is not None:
+        changes["title"] = note_delta["title"]
+    document = {"revision": revision + 1, "last_updated_at": get_now_utc()}
+    update_result = await session.notes.update_one(
+        {**query, **get_revision_query(revision)},
+        {"$set": {**changes, **document}},
+        session=session,
+    )
+    if not update_result.matched_count:
+        # Updated between the read and the write
+        raise RevisionConflictError()
+
+    event_payload = {"revision": revision + 1}
+    if operations:
+        event_payload["operations"] = operations
+    if "title" in changes:
+        event_payload["title"] = changes["title"]
+    await create_event(
+        Event(
+            aggregate_id=note_id,
+            type=NoteEventType.UPDATED,
+            payload=event_payload,
+            owner_id=owner_id,
+        ),
+        session,
+    )
+    return document
+
+
+async def delete_note(
+    owner_id: str, note_id: str, folder_id: str, session: "Session"
+) -> bool:
+    """Move a note of a given owner and folder to the trash
+
+    Returns:
+        bool: Whether the note was trashed
+    """
     update_result = await session.notes.update_one(
-        {"_id": ObjectId(note_id), "folder_id": folder_id}, {"$set": document}
+        _get_note_query(owner_id, note_id, folder_id),
+        {"$set": {"deleted_at": get_now_utc()}, "$inc": {"revision": 1}},
+        session=session,
     )
     if update_result.modified_count:
         await create_event(
             Event(
-                aggregate_id=note_id, type=NoteEventType.UPDATED, payload=event_payload
+                aggregate_id=note_id,
+                type=NoteEventType.DELETED,
+                payload={},
+                owner_id=owner_id,
             ),
             session,
         )
+    return bool(update_result.modified_count)
 
-    return document
 
+async def restore_note(
+    owner_id: str, note_id: str, session: "Session"
+) -> "typing.Optional[dict[str, typing.Any]]":
+    """Move a note of a given owner out of the trash, back into its folder
+
+    Returns:
+        dict: Restored note, or None if the owner has no such note in the trash
+    Raises:
+        FolderInTrashError: If the folder of the note is in the trash
+    """
+    query = {"_id": ObjectId(note_id), "owner_id": owner_id, **TRASHED_FILTER}
+    note = await session.notes.find_one(query, {"folder_id": 1}, session=session)
+    if note is None:
+        return None
+    if not await _get_owned_folder_ids(owner_id, [note["folder_id"]], session):
+        raise FolderInTrashError(note["folder_id"])
 
-async def delete_note(note_id: str, folder_id: str, session: "Session") -> None:
-    delete_result = await session.notes.delete_one(
-        {"_id": ObjectId(note_id), "folder_id": folder_id}
+    document = await session.notes.find_one_and_update(
+        query,
+        {"$unset": {"deleted_at": ""}, "$inc": {"revision": 1}},
+        return_document=ReturnDocument.AFTER,
+        session=session,
     )
-    if delete_result.deleted_count:
-        await create_event(
-            Event(aggregate_id=note_id, type=NoteEventType.DELETED, payload={}), session
+    if document is None:
+        return None
+    await create_event(
+        Event(
+            aggregate_id=note_id,
+            type=NoteEventType.RESTORED,
+            payload=get_restored_payload(document),
+            owner_id=owner_id,
+        ),
+        session,
+    )
+    return document
+
+
+async def get_trashed_notes(
+    owner_id: str,
+    session: "Session",
+    limit: int = 20,
+    cursor: "typing.Optional[pagination.Cursor]" = None,
+) -> "list[dict[str, typing.Any]]":
+    """Notes of an owner in the trash, most recently trashed first. Includes
+    the notes trashed along with their folder."""
+    query = {"owner_id": owner_id, **TRASHED_FILTER}
+    if cursor:
+        query.update(
+            pagination.keyset_filter(TRASH_SORT_KEY, cursor, pymongo.DESCENDING)
         )
+    return (
+        await session.notes.find(query, session=session)
+        .sort(pagination.keyset_sort(TRASH_SORT_KEY, pymongo.DESCENDING))
+        .limit(limit)
+        .to_list()
+    )
 
 
 async def get_folder_note(
-    note_id: str, folder_id: str, session: "Session"
+    owner_id: str, note_id: str, folder_id: str, session: "Session"
 ) -> "typing.Optional[dict[str, typing.Any]]":
     return await session.notes.find_one(
-        {"_id": ObjectId(note_id), "folder_id": folder_id}
+        _get_note_query(owner_id, note_id, folder_id), session=session
+    )
+
+
+async def search_notes(
+    owner_id: str,
+    query: str,
+    session: "Session",
+    limit: int = 20,
+    cursor: "typing.Optional[pagination.Cursor]" = None,
+) -> "list[dict[str, typing.Any]]":
+    """Search the notes of an owner by title and content, most relevant first
+
+    Args:
+        owner_id: Owner of the notes
+        query: Text search query, see MongoDB's `$text` operator
+        session: Database session
+        limit: Maximum number of notes
+        cursor: Position of the last note of the previous page
+    Returns:
+        list: Notes with their relevance `score` and the `snippets` of their
+        title and content around the searched terms
+    """
+    pipeline = [
+        {
+            "$match": {
+                "owner_id": owner_id,
+                "$text": {"$search": query},
+                **LIVE_FILTER,
+            }
+        },
+        {"$addFields": {SEARCH_SORT_KEY: {"$meta": "textScore"}}},
+    ]
+    if cursor:
+        pipeline.append(
+            {
+                "$match": pagination.keyset_filter(
+                    SEARCH_SORT_KEY, cursor, pymongo.DESCENDING
+                )
+            }
+        )
+    pipeline += [
+        {"$sort": dict(pagination.keyset_sort(SEARCH_SORT_KEY, pymongo.DESCENDING))},
+        {"$limit": limit},
+    ]
+    notes = await session.notes.aggregate(pipeline, session=session).to_list()
+
+    terms = search.get_search_terms(query)
+    for note in notes:
+        note["snippets"] = [
+            {"field": field, **snippet}
+            for field in ("title", "content")
+            if (snippet := search.get_snippet(note.get(field), terms))
+        ]
+    return notes
+
+
+async def _get_existing_note_ids(
+    owner_id: str, folder_id: str, note_ids: "list[str]", session: "Session"
+) -> "set[ObjectId]":
+    return set(
+        await session.notes.distinct(
+            "_id",
+            {
+                "_id": {
+                    "$in": [ObjectId(_id) for _id in note_ids if ObjectId.is_valid(_id)]
+                },
+                "folder_id": folder_id,
+                "owner_id": owner_id,
+                **LIVE_FILTER,
+            },
+            session=session,
+        )
+    )
+
+
+async def _get_owned_folder_ids(
+    owner_id: str, folder_ids: "list[str]", session: "Session"
+) -> "set[str]":
+    if not folder_ids:
+        return set()
+    owned_folder_ids = await session.folders.distinct(
+        "_id",
+        {
+            "_id": {
+                "$in": [ObjectId(_id) for _id in folder_ids if ObjectId.is_valid(_id)]
+            },
+            "owner_id": owner_id,
+            **LIVE_FILTER,
+        },
+        session=session,
+    )
+    return {str(_id) for _id in owned_folder_ids}
+
+
+async def apply_note_batch(
+    owner_id: str,
+    folder_id: str,
+    operations: "list[dict[str, typing.Any]]",
+    session: "Session",
+) -> "list[dict[str, typing.Any]]":
+    """Create, update and delete notes of a folder with a single `bulk_write`,
+    and write their events with a single insert. Must run in a transaction.
+
+    Args:
+        owner_id: Owner of the folder
+        folder_id: Folder of the notes
+        operations: `create` operations with a `note`, `update` operations with
+            an `id` and a `note`, and `delete` operations with an `id`, which
+            move the note to the trash
+        session: Database session
+    Returns:
+        list: Result of each operation, in order
+    """
+    existing_ids = await _get_existing_note_ids(
+        owner_id,
+        folder_id,
+        [operation["id"] for operation in operations if operation["op"] != "create"],
+        session,
+    )
+    owned_folder_ids = await _get_owned_folder_ids(
+        owner_id,
+        [
+            operation["note"]["folder_id"]
+            for operation in operations
+            if operation["op"] == "update"
+            and operation["note"].get("folder_id") not in (None, folder_id)
+        ],
+        session,
+    )
+
+    now = get_now_utc()
+    requests, events, results = [], [], []
+    for index, operation in enumerate(operations):
+        result = {"index": index, "op": operation["op"], "id": operation.get("id")}
+        results.append(result)
+
+        if operation["op"] == "create":
+            note = {**operation["note"], "folder_id": folder_id, "owner_id": owner_id}
+            document = {
+                **note,
+                "_id": ObjectId(),
+                "created_at": now,
+                "last_updated_at": now,
+                "revision": 0,
+                **_get_image_keys(note),
+            }
+            requests.append(InsertOne(document))
+            events.append(
+                Event(
+                    aggregate_id=document["_id"],
+                    type=NoteEventType.CREATED,
+                    payload=copy.deepcopy(note),
+                    owner_id=owner_id,
+                )
+            )
+            result.update(id=document["_id"], status=BatchOperationStatus.CREATED.value)
+            continue
+
+        note_id = operation["id"]
+        new_folder_id = operation.get("note", {}).get("folder_id", folder_id)
+        if (
+            not ObjectId.is_valid(note_id)
+            or ObjectId(note_id) not in existing_ids
+            or new_folder_id not in (folder_id, *owned_folder_ids)
+        ):
+            result.update(status=BatchOperationStatus.NOT_FOUND.value)
+            continue
+
+        query = _get_note_query(owner_id, note_id, folder_id)
+        if operation["op"] == "update":
+            note = operation["note"]
+            requests.append(
+                UpdateOne(
+                    query,
+                    {
+                        "$set": {
+                            **note,
+                            **_get_image_keys(note),
+                            "last_updated_at": now,
+                        },
+                        "$inc": {"revision": 1},
+                    },
+                )
+            )
+            events.append(
+                Event(
+                    aggregate_id=note_id,
+                    type=NoteEventType.UPDATED,
+                    payload=copy.deepcopy(note),
+                    owner_id=owner_id,
+                )
+            )
+            result.update(status=BatchOperationStatus.UPDATED.value)
+            if new_folder_id != folder_id:
+                # Later operations of the batch can no longer find it in this folder
+                existing_ids.discard(ObjectId(note_id))
+        else:
+            requests.append(
+                UpdateOne(query, {"$set": {"deleted_at": now}, "$inc": {"revision": 1}})
+            )
+            events.append(
+                Event(
+                    aggregate_id=note_id,
+                    type=NoteEventType.DELETED,
+                    payload={},
+                    owner_id=owner_id,
+                )
+            )
+            result.update(status=BatchOperationStatus.DELETED.value)
+            existing_ids.discard(ObjectId(note_id))
+
+    if requests:
+        await session.notes.bulk_write(requests, ordered=True, session=session)
+    await create_events(events, session)
+    return results
+
+
+async def record_image_upload(key: str, session: "Session") -> None:
+    """Record that an image was just uploaded, or uploaded again, so it is not
+    deleted before the note it was uploaded for links to it"""
+    await session.uploads.update_one(
+        {"_id": key},
+        {"$set": {"uploaded_at": get_now_utc()}},
+        upsert=True,
+        session=session,
+    )
+
+
+async def delete_unreferenced_images(keys: "set[str]", session: "Session") -> int:
+    """Delete the blobs, and their variants, that no note links to anymore
+
+    Blobs are shared by every note with the same image, whoever uploaded it, so
+    they can only be deleted once none links to them. Blobs uploaded within
+    `IMAGE_UPLOAD_GRACE_SECONDS` are kept, since the note they were uploaded
+    for may not link to them yet: `collect_uploads` deletes them later.
+
+    Returns:
+        int: Number of deleted blobs
+    """
+    referenced = set(
+        await session.notes.distinct(
+            "image_keys", {"image_keys": {"$in": list(keys)}}, session=session
+        )
+    )
+    recently_uploaded = set(
+        await session.uploads.distinct(
+            "_id",
+            {
+                "_id": {"$in": list(keys)},
+                "uploaded_at": {
+                    "$gt": get_now_utc() - timedelta(seconds=IMAGE_UPLOAD_GRACE_SECONDS)
+                },
+            },
+            session=session,
+        )
+    )
+    storage = get_storage()
+    unreferenced = sorted(keys - referenced - recently_uploaded)
+    for key in unreferenced:
+        await images.delete_variants(storage, key)
+        await storage.delete(key)
+    if unreferenced:
+        await session.uploads.delete_many(
+            {"_id": {"$in": unreferenced}}, session=session
+        )
+    return len(unreferenced)
+
+
+async def collect_uploads(
+    session: "Session", batch_size: int = UPLOAD_COLLECTION_BATCH_SIZE
+) -> int:
+    """Delete the blobs uploaded before the grace period that no note links to,
+    e.g. kept by `delete_unreferenced_images` or never linked at all. The others
+    are deleted along with the last note linking to them.
+
+    Returns:
+        int: Number of deleted blobs
+    """
+    deleted_count = 0
+    query = {
+        "uploaded_at": {
+            "$lte": get_now_utc() - timedelta(seconds=IMAGE_UPLOAD_GRACE_SECONDS)
+        }
+    }
+    while uploads := (
+        await session.uploads.find(query, {"_id": 1}, session=session)
+        .limit(batch_size)
+        .to_list()
+    ):
+        keys = [upload["_id"] for upload in uploads]
+        deleted_count += await delete_unreferenced_images(set(keys), session)
+        # Unless uploaded again meanwhile
+        await session.uploads.delete_many(
+            {"_id": {"$in": keys}, **query}, session=session
+        )
+    return deleted_count
+
+
+async def backfill_image_keys(session: "Session", batch_size: int = 500) -> int:
+    """List the images linked by the notes that were written before notes
+    carried their `image_keys`
+
+    Returns:
+        int: Number of updated notes
+    """
+    updated_count = 0
+    cursor = session.notes.find(
+        {"image_keys": {"$exists": False}}, {"content": 1}
+    ).batch_size(batch_size)
+    requests = []
+    async for note in cursor:
+        requests.append(
+            UpdateOne(
+                {"_id": note["_id"]},
+                {"$set": {"image_keys": find_blob_keys(note.get("content"))}},
+            )
+        )
+        if len(requests) == batch_size:
+            updated_count += (await session.notes.bulk_write(requests)).modified_count
+            requests = []
+    if requests:
+        updated_count += (await session.notes.bulk_write(requests)).modified_count
+    return updated_count
+
+
+async def backfill_owner_ids(session: "Session") -> int:
+    """Copy the owner of each folder to its notes that were created before notes
+    carried an `owner_id`
+
+    Returns:
+        int: Number of updated notes
+    """
+    updated_count = 0
+    folder_ids = await session.notes.distinct(
+        "folder_id", {"owner_id": {"$exists": False}}
     )
+    for folder_id in folder_ids:
+        folder = await session.folders.find_one(
+            {"_id": ObjectId(folder_id)}, {"owner_id": 1}
+        )
+        if not folder:
+            continue
+        update_result = await session.notes.update_many(
+            {"folder_id": folder_id, "owner_id": {"$exists": False}},
+            {"$set": {"owner_id": folder["owner_id"]}},
+        )
+        updated_count += update_result.modified_count
+    return updated_count
@@ -1,10 +1,19 @@
 import asyncio
 import logging
+from importlib import import_module
 
 import database
+from database import indexes
+from notes import services as note_services
+from settings import settings
+from sync import services as sync_services
 
 logger = logging.getLogger(__name__)
 
+# Modules declaring the `INDEXES` and `QUERY_SHAPES` of their collections, and
+# optionally the `DROPPED_INDEXES` they replace
+INDEX_MODULES = ["core.indexes", "folders.indexes", "notes.indexes", "jobs.indexes"]
+
 
 async def check_db_connection() -> None:
     status = await database.check_connection()
@@ -13,5 +22,55 @@ async def check_db_connection() -> None:
         raise Exception("Unable to connect to the Database")
 
 
+async def create_indexes() -> None:
+    """Create the declared indexes, once the indexes they replace are dropped:
+    MongoDB refuses a second text index on a collection, or a second index with
+    the same keys under another name."""
+    db = database.get_client().db
+    for module in map(import_module, INDEX_MODULES):
+        await indexes.drop_indexes(db, getattr(module, "DROPPED_INDEXES", {}))
+        await indexes.apply_indexes(db, module.INDEXES)
+    logger.info("Database indexes are up to date")
+
+
+async def check_indexes() -> None:
+    """Make sure every query shape issued by the services is backed by an index.
+
+    Unsupported query shapes fail the start when `INDEX_CHECK_STRICT` is set,
+    otherwise they are only logged.
+    """
+    shapes = [
+        shape
+        for module in map(import_module, INDEX_MODULES)
+        for shape in module.QUERY_SHAPES
+    ]
+    existing_keys = await indexes.get_existing_keys(
+        database.get_client().db, {shape.collection for shape in shapes}
+    )
+    unsupported = indexes.find_unsupported_query_shapes(existing_keys, shapes)
+    for shape in unsupported:
+        logger.warning(f"No index supports the query {shape}")
+    if unsupported and settings.INDEX_CHECK_STRICT:
+        raise Exception(f"{len(unsupported)} queries are not supported by an index")
+
+
+async def migrate() -> None:
+    async with await database.get_client().start_session() as session:
+        if updated_count := await note_services.backfill_owner_ids(session):
+            logger.info(f"Added the owner to {updated_count} notes")
+        if updated_count := await note_services.backfill_image_keys(session):
+            logger.info(f"Listed the images of {updated_count} notes")
+        # Once notes have an owner, to copy it to their events
+        if updated_count := await sync_services.backfill_event_owner_ids(session):
+            logger.info(f"Added the owner to {updated_count} events")
+
+
+async def main() -> None:
+    await check_db_connection()
+    await create_indexes()
+    await check_indexes()
+    await migrate()
+
+
 if __name__ == "__main__":
-    asyncio.run(check_db_connection())
+    asyncio.run(main())
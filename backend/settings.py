@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -28,10 +29,50 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     RELOAD: bool = False
     ALLOWED_ORIGINS: list[str] = []
-    FILE_STORAGE_UPLOAD_PATH: str = "file_storage.upload_to_tmp"
+    FILE_STORAGE_BACKEND: str = "file_storage.MemoryStorage"
     UPLOAD_DIR_NAME: str = "uploads"
     UPLOAD_URL: str = "http://test:4000"
+    S3_ENDPOINT_URL: str = "https://s3.amazonaws.com"
+    S3_BUCKET: str = ""
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    S3_REGION: str = "us-east-1"
+    S3_PATH_STYLE: bool = True
+    S3_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024
+    S3_MULTIPART_CONCURRENCY: int = 4
+    S3_URL_EXPIRES_IN: int = 3600
+    IMAGE_PROCESS_POOL_SIZE: int = 2
     IS_PRODUCTION_ENV: bool = False
+    FIREBASE_PUBLIC_KEYS_URL: str = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+    AUTH_TOKEN_CACHE_SIZE: int = 10_000
+    INDEX_CHECK_STRICT: bool = False
+    # Connection pool of each process, e.g. of each uvicorn worker
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    # Wire compression, e.g. ["zstd", "snappy", "zlib"], in order of preference
+    MONGODB_COMPRESSORS: list[str] = []
+    # Reads of the listing and event routes, which tolerate to lag behind writes.
+    # Reads from secondaries are not cached (see `cache.is_cacheable`), so the
+    # cached first pages of Folders and Notes are read from the primary.
+    MONGODB_SECONDARY_READ_PREFERENCE: str = "secondaryPreferred"
+    MONGODB_SECONDARY_MAX_STALENESS_SECONDS: int = -1
+    MONGODB_SECONDARY_READ_CONCERN: Optional[str] = None
+    # Days events are kept in the events collection before being archived, by
+    # event type, and for the types without their own retention
+    EVENT_RETENTION_DAYS: dict[str, int] = {}
+    EVENT_DEFAULT_RETENTION_DAYS: int = 90
+    # Read-through cache of hot lookups and listings, see `cache`
+    CACHE_BACKEND: str = "cache.MemoryCache"
+    CACHE_MAX_SIZE: int = 10_000
+    CACHE_TTL_SECONDS: int = 60
+    # Generation counters expire once unused for this long, which must be longer
+    # than any value is cached for, see `cache`
+    CACHE_GENERATION_TTL_SECONDS: int = 24 * 60 * 60
+    CACHE_KEY_PREFIX: str = "cache:"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_REDIS_POOL_SIZE: int = 10
+    CACHE_REDIS_TIMEOUT_SECONDS: float = 1.0
 
     class Config:
         env_file = ".env"
@@ -57,7 +98,7 @@ class DevelopmentSettings(Settings):
             "FIREBASE_CLIENT_X509_CERT_URL", "client_x509_cert_url"
         ),
     )
-    FILE_STORAGE_UPLOAD_PATH: str = "file_storage.upload_to_fs"
+    FILE_STORAGE_BACKEND: str = "file_storage.FileSystemStorage"
     UPLOAD_URL: str = f"http://{HOST}:{PORT}"
 
 
@@ -72,7 +113,7 @@ class TestSettings(Settings):
         client_id="test_client_id",
         client_x509_cert_url="test_client_x509_cert_url",
     )
-    FILE_STORAGE_UPLOAD_PATH: str = "file_storage.upload_to_tmp"
+    FILE_STORAGE_BACKEND: str = "file_storage.MemoryStorage"
 
 
 def _get_settings() -> Settings:
@@ -0,0 +1,105 @@
+import asyncio
+from collections import defaultdict, deque
+from typing import TYPE_CHECKING
+
+from stream.constants import STREAM_QUEUE_MAX_SIZE
+
+if TYPE_CHECKING:
+    from typing import Any
+
+
+class Connection:
+    """Changes waiting to be sent to a connected client"""
+
+    def __init__(self, owner_id: str, max_queue_size: int = STREAM_QUEUE_MAX_SIZE):
+        self.owner_id = owner_id
+        self.max_queue_size = max_queue_size
+        self._changes: "deque[dict[str, Any]]" = deque()
+        self._resync = False
+        self._ready = asyncio.Event()
+
+    def push(self, event: "dict[str, Any]") -> None:
+        if self._resync:
+            # The client resyncs anyway, which covers this change
+            return
+        if len(self._changes) >= self.max_queue_size:
+            self.resync()
+        else:
+            self._changes.append(event)
+            self._ready.set()
+
+    def resync(self) -> None:
+        """Ask the client to resync, instead of sending the pending changes"""
+        self._changes.clear()
+        self._resync = True
+        self._ready.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for changes to send
+
+        Returns:
+            bool: Whether there are changes, False if `timeout` expired first
+        """
+        if self._ready.is_set():
+            return True
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def pop(self) -> "tuple[list[dict[str, Any]], bool]":
+        """Take the changes to send
+
+        Returns:
+            tuple: Pending events, and whether the client must resync instead
+            because some were dropped
+        """
+        changes, resync = list(self._changes), self._resync
+        self._changes.clear()
+        self._resync = False
+        self._ready.clear()
+        return changes, resync
+
+
+class ChangeBroker:
+    """Push committed events to the connected clients of their owner.
+
+    It subscribes to the event dispatcher, so it only sees the events of this
+    process. An idle connection only costs a `Connection`, and a client that
+    does not keep up is asked to resync rather than buffering its changes.
+    """
+
+    def __init__(self, max_queue_size: int = STREAM_QUEUE_MAX_SIZE):
+        self.max_queue_size = max_queue_size
+        self._connections: "defaultdict[str, set[Connection]]" = defaultdict(set)
+
+    def connect(self, owner_id: str) -> "Connection":
+        connection = Connection(owner_id, self.max_queue_size)
+        self._connections[owner_id].add(connection)
+        return connection
+
+    def disconnect(self, connection: "Connection") -> None:
+        connections = self._connections.get(connection.owner_id, set())
+        connections.discard(connection)
+        if not connections:
+            self._connections.pop(connection.owner_id, None)
+
+    @property
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self._connections.values())
+
+    async def publish(self, events: "list[dict[str, Any]]") -> None:
+        for event in events:
+            for connection in self._connections.get(event.get("owner_id"), ()):
+                connection.push(event)
+
+    def resync(self, events: "list[dict[str, Any]]") -> None:
+        """Ask the connected clients of the owners of events that will never be
+        published, e.g. dropped by the dispatcher, to resync"""
+        for owner_id in {event.get("owner_id") for event in events}:
+            for connection in self._connections.get(owner_id, ()):
+                connection.resync()
+
+
+broker = ChangeBroker()
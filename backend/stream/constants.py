@@ -0,0 +1,9 @@
+API_PREFIX = "/api/stream"
+# Seconds between two comments sent on an idle stream, so proxies keep it open
+STREAM_HEARTBEAT_SECONDS = 15
+# Changes buffered per connection before it is asked to resync instead
+STREAM_QUEUE_MAX_SIZE = 100
+# Milliseconds a client waits before reconnecting
+STREAM_RETRY_MILLISECONDS = 5000
+# Seconds a stream ticket can be redeemed within
+STREAM_TICKET_TTL_SECONDS = 30
@@ -0,0 +1,146 @@
+import json
+import time
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional
+
+from bson import ObjectId
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+import cache
+from core import auth, pagination
+from core.auth import get_auth_user, get_stream_auth_user
+from core.utils import get_now_utc
+from database import get_read_session
+from stream import constants, schemas
+from stream.broker import broker
+from sync import services as sync_services
+from sync.constants import SYNC_SETTLE_SECONDS
+
+if TYPE_CHECKING:
+    from typing import Any, AsyncIterator
+
+    from core.auth import AuthUser
+    from database import Session
+
+router = APIRouter(prefix=constants.API_PREFIX)
+
+RESYNC_MESSAGE = "event: resync\ndata: {}\n\n"
+# Sorts before the id of any event created at the same time
+_MIN_OBJECT_ID = ObjectId(b"\x00" * 12)
+
+
+def get_sync_token(event: "dict[str, Any]") -> str:
+    """Sync token to resume from after an event, with `GET /api/sync?since=`.
+
+    Events are published in commit order, so events committed later may have
+    been created earlier. Like sync, the token does not go past the settle
+    window: changes synced again are only returned in their current state.
+    """
+    settled_at = get_now_utc() - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    if event["created_at"] <= settled_at:
+        return pagination.encode_cursor(event["created_at"], event["_id"])
+    return pagination.encode_cursor(settled_at, _MIN_OBJECT_ID)
+
+
+def format_event(event: "dict[str, Any]") -> str:
+    """Server-Sent Event notifying a change. Its id is a sync token covering the
+    change (see `get_sync_token`)."""
+    data = {
+        "id": event["aggregate_id"],
+        "type": event["type"],
+        "created_at": event["created_at"].isoformat(),
+    }
+    if "revision" in event["payload"]:
+        data["revision"] = event["payload"]["revision"]
+    return (
+        f"id: {get_sync_token(event)}\n"
+        f"event: {event['type']}\n"
+        f"data: {json.dumps(data)}\n\n"
+    )
+
+
+async def replay(owner_id: str, last_event_id: str, session: "Session") -> str:
+    """Server-Sent Events of the changes since the id of the last event a client
+    received, or a `resync` event if they cannot all be replayed. Changes pushed
+    meanwhile may be sent twice."""
+    try:
+        since = pagination.decode_cursor(last_event_id, sort_value_types=(datetime,))
+        events = await sync_services.get_events_since(
+            owner_id, since, session, limit=constants.STREAM_QUEUE_MAX_SIZE
+        )
+    except (ValueError, sync_services.SyncTokenExpiredError):
+        return RESYNC_MESSAGE
+    if len(events) == constants.STREAM_QUEUE_MAX_SIZE:
+        return RESYNC_MESSAGE
+    return "".join(map(format_event, events))
+
+
+@router.post(
+    "/tickets",
+    description="Create a single-use ticket to open a stream with, for clients "
+    "that cannot send headers, e.g. `EventSource`, so the ID token is not sent "
+    "in the URL",
+    response_model=schemas.StreamTicket,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_ticket(
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "schemas.StreamTicket":
+    try:
+        ticket, expires_in = await auth.create_stream_ticket(
+            auth_user, constants.STREAM_TICKET_TTL_SECONDS
+        )
+    except cache.CACHE_ERRORS:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+    return {"ticket": ticket, "expires_in": expires_in}
+
+
+@router.get(
+    "",
+    description="Stream the changes of the Folders and Notes of the user, as "
+    "Server-Sent Events. A `resync` event means some changes were dropped and "
+    "should be fetched with a sync. An `expired` event means the ID token "
+    "expired: the stream is closed, and should be opened again with a new one. "
+    "Event ids are sync tokens, and the changes since `Last-Event-ID` are "
+    "replayed on reconnection.",
+    response_class=StreamingResponse,
+)
+async def stream_changes(
+    auth_user: "AuthUser" = Depends(get_stream_auth_user),
+    last_event_id: Optional[str] = Header(None),
+    session: "Session" = Depends(get_read_session),
+) -> "StreamingResponse":
+    # No database session is held, so idle connections cost next to nothing
+    async def serialize() -> "AsyncIterator[str]":
+        # Connected first, so no change is missed while replaying
+        connection = broker.connect(auth_user.user_id)
+        try:
+            yield f"retry: {constants.STREAM_RETRY_MILLISECONDS}\n\n"
+            if last_event_id and (
+                messages := await replay(auth_user.user_id, last_event_id, session)
+            ):
+                yield messages
+            while True:
+                timeout = constants.STREAM_HEARTBEAT_SECONDS
+                if auth_user.exp is not None:
+                    if (expires_in := auth_user.exp - time.time()) <= 0:
+                        yield "event: expired\ndata: {}\n\n"
+                        return
+                    timeout = min(timeout, expires_in)
+                if not await connection.wait(timeout):
+                    yield ": heartbeat\n\n"
+                    continue
+                events, resync = connection.pop()
+                if resync:
+                    yield RESYNC_MESSAGE
+                else:
+                    yield "".join(map(format_event, events))
+        finally:
+            broker.disconnect(connection)
+
+    return StreamingResponse(
+        serialize(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
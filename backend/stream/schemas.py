@@ -0,0 +1,8 @@
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class StreamTicket(BaseModel):
+    ticket: str = Field(examples=["Jv3ZtE9kQy0n8mH2xXcW5aLrB7uDfG1sPo4iTnYe6Kw"])
+    expires_in: int = Field(examples=[30])
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
@@ -0,0 +1,7 @@
+API_PREFIX = "/api/sync"
+# Maximum number of events read by a sync request
+SYNC_MAX_EVENTS = 1000
+# Events are only synced once they are this old. A transaction writes its events
+# with the time they were created but they only become visible on commit, so
+# more recent events could still be followed by older ones.
+SYNC_SETTLE_SECONDS = 5
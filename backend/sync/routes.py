@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pydantic import TypeAdapter
+
+from core import pagination
+from core.auth import get_auth_user
+from core.responses import ModelResponse
+from database import get_read_session
+from sync import constants, schemas, services
+
+if TYPE_CHECKING:
+    from core.auth import AuthUser
+    from database import Session
+
+router = APIRouter(prefix=constants.API_PREFIX)
+
+SYNC_RESULT = TypeAdapter(schemas.SyncResult)
+
+
+def get_since(
+    since: Optional[str] = Query(
+        None, description="Token returned by the previous sync"
+    ),
+) -> "Optional[pagination.Cursor]":
+    if since is None:
+        return None
+    try:
+        # Events are sorted by their creation time
+        return pagination.decode_cursor(since, sort_value_types=(datetime,))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid sync token"
+        )
+
+
+def get_snapshot_cursor(
+    cursor: Optional[str] = Query(
+        None,
+        description="Cursor of the next page of Folders and Notes, returned in the "
+        "`X-Next-Cursor` header when syncing without a token",
+    ),
+) -> "Optional[pagination.Cursor]":
+    if cursor is None:
+        return None
+    try:
+        collection, _id = pagination.decode_cursor(cursor, sort_value_types=(str,))
+    except ValueError:
+        collection = None
+    if collection not in services.SNAPSHOT_COLLECTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return collection, _id
+
+
+@router.get(
+    "",
+    description="Retrieve the Folders and Notes of the user created, updated and "
+    "deleted since a sync token. Without it, all of them are retrieved as created, "
+    "along with the token to sync the next changes from. They may then be paged: "
+    "while the `X-Next-Cursor` header is set, retrieve the next page with it, "
+    "then sync from the token of the first page.",
+    response_model=schemas.SyncResult,
+    responses={
+        status.HTTP_410_GONE: {"description": "Changes since the token were archived"}
+    },
+)
+async def sync(
+    response: Response,
+    limit: int = Query(constants.SYNC_MAX_EVENTS, ge=1, le=constants.SYNC_MAX_EVENTS),
+    since: "Optional[pagination.Cursor]" = Depends(get_since),
+    cursor: "Optional[pagination.Cursor]" = Depends(get_snapshot_cursor),
+    session: "Session" = Depends(get_read_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "schemas.SyncResult":
+    try:
+        changes = await services.get_changes(
+            auth_user.user_id, session, since, limit, cursor
+        )
+    except services.SyncTokenExpiredError:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync token expired, sync again without it",
+        )
+    if changes["cursor"]:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = pagination.encode_cursor(
+            *changes["cursor"]
+        )
+    return ModelResponse(
+        {
+            "folders": changes["folders"],
+            "notes": changes["notes"],
+            "token": (
+                pagination.encode_cursor(*changes["position"])
+                if changes["position"]
+                else None
+            ),
+            "has_more": changes["more"],
+        },
+        SYNC_RESULT,
+        headers=response.headers,
+    )
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from core.schemas import StrObjectId
+from folders.schemas import FolderRetrieve
+from notes.schemas import NoteRetrieve
+
+
+class FolderChanges(BaseModel):
+    created: list[FolderRetrieve]
+    updated: list[FolderRetrieve]
+    deleted: list[StrObjectId] = Field(
+        examples=[["db490d0c-8e01-4ee4-8c36-abad040a0a0c"]]
+    )
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class NoteChanges(BaseModel):
+    created: list[NoteRetrieve]
+    updated: list[NoteRetrieve]
+    deleted: list[StrObjectId] = Field(
+        examples=[["db490d0c-8e01-4ee4-8c36-abad040a0a0c"]]
+    )
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class SyncResult(BaseModel):
+    folders: FolderChanges
+    notes: NoteChanges
+    token: Optional[str] = Field(
+        description="Token to sync the next changes from, unless there were none yet",
+        examples=["WyIyMDIyLTAxLTAxVDAwOjAwOjAwWiIsIjY3YjEifQ"],
+    )
+    has_more: bool = Field(
+        description="Whether more changes are ready to sync right away",
+        examples=[False],
+    )
+
+    model_config = ConfigDict(extra="ignore", frozen=True)
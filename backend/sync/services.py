@@ -0,0 +1,247 @@
+import typing
+from datetime import timedelta
+
+import pymongo
+from bson import ObjectId
+
+from core import archive, pagination
+from core.enums import FolderEventType, NoteEventType
+from core.services import SORT_KEY
+from core.utils import get_now_utc
+from sync.constants import SYNC_MAX_EVENTS, SYNC_SETTLE_SECONDS
+from trash.constants import LIVE_FILTER
+
+if typing.TYPE_CHECKING:
+    from database import Session
+
+
+class SyncTokenExpiredError(Exception):
+    """Events after the sync token were archived, so the changes since it can no
+    longer be listed and the client must sync from scratch"""
+
+
+# Collections listed by a snapshot, in order
+SNAPSHOT_COLLECTIONS = ("folders", "notes")
+
+_FOLDER_EVENT_TYPES = {event_type.value for event_type in FolderEventType}
+_CREATED_EVENT_TYPES = {FolderEventType.CREATED.value, NoteEventType.CREATED.value}
+_DELETED_EVENT_TYPES = {FolderEventType.DELETED.value, NoteEventType.DELETED.value}
+_RESTORED_EVENT_TYPES = {
+    FolderEventType.RESTORED.value,
+    NoteEventType.RESTORED.value,
+}
+
+
+async def get_snapshot(
+    owner_id: str,
+    horizon: "pagination.Cursor",
+    session: "Session",
+    cursor: "typing.Optional[pagination.Cursor]" = None,
+    limit: int = SYNC_MAX_EVENTS,
+) -> "dict[str, typing.Any]":
+    """A page of the Folders and then the Notes of an owner out of the trash, as
+    created, to sync from scratch once events were archived: their creation may
+    have been, so reading the event log from its start would miss them.
+
+    The position returned is the archive `horizon`, so the next sync, once every
+    page was read, reads every event left after it. Those of the documents
+    already returned only return them again, in their current state.
+
+    Args:
+        owner_id: Owner of the Folders and Notes
+        horizon: Position of the most recent archived event
+        session: Database session
+        cursor: Collection and `_id` of the last document of the previous page
+        limit: Maximum number of documents
+    Returns:
+        dict: `created` `folders` and `notes`, the `position` to sync from next,
+        and the `cursor` of the next page, if there might be one
+    """
+    collection, after_id = cursor or (SNAPSHOT_COLLECTIONS[0], None)
+    snapshot = {
+        name: {"created": [], "updated": [], "deleted": []}
+        for name in SNAPSHOT_COLLECTIONS
+    }
+    next_cursor = None
+    for name in SNAPSHOT_COLLECTIONS[SNAPSHOT_COLLECTIONS.index(collection) :]:
+        query = {"owner_id": owner_id, **LIVE_FILTER}
+        if name == collection and after_id:
+            query["_id"] = {"$gt": after_id}
+        documents = (
+            await getattr(session, name)
+            .find(query, session=session)
+            .sort("_id", pymongo.ASCENDING)
+            .limit(limit)
+            .to_list()
+        )
+        snapshot[name]["created"] = documents
+        limit -= len(documents)
+        if not limit:
+            next_cursor = (name, documents[-1]["_id"])
+            break
+    return {**snapshot, "position": horizon, "more": True, "cursor": next_cursor}
+
+
+async def backfill_event_owner_ids(session: "Session") -> int:
+    """Copy the owner of each Folder and Note to its events that were written
+    before events carried an `owner_id`, since only those are synced.
+
+    The events of documents that no longer exist are left as they are: clients
+    syncing from scratch have no use for them.
+
+    Returns:
+        int: Number of updated events
+    """
+    updated_count = 0
+    aggregate_ids = await session.events.distinct(
+        "aggregate_id", {"owner_id": {"$exists": False}}
+    )
+    for aggregate_id in aggregate_ids:
+        if not ObjectId.is_valid(aggregate_id):
+            continue
+        query = {"_id": ObjectId(aggregate_id)}
+        document = await session.folders.find_one(
+            query, {"owner_id": 1}
+        ) or await session.notes.find_one(query, {"owner_id": 1})
+        if not document or "owner_id" not in document:
+            continue
+        update_result = await session.events.update_many(
+            {"aggregate_id": aggregate_id, "owner_id": {"$exists": False}},
+            {"$set": {"owner_id": document["owner_id"]}},
+        )
+        updated_count += update_result.modified_count
+    return updated_count
+
+
+async def get_events_since(
+    owner_id: str,
+    since: "pagination.Cursor",
+    session: "Session",
+    limit: int = SYNC_MAX_EVENTS,
+) -> "list[dict[str, typing.Any]]":
+    """Events of an owner after a position in the event log, oldest first, at
+    most `limit` of them. Unlike `get_changes`, unsettled events are included.
+
+    Raises:
+        SyncTokenExpiredError: If events after `since` were archived
+    """
+    horizon = await archive.get_horizon(session)
+    if horizon and since < horizon:
+        raise SyncTokenExpiredError()
+    return (
+        await session.events.find(
+            {
+                "$and": [
+                    {"owner_id": owner_id},
+                    pagination.keyset_filter(SORT_KEY, since),
+                ]
+            },
+            session=session,
+        )
+        .sort(pagination.keyset_sort(SORT_KEY))
+        .limit(limit)
+        .to_list()
+    )
+
+
+async def get_changes(
+    owner_id: str,
+    session: "Session",
+    since: "typing.Optional[pagination.Cursor]" = None,
+    limit: int = SYNC_MAX_EVENTS,
+    cursor: "typing.Optional[pagination.Cursor]" = None,
+) -> "dict[str, typing.Any]":
+    """Folders and Notes of an owner created, updated and deleted since a
+    position in the event log, at most `limit` events at a time.
+
+    Created and updated documents are returned in their current state, so each
+    is returned once however many times it changed. Documents both created and
+    deleted since `since` are left out. Documents restored from the trash are
+    returned as created, since the client dropped them when they were deleted.
+
+    Args:
+        owner_id: Owner of the Folders and Notes
+        session: Database session
+        since: Position of the last event of the previous sync. Without it, the
+            sync starts from the first event of the owner, or from a snapshot
+            once events were archived (see `get_snapshot`).
+        limit: Maximum number of events, or documents of a snapshot, to read
+        cursor: Position in the snapshot, without `since`
+    Returns:
+        dict: `created`, `updated` and `deleted` `folders` and `notes`, the
+        `position` of the last read event, or `since` if there were none,
+        whether there are `more` changes to sync, and the `cursor` of the next
+        page of the snapshot, if any
+    Raises:
+        SyncTokenExpiredError: If events after `since` were archived
+    """
+    horizon = await archive.get_horizon(session)
+    if horizon and not since:
+        return await get_snapshot(owner_id, horizon, session, cursor, limit)
+    if since and horizon and since < horizon:
+        raise SyncTokenExpiredError()
+
+    query = {
+        "owner_id": owner_id,
+        SORT_KEY: {"$lte": get_now_utc() - timedelta(seconds=SYNC_SETTLE_SECONDS)},
+    }
+    if since:
+        query = {"$and": [query, pagination.keyset_filter(SORT_KEY, since)]}
+    events = (
+        await session.events.find(
+            query, {"aggregate_id": 1, "type": 1, SORT_KEY: 1}, session=session
+        )
+        .sort(pagination.keyset_sort(SORT_KEY))
+        .limit(limit)
+        .to_list()
+    )
+
+    collections, created, restored, deleted = {}, set(), set(), set()
+    for event in events:
+        aggregate_id = event["aggregate_id"]
+        collections[aggregate_id] = (
+            "folders" if event["type"] in _FOLDER_EVENT_TYPES else "notes"
+        )
+        if event["type"] in _CREATED_EVENT_TYPES:
+            created.add(aggregate_id)
+        elif event["type"] in _RESTORED_EVENT_TYPES:
+            deleted.discard(aggregate_id)
+            restored.add(aggregate_id)
+        elif event["type"] in _DELETED_EVENT_TYPES:
+            restored.discard(aggregate_id)
+            if aggregate_id in created:
+                # The client never saw it
+                created.discard(aggregate_id)
+                del collections[aggregate_id]
+            else:
+                deleted.add(aggregate_id)
+    # The client dropped the restored documents when they were deleted
+    created |= restored
+
+    changes = {}
+    for collection in ("folders", "notes"):
+        changes[collection] = {"created": [], "updated": [], "deleted": []}
+        ids = [
+            ObjectId(aggregate_id)
+            for aggregate_id, aggregate_collection in collections.items()
+            if aggregate_collection == collection
+            and aggregate_id not in deleted
+            and ObjectId.is_valid(aggregate_id)
+        ]
+        if ids:
+            async for document in getattr(session, collection).find(
+                {"_id": {"$in": ids}, "owner_id": owner_id, **LIVE_FILTER},
+                session=session,
+            ):
+                status = "created" if str(document["_id"]) in created else "updated"
+                changes[collection][status].append(document)
+    for aggregate_id, collection in collections.items():
+        if aggregate_id in deleted:
+            changes[collection]["deleted"].append(aggregate_id)
+
+    return {
+        **changes,
+        "position": (events[-1][SORT_KEY], events[-1]["_id"]) if events else since,
+        "more": len(events) == limit,
+        "cursor": None,
+    }
@@ -2,9 +2,11 @@ from typing import TYPE_CHECKING
 import pytest_asyncio
 import pytest
 from httpx import ASGITransport, AsyncClient
+import cache
 from pytest_asyncio import is_async_test
 from core.auth import get_auth_user, AuthUser
 from database import get_client
+from jobs.runner import runner
 from main import app
 
 if TYPE_CHECKING:
@@ -28,6 +30,7 @@ async def cleanup(session: "Session"):
     async with session.start_transaction():
         for collection in await db.list_collection_names():
             await db[collection].delete_many({}, session=session)
+    await cache.get_cache().clear()
 
 
 @pytest_asyncio.fixture
@@ -47,4 +50,7 @@ async def client(auth_user) -> "AsyncGenerator[AsyncClient, None]":
         transport=ASGITransport(app=app), base_url="http://test"
     ) as ac:
         app.dependency_overrides[get_auth_user] = lambda: auth_user
+        await runner.start(get_client())
         yield ac
+        await runner.join()
+        await runner.stop()
@@ -0,0 +1,193 @@
+import json
+from datetime import timedelta
+
+import pytest
+from bson import ObjectId
+
+import file_storage
+from core import archive, replay
+from core.constants import API_PREFIX
+from core.enums import FolderEventType, NoteEventType
+from core.utils import get_now_utc
+from database import get_client
+from file_storage import MemoryStorage
+from folders import services as folder_services
+from notes import services as note_services
+from settings import settings
+from sync import services as sync_services
+from sync.constants import API_PREFIX as SYNC_API_PREFIX
+
+
+@pytest.fixture(autouse=True)
+def storage(monkeypatch):
+    storage = MemoryStorage(base_url="http://test/uploads")
+    monkeypatch.setattr(file_storage, "_storage", storage)
+    monkeypatch.setattr(settings, "EVENT_DEFAULT_RETENTION_DAYS", 30)
+    monkeypatch.setattr(
+        settings, "EVENT_RETENTION_DAYS", {NoteEventType.UPDATED.value: 7}
+    )
+    return storage
+
+
+async def insert_history(session, aggregate_id, days_ago, owner_id="test_id"):
+    now = get_now_utc()
+    await session.events.insert_many(
+        [
+            {
+                "aggregate_id": aggregate_id,
+                "type": event_type.value,
+                "payload": payload,
+                "owner_id": owner_id,
+                "created_at": now - timedelta(days=days),
+            }
+            for event_type, payload, days in zip(
+                (NoteEventType.CREATED, NoteEventType.UPDATED, NoteEventType.UPDATED),
+                ({"title": "Note"}, {"title": "Edited"}, {"content": "Content"}),
+                days_ago,
+            )
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test__archive_events__should_archive_events_past_retention(session, storage):
+    aggregate_id = str(ObjectId())
+    await insert_history(session, aggregate_id, days_ago=(40, 10, 1))
+
+    archived_count = await archive.archive_events(get_client(), segment_max_events=1)
+
+    events = await session.events.find().to_list()
+    segments = await session.event_segments.find().sort("last_created_at").to_list()
+
+    assert archived_count == 2
+    assert [event["payload"] for event in events] == [{"content": "Content"}]
+    assert [segment["count"] for segment in segments] == [1, 1]
+    assert segments[0]["aggregate_ids"] == [aggregate_id]
+    assert sorted(storage.files) == sorted(segment["key"] for segment in segments)
+    assert await replay.replay(aggregate_id, session) == {
+        "title": "Edited",
+        "content": "Content",
+    }
+
+
+@pytest.mark.asyncio
+async def test__archive_events__given_per_type_retention__should_keep_others(
+    session,
+):
+    aggregate_id = str(ObjectId())
+    await insert_history(session, aggregate_id, days_ago=(20, 10, 8))
+
+    await archive.archive_events(get_client())
+
+    events = await session.events.find().to_list()
+
+    assert [event["type"] for event in events] == [NoteEventType.CREATED.value]
+
+
+@pytest.mark.asyncio
+async def test__iter_archived_events__should_filter_newest_first(session):
+    aggregate_id, other_aggregate_id = str(ObjectId()), str(ObjectId())
+    await insert_history(session, aggregate_id, days_ago=(50, 45, 40))
+    await insert_history(session, other_aggregate_id, days_ago=(50, 45, 40))
+    await archive.archive_events(get_client(), segment_max_events=4)
+
+    batches = [
+        batch
+        async for batch in archive.iter_archived_events(
+            session, aggregate_id=aggregate_id, type=NoteEventType.UPDATED.value
+        )
+    ]
+
+    events = [event for batch in batches for event in batch]
+    assert [event["payload"] for event in events] == [
+        {"content": "Content"},
+        {"title": "Edited"},
+    ]
+    assert all(event["aggregate_id"] == aggregate_id for event in events)
+    assert isinstance(events[0]["_id"], ObjectId)
+
+
+@pytest.mark.asyncio
+async def test__stream_archived_events__should_return_ndjson(client, session):
+    aggregate_id = str(ObjectId())
+    await insert_history(session, aggregate_id, days_ago=(50, 45, 40))
+    await insert_history(
+        session, str(ObjectId()), days_ago=(50, 45, 40), owner_id="other_id"
+    )
+    await archive.archive_events(get_client())
+
+    response = await client.get(f"{API_PREFIX}/events/archive")
+
+    assert response.status_code == 200, response.text
+    assert [json.loads(line)["type"] for line in response.text.splitlines()] == [
+        NoteEventType.UPDATED.value,
+        NoteEventType.UPDATED.value,
+        NoteEventType.CREATED.value,
+    ]
+
+
+@pytest.mark.asyncio
+async def test__sync__given_token_before_archived_events__should_return_gone(
+    client, session, auth_user, monkeypatch
+):
+    monkeypatch.setattr(sync_services, "SYNC_SETTLE_SECONDS", 0)
+    await session.events.insert_one(
+        {
+            "aggregate_id": str(ObjectId()),
+            "type": FolderEventType.CREATED.value,
+            "payload": {"name": "Folder"},
+            "owner_id": auth_user.user_id,
+            "created_at": get_now_utc() - timedelta(days=60),
+        }
+    )
+    token = (await client.get(SYNC_API_PREFIX)).json()["token"]
+    await session.events.insert_one(
+        {
+            "aggregate_id": str(ObjectId()),
+            "type": FolderEventType.CREATED.value,
+            "payload": {"name": "Other folder"},
+            "owner_id": auth_user.user_id,
+            "created_at": get_now_utc() - timedelta(days=59),
+        }
+    )
+    await archive.archive_events(get_client())
+
+    response = await client.get(SYNC_API_PREFIX, params={"since": token})
+
+    assert response.status_code == 410
+
+
+@pytest.mark.asyncio
+async def test__sync__given_archived_events__should_resync_from_snapshot(
+    client, session, auth_user, monkeypatch
+):
+    monkeypatch.setattr(sync_services, "SYNC_SETTLE_SECONDS", 0)
+    folder = await folder_services.create_folder(
+        auth_user.user_id, {"name": "Folder"}, session
+    )
+    note = await note_services.create_note(
+        auth_user.user_id, str(folder["_id"]), {"title": "Note"}, session
+    )
+    for aggregate_id, days in ((folder["_id"], 60), (note["_id"], 59)):
+        await session.events.update_one(
+            {"aggregate_id": str(aggregate_id)},
+            {"$set": {"created_at": get_now_utc() - timedelta(days=days)}},
+        )
+    # Synced the Folder only, before the creation of both was archived
+    token = (await client.get(SYNC_API_PREFIX, params={"limit": 1})).json()["token"]
+    await archive.archive_events(get_client())
+    await note_services.update_note(
+        auth_user.user_id, note["_id"], str(folder["_id"]), {"title": "Edited"}, session
+    )
+
+    gone = await client.get(SYNC_API_PREFIX, params={"since": token})
+    snapshot = (await client.get(SYNC_API_PREFIX)).json()
+    changes = (
+        await client.get(SYNC_API_PREFIX, params={"since": snapshot["token"]})
+    ).json()
+
+    assert gone.status_code == 410
+    assert [f["name"] for f in snapshot["folders"]["created"]] == ["Folder"]
+    assert [n["title"] for n in snapshot["notes"]["created"]] == ["Edited"]
+    assert [n["title"] for n in changes["notes"]["updated"]] == ["Edited"]
+    assert changes["has_more"] is False
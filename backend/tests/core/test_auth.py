@@ -0,0 +1,212 @@
+import datetime
+import time
+
+import jwt
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+from core.auth import (
+    ISSUER_PREFIX,
+    KeysUnavailableError,
+    PublicKeyStore,
+    TokenCache,
+    TokenVerifier,
+)
+
+PROJECT_ID = "test_project_id"
+KEY_ID = "test_key_id"
+
+
+def generate_signing_key() -> "tuple[rsa.RSAPrivateKey, str]":
+    """Generate a private key and its self-signed certificate, standing in for
+    the keys Firebase signs ID tokens with."""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(private_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(private_key, hashes.SHA256())
+    )
+    return private_key, certificate.public_bytes(serialization.Encoding.PEM).decode()
+
+
+SIGNING_KEY, CERTIFICATE = generate_signing_key()
+
+
+def create_token(key_id: str = KEY_ID, **claims) -> str:
+    now = int(time.time())
+    payload = {
+        "iss": f"{ISSUER_PREFIX}{PROJECT_ID}",
+        "aud": PROJECT_ID,
+        "sub": "test_id",
+        "user_id": "test_id",
+        "name": "test_name",
+        "email": "test_email",
+        "iat": now,
+        "auth_time": now,
+        "exp": now + 3600,
+        **claims,
+    }
+    return jwt.encode(payload, SIGNING_KEY, algorithm="RS256", headers={"kid": key_id})
+
+
+@pytest.fixture
+def fetch_calls():
+    return []
+
+
+@pytest.fixture
+def verifier(fetch_calls):
+    async def fetch():
+        fetch_calls.append(time.monotonic())
+        return {KEY_ID: CERTIFICATE}, 3600
+
+    return TokenVerifier(
+        project_id=PROJECT_ID,
+        key_store=PublicKeyStore("http://test/keys", fetch=fetch),
+        cache=TokenCache(max_size=2),
+    )
+
+
+@pytest.mark.asyncio
+async def test__verify__given_valid_token__should_return_user(verifier):
+    auth_user = await verifier.verify(create_token())
+
+    assert auth_user.user_id == "test_id"
+    assert auth_user.email == "test_email"
+
+
+@pytest.mark.asyncio
+async def test__verify__given_same_token__should_fetch_keys_once(verifier, fetch_calls):
+    token = create_token()
+
+    await verifier.verify(token)
+    await verifier.verify(token)
+    await verifier.verify(create_token(name="other_name"))
+
+    assert len(fetch_calls) == 1
+
+
+@pytest.mark.asyncio
+async def test__verify__given_cached_token__should_not_decode_again(
+    verifier, monkeypatch
+):
+    token = create_token()
+    await verifier.verify(token)
+    monkeypatch.setattr(jwt, "decode", lambda *args, **kwargs: pytest.fail())
+
+    auth_user = await verifier.verify(token)
+
+    assert auth_user.user_id == "test_id"
+
+
+@pytest.mark.asyncio
+async def test__verify__given_expired_token__should_raise(verifier):
+    now = int(time.time())
+    token = create_token(iat=now - 7200, auth_time=now - 7200, exp=now - 3600)
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        await verifier.verify(token)
+
+
+@pytest.mark.asyncio
+async def test__verify__given_other_project_token__should_raise(verifier):
+    with pytest.raises(jwt.InvalidAudienceError):
+        await verifier.verify(create_token(aud="other_project_id"))
+
+
+@pytest.mark.asyncio
+async def test__verify__given_unknown_key__should_raise(verifier):
+    with pytest.raises(jwt.InvalidTokenError):
+        await verifier.verify(create_token(key_id="unknown_key_id"))
+
+
+@pytest.mark.asyncio
+async def test__verify__given_tampered_token__should_raise(verifier):
+    header, payload, signature = create_token().split(".")
+    other_payload = create_token(user_id="other_id").split(".")[1]
+
+    with pytest.raises(jwt.InvalidSignatureError):
+        await verifier.verify(".".join([header, other_payload, signature]))
+
+
+def create_verifier(fetch) -> "TokenVerifier":
+    return TokenVerifier(
+        project_id=PROJECT_ID,
+        key_store=PublicKeyStore("http://test/keys", fetch=fetch),
+        cache=TokenCache(max_size=2),
+    )
+
+
+async def fail_fetch():
+    raise OSError("Key host is down")
+
+
+@pytest.mark.asyncio
+async def test__verify__given_unavailable_keys__should_raise_keys_unavailable():
+    verifier = create_verifier(fail_fetch)
+
+    with pytest.raises(KeysUnavailableError):
+        await verifier.verify(create_token())
+
+
+@pytest.mark.asyncio
+async def test__verify__given_expired_keys_and_unavailable_host__should_keep_keys(
+    verifier,
+):
+    await verifier.verify(create_token())
+    verifier.key_store._expires_at = verifier.key_store._refresh_at = 0.0
+    verifier.key_store._fetch = fail_fetch
+
+    auth_user = await verifier.verify(create_token(name="other_name"))
+    await verifier.key_store._background_refresh
+
+    assert auth_user.user_id == "test_id"
+    assert await verifier.verify(create_token(name="third_name"))
+
+
+@pytest.mark.asyncio
+async def test__verify__given_no_max_age__should_not_fetch_keys_every_time(
+    fetch_calls,
+):
+    async def fetch():
+        fetch_calls.append(time.monotonic())
+        return {KEY_ID: CERTIFICATE}, 0
+
+    verifier = create_verifier(fetch)
+
+    await verifier.verify(create_token())
+    await verifier.verify(create_token(name="other_name"))
+    await verifier.verify(create_token(name="third_name"))
+
+    assert len(fetch_calls) == 1
+    assert verifier.key_store._background_refresh is None
+
+
+def test__token_cache__given_max_size__should_evict_least_recently_used():
+    cache = TokenCache(max_size=1)
+    expires_at = time.time() + 60
+
+    cache.set("first", "first_user", expires_at)
+    cache.set("second", "second_user", expires_at)
+
+    assert cache.get("first") is None
+    assert cache.get("second") == "second_user"
+
+
+def test__token_cache__given_expired_entry__should_miss():
+    cache = TokenCache(max_size=1)
+
+    cache.set("token", "user", time.time() - 1)
+
+    assert cache.get("token") is None
+    assert len(cache) == 0
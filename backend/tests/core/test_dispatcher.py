@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from core.dispatcher import EventDispatcher
+
+
+@pytest.mark.asyncio
+async def test__dispatch__should_hand_batches_to_subscribers():
+    dispatcher = EventDispatcher(batch_size=2)
+    batches = []
+
+    async def subscriber(events):
+        batches.append(events)
+
+    dispatcher.subscribe(subscriber)
+    dispatcher.publish([{"n": 1}, {"n": 2}, {"n": 3}])
+
+    assert dispatcher.queue_depth == 3
+    assert await dispatcher.dispatch() == 2
+    assert await dispatcher.dispatch() == 1
+    assert batches == [[{"n": 1}, {"n": 2}], [{"n": 3}]]
+    assert dispatcher.queue_depth == 0
+    assert dispatcher.get_metrics()["dispatched"] == 3
+
+
+@pytest.mark.asyncio
+async def test__publish__given_full_queue__should_drop_events():
+    dispatcher = EventDispatcher(max_queue_size=1)
+
+    dispatcher.publish([{"n": 1}, {"n": 2}])
+
+    metrics = dispatcher.get_metrics()
+    assert metrics["queue_depth"] == 1
+    assert metrics["published"] == 1
+    assert metrics["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test__publish__given_full_queue__should_hand_dropped_events_to_subscribers():
+    dispatcher = EventDispatcher(max_queue_size=1)
+    dropped = []
+    dispatcher.subscribe_dropped(dropped.append)
+
+    dispatcher.publish([{"n": 1}, {"n": 2}, {"n": 3}])
+
+    assert dropped == [[{"n": 2}, {"n": 3}]]
+
+
+@pytest.mark.asyncio
+async def test__dispatch__given_failing_subscriber__should_still_dispatch():
+    dispatcher = EventDispatcher()
+    batches = []
+
+    async def failing_subscriber(events):
+        raise RuntimeError
+
+    async def subscriber(events):
+        batches.append(events)
+
+    dispatcher.subscribe(failing_subscriber)
+    dispatcher.subscribe(subscriber)
+    dispatcher.publish([{"n": 1}])
+
+    await dispatcher.dispatch()
+
+    assert batches == [[{"n": 1}]]
+    assert dispatcher.get_metrics()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test__start__should_dispatch_in_background():
+    dispatcher = EventDispatcher()
+    dispatched = asyncio.Event()
+
+    async def subscriber(events):
+        dispatched.set()
+
+    dispatcher.subscribe(subscriber)
+    dispatcher.start()
+    dispatcher.publish([{"n": 1}])
+
+    await asyncio.wait_for(dispatched.wait(), timeout=1)
+    await dispatcher.stop()
+
+    assert dispatcher.queue_depth == 0
+    assert dispatcher.lag == 0.0
+
+
+@pytest.mark.asyncio
+async def test__stop__given_batch_being_dispatched__should_deliver_it():
+    dispatcher = EventDispatcher(batch_size=1)
+    started, release, batches = asyncio.Event(), asyncio.Event(), []
+
+    async def subscriber(events):
+        started.set()
+        await release.wait()
+        batches.append(events)
+
+    dispatcher.subscribe(subscriber)
+    dispatcher.start()
+    dispatcher.publish([{"n": 1}, {"n": 2}])
+    await asyncio.wait_for(started.wait(), timeout=1)
+
+    stopping = asyncio.create_task(dispatcher.stop())
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.wait_for(stopping, timeout=1)
+
+    assert batches == [[{"n": 1}], [{"n": 2}]]
+    assert dispatcher.queue_depth == 0
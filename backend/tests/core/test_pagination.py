@@ -0,0 +1,70 @@
+import base64
+from datetime import datetime, timezone
+
+import pymongo
+import pytest
+from bson import ObjectId
+
+from core import pagination
+
+
+def test__decode_cursor__given_encoded_cursor__should_return_position():
+    position = (datetime(2022, 1, 1, tzinfo=timezone.utc), ObjectId())
+
+    cursor = pagination.encode_cursor(*position)
+
+    assert pagination.decode_cursor(cursor) == position
+
+
+@pytest.mark.parametrize("cursor", ["", "invalid", "W10", "e30", "WzEsIDJd"])
+def test__decode_cursor__given_malformed_cursor__should_raise(cursor):
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(cursor)
+
+
+def encode_raw(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        '[1, {"$oid": "zz"}]',
+        '[{"$regularExpression": {"pattern": ".*", "options": ""}}, '
+        '{"$oid": "000000000000000000000000"}]',
+        '[{"$gt": 1}, {"$oid": "000000000000000000000000"}]',
+        '[true, {"$oid": "000000000000000000000000"}]',
+        '[{"$date": {"$numberLong": "99999999999999999999"}}, '
+        '{"$oid": "000000000000000000000000"}]',
+    ],
+)
+def test__decode_cursor__given_forged_cursor__should_raise(raw):
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(encode_raw(raw))
+
+
+def test__decode_cursor__given_unexpected_sort_value_type__should_raise():
+    cursor = pagination.encode_cursor("name", ObjectId())
+
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(cursor, sort_value_types=(datetime,))
+
+
+def test__keyset_filter__given_descending_sort__should_include_missing_sort_keys():
+    _id = ObjectId()
+
+    query = pagination.keyset_filter("created_at", (1, _id), pymongo.DESCENDING)
+
+    assert query == {
+        "$or": [
+            {"created_at": {"$lt": 1}},
+            {"created_at": 1, "_id": {"$lt": _id}},
+            {"created_at": None},
+        ]
+    }
+
+
+def test__get_next_cursor__given_partial_page__should_return_none():
+    documents = [{"_id": ObjectId(), "created_at": 1}]
+
+    assert pagination.get_next_cursor(documents, "created_at", limit=2) is None
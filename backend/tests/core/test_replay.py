@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from core import replay
+from core.enums import FolderEventType, NoteEventType
+from database import get_client
+
+
+async def insert_events(session, aggregate_id, events):
+    start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    offset = await session.events.count_documents({"aggregate_id": aggregate_id})
+    await session.events.insert_many(
+        [
+            {
+                "aggregate_id": aggregate_id,
+                "type": type.value,
+                "payload": payload,
+                "created_at": start + timedelta(seconds=offset + index),
+            }
+            for index, (type, payload) in enumerate(events)
+        ]
+    )
+
+
+def updates(count):
+    return [(NoteEventType.UPDATED, {"content": str(index)}) for index in range(count)]
+
+
+@pytest.mark.asyncio
+async def test__replay__given_events__should_rebuild_state(session):
+    aggregate_id = str(ObjectId())
+    await insert_events(
+        session,
+        aggregate_id,
+        [
+            (NoteEventType.CREATED, {"title": "Note", "content": "Content"}),
+            (NoteEventType.UPDATED, {"title": "Edited"}),
+        ],
+    )
+
+    state = await replay.replay(aggregate_id, session)
+
+    assert state == {"title": "Edited", "content": "Content"}
+
+
+@pytest.mark.asyncio
+async def test__replay__given_deleted_aggregate__should_return_none(session):
+    aggregate_id = str(ObjectId())
+    await insert_events(
+        session,
+        aggregate_id,
+        [
+            (FolderEventType.CREATED, {"name": "Folder"}),
+            (FolderEventType.DELETED, {}),
+        ],
+    )
+
+    assert await replay.replay(aggregate_id, session) is None
+
+
+@pytest.mark.asyncio
+async def test__replay__given_restored_aggregate__should_rebuild_state(session):
+    aggregate_id = str(ObjectId())
+    await insert_events(
+        session,
+        aggregate_id,
+        [
+            (FolderEventType.CREATED, {"name": "Folder"}),
+            (FolderEventType.DELETED, {}),
+            (FolderEventType.RESTORED, {"name": "Folder", "owner_id": "user123"}),
+        ],
+    )
+
+    assert await replay.replay(aggregate_id, session) == {
+        "name": "Folder",
+        "owner_id": "user123",
+    }
+
+
+@pytest.mark.asyncio
+async def test__replay__given_snapshot__should_only_read_later_events(
+    session, monkeypatch
+):
+    aggregate_id = str(ObjectId())
+    await insert_events(
+        session, aggregate_id, [(NoteEventType.CREATED, {"title": "Note"})]
+    )
+    await insert_events(session, aggregate_id, updates(24))
+    await replay.replay(aggregate_id, session, snapshot_interval=10)
+    await insert_events(session, aggregate_id, updates(3))
+    applied = []
+    apply_event = replay.apply_event
+    monkeypatch.setattr(
+        replay,
+        "apply_event",
+        lambda state, event: applied.append(event) or apply_event(state, event),
+    )
+
+    state = await replay.replay(aggregate_id, session, snapshot_interval=10)
+
+    assert len(applied) == 3
+    assert state == {"title": "Note", "content": "2"}
+    snapshot = await session.snapshots.find_one({"aggregate_id": aggregate_id})
+    assert snapshot["version"] == 25
+
+
+@pytest.mark.asyncio
+async def test__rebuild_all__should_snapshot_every_aggregate(session):
+    aggregate_ids = [str(ObjectId()) for _ in range(5)]
+    for aggregate_id in aggregate_ids:
+        await insert_events(
+            session, aggregate_id, [(NoteEventType.CREATED, {"title": aggregate_id})]
+        )
+
+    count = await replay.rebuild_all(get_client(), concurrency=2)
+
+    assert count == 5
+    snapshots = await session.snapshots.find().to_list()
+    assert sorted(snapshot["state"]["title"] for snapshot in snapshots) == sorted(
+        aggregate_ids
+    )
+
+
+@pytest.mark.asyncio
+async def test__replay__given_delta_updates__should_apply_operations(session):
+    aggregate_id = str(ObjectId())
+    await insert_events(
+        session,
+        aggregate_id,
+        [
+            (NoteEventType.CREATED, {"title": "Note", "content": "Hello world"}),
+            (
+                NoteEventType.UPDATED,
+                {
+                    "revision": 1,
+                    "operations": [{"position": 6, "delete": 5, "insert": "there"}],
+                },
+            ),
+        ],
+    )
+
+    state = await replay.replay(aggregate_id, session)
+
+    assert state == {"title": "Note", "content": "Hello there", "revision": 1}
@@ -0,0 +1,48 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+from pydantic import TypeAdapter, ValidationError
+
+from core.responses import ModelResponse
+from notes.schemas import NoteRetrieve
+
+NOTES = TypeAdapter(list[NoteRetrieve])
+
+
+def test__model_response__should_render_validated_content():
+    note_id, folder_id = ObjectId(), ObjectId()
+
+    response = ModelResponse(
+        [
+            {
+                "_id": note_id,
+                "title": "Note",
+                "folder_id": folder_id,
+                "created_at": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "owner_id": "user",
+            }
+        ],
+        NOTES,
+        headers={"ETag": 'W/"1"'},
+    )
+
+    assert response.media_type == "application/json"
+    assert response.headers["etag"] == 'W/"1"'
+    assert json.loads(response.body) == [
+        {
+            "id": str(note_id),
+            "title": "Note",
+            "content": None,
+            "folder_id": str(folder_id),
+            "last_updated_at": None,
+            "created_at": "2022-01-01T00:00:00Z",
+            "revision": 0,
+        }
+    ]
+
+
+def test__model_response__given_invalid_content__should_raise():
+    with pytest.raises(ValidationError):
+        ModelResponse([{"_id": ObjectId()}], NOTES)
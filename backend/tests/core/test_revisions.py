@@ -0,0 +1,40 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from core import revisions
+
+
+def test__get_etag__given_legacy_document__should_be_revision_0():
+    assert revisions.get_etag({"_id": ObjectId()}) == '"0"'
+
+
+def test__get_list_etag__given_updated_document__should_change():
+    documents = [{"_id": ObjectId(), "revision": 1}, {"_id": ObjectId()}]
+
+    etag = revisions.get_list_etag(documents)
+    documents[1]["revision"] = 1
+
+    assert etag.startswith('W/"')
+    assert revisions.get_list_etag(documents) != etag
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected",
+    [(None, False), ('"1"', False), ('"2"', True), ('"1", W/"2"', True), ("*", True)],
+)
+def test__matches__should_use_weak_comparison(if_none_match, expected):
+    assert revisions.matches(if_none_match, '"2"') is expected
+
+
+@pytest.mark.parametrize(
+    "if_match, expected", [(None, None), ("*", None), ('"0"', 0), (' "12" ', 12)]
+)
+def test__get_if_match_revision__should_parse_revision(if_match, expected):
+    assert revisions.get_if_match_revision(if_match) == expected
+
+
+@pytest.mark.parametrize("if_match", ["12", 'W/"12"', '"abc"'])
+def test__get_if_match_revision__given_invalid_etag__should_raise(if_match):
+    with pytest.raises(HTTPException):
+        revisions.get_if_match_revision(if_match)
@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from bson import ObjectId
 
@@ -14,6 +16,7 @@ async def test__get_events__should_return_ok(client, session):
             "content": "content",
             "folder_id": str(ObjectId()),
         },
+        "owner_id": "test_id",
         "created_at": "2022-01-01T00:00:00Z",
     }
     result = await session.events.insert_one(event)
@@ -22,4 +25,122 @@ async def test__get_events__should_return_ok(client, session):
 
     assert response.status_code == 200, response.text
     event.pop("_id")
+    event.pop("owner_id")
     assert response.json() == [{**event, "id": str(result.inserted_id)}]
+
+
+@pytest.mark.asyncio
+async def test__get_events__given_next_cursor__should_return_next_page(client, session):
+    await session.events.insert_many(
+        [
+            {
+                "aggregate_id": str(ObjectId()),
+                "type": "NOTE_CREATED",
+                "payload": {},
+                "owner_id": "test_id",
+                "created_at": f"2022-01-0{i}T00:00:00Z",
+            }
+            for i in range(1, 4)
+        ]
+    )
+
+    first_response = await client.get(f"{API_PREFIX}/events?limit=2")
+    next_cursor = first_response.headers["X-Next-Cursor"]
+    second_response = await client.get(
+        f"{API_PREFIX}/events?limit=2&cursor={next_cursor}"
+    )
+
+    assert second_response.status_code == 200, second_response.text
+    assert [event["created_at"] for event in second_response.json()] == [
+        "2022-01-01T00:00:00Z"
+    ]
+
+
+@pytest.mark.asyncio
+async def test__get_events__given_type_filter__should_return_matching_events(
+    client, session
+):
+    await session.events.insert_many(
+        [
+            {
+                "aggregate_id": str(ObjectId()),
+                "type": event_type,
+                "payload": {},
+                "owner_id": "test_id",
+                "created_at": "2022-01-01T00:00:00Z",
+            }
+            for event_type in ["NOTE_CREATED", "FOLDER_CREATED"]
+        ]
+    )
+
+    response = await client.get(f"{API_PREFIX}/events?type=FOLDER_CREATED")
+
+    assert response.status_code == 200, response.text
+    assert [event["type"] for event in response.json()] == ["FOLDER_CREATED"]
+
+
+@pytest.mark.asyncio
+async def test__get_events__given_other_owner_events__should_leave_out(client, session):
+    await session.events.insert_one(
+        {
+            "aggregate_id": str(ObjectId()),
+            "type": "NOTE_CREATED",
+            "payload": {},
+            "owner_id": "other_id",
+            "created_at": "2022-01-01T00:00:00Z",
+        }
+    )
+
+    response = await client.get(f"{API_PREFIX}/events")
+
+    assert response.status_code == 200, response.text
+    assert response.json() == []
+
+
+@pytest.mark.asyncio
+async def test__stream_events__should_return_ndjson(client, session):
+    await session.events.insert_many(
+        [
+            {
+                "aggregate_id": str(ObjectId()),
+                "type": "NOTE_CREATED",
+                "payload": {"title": f"Note {i}"},
+                "owner_id": owner_id,
+                "created_at": f"2022-01-0{i}T00:00:00Z",
+            }
+            for i in range(1, 4)
+            for owner_id in ["test_id", "other_id"]
+        ]
+    )
+
+    response = await client.get(f"{API_PREFIX}/events/stream")
+
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["payload"]["title"] for event in events] == [
+        "Note 3",
+        "Note 2",
+        "Note 1",
+    ]
+
+
+@pytest.mark.asyncio
+async def test__get_metrics__should_return_dispatcher_cache_and_pool_metrics(
+    client,
+):
+    response = await client.get(f"{API_PREFIX}/metrics")
+
+    assert response.status_code == 200
+    assert {"queue_depth", "lag_seconds", "published", "dropped"} <= set(
+        response.json()["events"]
+    )
+    assert set(response.json()["cache"]) == {
+        "hits",
+        "misses",
+        "evictions",
+        "hit_ratio",
+    }
+    assert {"connections", "in_use", "waiting", "average_wait_seconds"} <= set(
+        response.json()["database_pool"]
+    )
@@ -1,7 +1,12 @@
+from datetime import datetime, timezone
+
 import pytest
 from bson import ObjectId
 
 from core import services
+from core.dispatcher import dispatcher
+from core.enums import NoteEventType
+from core.events import Event
 
 
 @pytest.mark.asyncio
@@ -29,3 +34,157 @@ async def test__get_events__given_events__should_return_events(
     assert results[0]["type"] == event["type"]
     assert results[0]["payload"] == event["payload"]
     assert results[0]["_id"] == result.inserted_id
+
+
+@pytest.mark.asyncio
+async def test__get_events__given_filters__should_return_matching_events(session):
+    aggregate_id = str(ObjectId())
+    await session.events.insert_many(
+        [
+            {
+                "aggregate_id": aggregate_id,
+                "type": "NOTE_CREATED",
+                "created_at": datetime(2022, 1, 1, tzinfo=timezone.utc),
+            },
+            {
+                "aggregate_id": aggregate_id,
+                "type": "NOTE_UPDATED",
+                "created_at": datetime(2022, 1, 2, tzinfo=timezone.utc),
+            },
+            {
+                "aggregate_id": aggregate_id,
+                "type": "NOTE_UPDATED",
+                "created_at": datetime(2022, 1, 3, tzinfo=timezone.utc),
+            },
+            {
+                "aggregate_id": str(ObjectId()),
+                "type": "NOTE_UPDATED",
+                "created_at": datetime(2022, 1, 2, tzinfo=timezone.utc),
+            },
+        ]
+    )
+
+    results = await services.get_events(
+        session,
+        aggregate_id=aggregate_id,
+        type="NOTE_UPDATED",
+        created_after=datetime(2022, 1, 2, tzinfo=timezone.utc),
+        created_before=datetime(2022, 1, 3, tzinfo=timezone.utc),
+    )
+
+    assert len(results) == 1
+    assert results[0]["aggregate_id"] == aggregate_id
+    assert results[0]["created_at"] == datetime(2022, 1, 2, tzinfo=timezone.utc)
+
+
+@pytest.mark.asyncio
+async def test__get_events__given_cursor__should_return_older_events(session):
+    await session.events.insert_many(
+        [
+            {
+                "type": "NOTE_CREATED",
+                "created_at": datetime(2022, 1, i, tzinfo=timezone.utc),
+            }
+            for i in range(1, 6)
+        ]
+    )
+    first_page = await services.get_events(session, limit=2)
+    cursor = (first_page[-1]["created_at"], first_page[-1]["_id"])
+
+    second_page = await services.get_events(session, limit=2, cursor=cursor)
+
+    assert [event["created_at"].day for event in first_page] == [5, 4]
+    assert [event["created_at"].day for event in second_page] == [3, 2]
+
+
+@pytest.mark.asyncio
+async def test__iter_events__should_yield_all_events_in_batches(session):
+    await session.events.insert_many(
+        [
+            {
+                "type": "NOTE_CREATED",
+                "created_at": datetime(2022, 1, i, tzinfo=timezone.utc),
+            }
+            for i in range(1, 6)
+        ]
+    )
+
+    batches = [batch async for batch in services.iter_events(session, batch_size=2)]
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [event["created_at"].day for batch in batches for event in batch] == [
+        5,
+        4,
+        3,
+        2,
+        1,
+    ]
+
+
+@pytest.mark.asyncio
+async def test__with_transaction__should_write_events_once_and_publish(
+    session, monkeypatch
+):
+    published, inserts = [], []
+    monkeypatch.setattr(dispatcher, "publish", published.extend)
+    insert_many = session.events.insert_many
+
+    async def count_insert_many(documents, **kwargs):
+        inserts.append(len(documents))
+        return await insert_many(documents, **kwargs)
+
+    monkeypatch.setattr(session.events, "insert_many", count_insert_many)
+
+    async def callback(s):
+        for _ in range(3):
+            await services.create_event(
+                Event(aggregate_id=ObjectId(), type=NoteEventType.CREATED, payload={}),
+                s,
+            )
+        return "result"
+
+    result = await services.with_transaction(session, callback)
+
+    assert result == "result"
+    assert inserts == [3]
+    assert await session.events.count_documents({}) == 3
+    assert [event["_id"] for event in published] == [
+        event["_id"] for event in await session.events.find().to_list()
+    ]
+    assert session.outbox is None
+
+
+@pytest.mark.asyncio
+async def test__with_transaction__given_error__should_not_publish(session, monkeypatch):
+    published = []
+    monkeypatch.setattr(dispatcher, "publish", published.extend)
+
+    async def callback(s):
+        await services.create_event(
+            Event(aggregate_id=ObjectId(), type=NoteEventType.CREATED, payload={}), s
+        )
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        await services.with_transaction(session, callback)
+
+    assert not published
+    assert await session.events.count_documents({}) == 0
+    assert session.outbox is None
+
+
+@pytest.mark.asyncio
+async def test__create_events__given_no_transaction__should_publish(
+    session, monkeypatch
+):
+    published = []
+    monkeypatch.setattr(dispatcher, "publish", published.extend)
+
+    await services.create_event(
+        Event(aggregate_id=ObjectId(), type=NoteEventType.CREATED, payload={}),
+        session,
+    )
+
+    assert [event["_id"] for event in published] == [
+        event["_id"] for event in await session.events.find().to_list()
+    ]
@@ -1,6 +1,15 @@
+import hashlib
+import io
+from datetime import datetime, timezone
+
 import pytest
 from bson import ObjectId, errors
+from PIL import Image
+from core.utils import get_now_utc
+from database import get_secondary_session
 from folders.constants import API_PREFIX
+from main import app
+from notes.constants import SUMMARY_PREVIEW_LENGTH
 from tempfile import NamedTemporaryFile
 
 
@@ -11,7 +20,11 @@ async def test__create_folder__given_valid_payload__should_return_ok(client):
     response = await client.post(API_PREFIX, json=payload)
 
     assert response.status_code == 201, response.text
-    assert response.json() == {"name": payload["name"], "id": response.json()["id"]}
+    assert response.json() == {
+        "name": payload["name"],
+        "id": response.json()["id"],
+        "revision": 0,
+    }
 
 
 @pytest.mark.asyncio
@@ -54,7 +67,36 @@ async def test__get_folders__given_folders__should_return_ok(
     response = await client.get(API_PREFIX)
 
     assert response.status_code == 200
-    assert response.json() == [{"name": folder["name"], "id": str(result.inserted_id)}]
+    assert response.json() == [
+        {"name": folder["name"], "id": str(result.inserted_id), "revision": 0}
+    ]
+
+
+@pytest.mark.asyncio
+async def test__get_folders__given_secondary_reads__should_cache_first_page(
+    session, client, auth_user
+):
+    async def get_stale_session():
+        stale_session = await get_secondary_session()
+        stale_session.stale_reads = True
+        return stale_session
+
+    app.dependency_overrides[get_secondary_session] = get_stale_session
+    try:
+        await session.folders.insert_one(
+            {"name": "First", "owner_id": auth_user.user_id}
+        )
+        first = await client.get(API_PREFIX)
+        # Written behind the back of the cache, which is not invalidated
+        await session.folders.insert_one(
+            {"name": "Second", "owner_id": auth_user.user_id}
+        )
+        second = await client.get(API_PREFIX)
+    finally:
+        del app.dependency_overrides[get_secondary_session]
+
+    assert first.json() == second.json()
+    assert [folder["name"] for folder in second.json()] == ["First"]
 
 
 @pytest.mark.asyncio
@@ -69,12 +111,17 @@ async def test__get_folders_with_notes__given_no_folders__should_return_ok(clien
 async def test__delete_folder__given_existent_folder__should_return_ok(
     session,
     client,
+    auth_user,
 ):
-    result = await session.folders.insert_one({"name": "Test Folder"})
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
 
     response = await client.delete(f"{API_PREFIX}/{result.inserted_id}")
 
-    assert response.status_code == 204
+    assert response.status_code == 202, response.text
+    assert response.json()["type"] == "TRASH_FOLDER_CONTENT"
+    assert response.headers["location"] == f"/api/jobs/{response.json()['id']}"
 
 
 @pytest.mark.asyncio
@@ -217,6 +264,7 @@ async def test__get_notes__given_notes__should_return_ok(client, session, auth_u
         "content": "Content",
         "created_at": "2021-01-01T00:00:00Z",
         "folder_id": folder_id,
+        "owner_id": auth_user.user_id,
     }
     await session.notes.insert_one(note_payload)
 
@@ -230,6 +278,74 @@ async def test__get_notes__given_notes__should_return_ok(client, session, auth_u
     assert res_json[0]["folder_id"] == folder_id
 
 
+@pytest.mark.asyncio
+async def test__get_notes__given_summary_view__should_not_return_content(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    result = await session.notes.insert_one(
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
+            "last_updated_at": datetime(2021, 1, 1, tzinfo=timezone.utc),
+            "revision": 2,
+        }
+    )
+    url = f"{API_PREFIX}/{folder_id}/notes"
+
+    full = await client.get(url)
+    summary = await client.get(url, params={"view": "summary"})
+
+    assert summary.status_code == 200, summary.text
+    assert summary.json() == [
+        {
+            "id": str(result.inserted_id),
+            "title": "Note",
+            "last_updated_at": "2021-01-01T00:00:00Z",
+            "revision": 2,
+            "preview": None,
+        }
+    ]
+    assert summary.headers["etag"] != full.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test__get_notes__given_summary_view_with_preview__should_preview_content(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    await session.notes.insert_many(
+        [
+            {
+                "title": "Long",
+                "content": "é" * (SUMMARY_PREVIEW_LENGTH + 1),
+                "folder_id": folder_id,
+                "owner_id": auth_user.user_id,
+            },
+            {"title": "Empty", "folder_id": folder_id, "owner_id": auth_user.user_id},
+        ]
+    )
+
+    response = await client.get(
+        f"{API_PREFIX}/{folder_id}/notes",
+        params={"view": "summary", "preview": "true"},
+    )
+
+    assert response.status_code == 200, response.text
+    assert {note["title"]: note["preview"] for note in response.json()} == {
+        "Long": "é" * SUMMARY_PREVIEW_LENGTH,
+        "Empty": "",
+    }
+
+
 @pytest.mark.asyncio
 async def test__update_note__given_valid_payload__should_return_ok(
     client, session, auth_user
@@ -239,7 +355,12 @@ async def test__update_note__given_valid_payload__should_return_ok(
     )
     folder_id = str(result.inserted_id)
     result = await session.notes.insert_one(
-        {"title": "Note", "content": "Content", "folder_id": folder_id}
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
+        }
     )
     payload = {
         "title": "New Title for Note",
@@ -262,7 +383,12 @@ async def test__delete_note__given_existent_note__should_delete(
     )
     folder_id = str(result.inserted_id)
     result = await session.notes.insert_one(
-        {"title": "Note", "content": "Content", "folder_id": folder_id}
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
+        }
     )
 
     response = await client.delete(
@@ -285,6 +411,7 @@ async def test__get_notes__given_pagination__should_return_limited_results(
             "title": f"Note {i}",
             "content": "Content",
             "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
             "last_updated_at": f"2022-01-1{i}T00:00:00Z",
         }
         for i in range(4)
@@ -300,6 +427,27 @@ async def test__get_notes__given_pagination__should_return_limited_results(
     assert res_json[1]["title"] == "Note 2"
 
 
+@pytest.mark.asyncio
+async def test__get_notes__given_trashed_folder__should_return_404(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    # Still out of the trash, until the job trashing the Folder's content runs
+    await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": auth_user.user_id}
+    )
+    await session.folders.update_one(
+        {"_id": result.inserted_id}, {"$set": {"deleted_at": get_now_utc()}}
+    )
+
+    response = await client.get(f"{API_PREFIX}/{folder_id}/notes")
+
+    assert response.status_code == 404, response.text
+
+
 @pytest.mark.asyncio
 async def test__get_folder_notes__given_non_existent_folder__should_return_404(
     client,
@@ -389,6 +537,7 @@ async def test__get_notes__given_pagination_exceeding_notes__should_return_corre
             "title": f"Note {i}",
             "content": "Content",
             "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
             "last_updated_at": f"2022-01-1{i}T00:00:00Z",
         }
         for i in range(2)
@@ -411,7 +560,12 @@ async def test__upload_image_in_note__given_valid_payload__should_return_ok(
     )
     folder_id = str(result.inserted_id)
     result = await session.notes.insert_one(
-        {"title": "Note", "content": "Content", "folder_id": folder_id}
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
+        }
     )
     note_id = str(result.inserted_id)
 
@@ -426,9 +580,46 @@ async def test__upload_image_in_note__given_valid_payload__should_return_ok(
 
     assert response.status_code == 200, response.text
     res_json = response.json()
+    digest = hashlib.sha256(b"test image content").hexdigest()
     assert res_json == {
-        "path": f"http://test:4000/uploads/{auth_user.user_id}/test.jpg"
+        "path": f"http://test:4000/uploads/blobs/{digest[:2]}/{digest[2:4]}/{digest}.jpg",
+        "thumbnail": None,
+        "sources": [],
     }
+    assert await session.uploads.find_one(
+        {"_id": f"blobs/{digest[:2]}/{digest[2:4]}/{digest}.jpg"}
+    )
+
+
+@pytest.mark.asyncio
+async def test__upload_image_in_note__given_image__should_return_variants(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    result = await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": auth_user.user_id}
+    )
+    note_id = str(result.inserted_id)
+    image = io.BytesIO()
+    Image.new("RGB", (800, 600), "red").save(image, format="PNG")
+
+    response = await client.post(
+        f"{API_PREFIX}/{folder_id}/notes/{note_id}/images",
+        files={"image_file": ("image.png", image.getvalue(), "image/png")},
+    )
+
+    assert response.status_code == 200, response.text
+    res_json = response.json()
+    assert res_json["thumbnail"].endswith("/thumbnail.webp")
+    webp_source = next(
+        source for source in res_json["sources"] if source["type"] == "image/webp"
+    )
+    assert [
+        descriptor.split()[1] for descriptor in webp_source["srcset"].split(", ")
+    ] == ["320w", "640w"]
 
 
 @pytest.mark.asyncio
@@ -440,7 +631,12 @@ async def test__upload_image_in_note__given_not_note_owner__should_fail(
     )
     folder_id = str(result.inserted_id)
     result = await session.notes.insert_one(
-        {"title": "Note", "content": "Content", "folder_id": folder_id}
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": folder_id,
+            "owner_id": "other_user_id",
+        }
     )
     note_id = str(result.inserted_id)
 
@@ -465,7 +661,12 @@ async def test__upload_image_in_note__given_not_note_from_folder__should_fail(
     )
     folder_id = ObjectId()
     result = await session.notes.insert_one(
-        {"title": "Note", "content": "Content", "folder_id": folder_id}
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
+        }
     )
     note_id = str(result.inserted_id)
 
@@ -479,3 +680,415 @@ async def test__upload_image_in_note__given_not_note_from_folder__should_fail(
         )
 
     assert response.status_code == 404, response.text
+
+
+@pytest.mark.asyncio
+async def test__get_folders__given_next_cursor__should_return_next_page(
+    session, client, auth_user
+):
+    folders = [
+        {
+            "name": f"Folder {i}",
+            "created_at": f"2022-01-0{i}T00:00:00Z",
+            "owner_id": auth_user.user_id,
+        }
+        for i in range(3)
+    ]
+    await session.folders.insert_many(folders)
+
+    first_response = await client.get(f"{API_PREFIX}?limit=2")
+    next_cursor = first_response.headers["X-Next-Cursor"]
+    second_response = await client.get(f"{API_PREFIX}?limit=2&cursor={next_cursor}")
+
+    assert second_response.status_code == 200, second_response.text
+    assert [folder["name"] for folder in second_response.json()] == ["Folder 2"]
+    assert "X-Next-Cursor" not in second_response.headers
+
+
+@pytest.mark.asyncio
+async def test__get_folders__given_invalid_cursor__should_return_bad_request(client):
+    response = await client.get(f"{API_PREFIX}?cursor=invalid")
+
+    assert response.status_code == 400, response.text
+
+
+@pytest.mark.asyncio
+async def test__get_notes__given_next_cursor__should_return_next_page(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    notes = [
+        {
+            "title": f"Note {i}",
+            "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
+            "last_updated_at": f"2022-01-1{i}T00:00:00Z",
+        }
+        for i in range(3)
+    ]
+    await session.notes.insert_many(notes)
+
+    first_response = await client.get(f"{API_PREFIX}/{folder_id}/notes?limit=2")
+    next_cursor = first_response.headers["X-Next-Cursor"]
+    second_response = await client.get(
+        f"{API_PREFIX}/{folder_id}/notes?limit=2&cursor={next_cursor}"
+    )
+
+    assert second_response.status_code == 200, second_response.text
+    assert [note["title"] for note in second_response.json()] == ["Note 2"]
+
+
+@pytest.mark.asyncio
+async def test__update_note__given_move_to_unauthorized_folder__should_return_404(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    result = await session.folders.insert_one(
+        {"name": "Other Folder", "owner_id": "other_user_id"}
+    )
+    other_folder_id = str(result.inserted_id)
+    result = await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": auth_user.user_id}
+    )
+
+    response = await client.put(
+        f"{API_PREFIX}/{folder_id}/notes/{result.inserted_id}",
+        json={"folder_id": other_folder_id},
+    )
+
+    assert response.status_code == 404, response.text
+    note = await session.notes.find_one({"_id": result.inserted_id})
+    assert note["folder_id"] == folder_id
+
+
+@pytest.mark.asyncio
+async def test__delete_note__given_other_owner_note__should_return_404(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    result = await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": "other_user_id"}
+    )
+
+    response = await client.delete(
+        f"{API_PREFIX}/{folder_id}/notes/{result.inserted_id}"
+    )
+
+    assert response.status_code == 404, response.text
+    assert await session.notes.find_one({"_id": result.inserted_id})
+
+
+@pytest.mark.asyncio
+async def test__batch_folders__given_operations__should_return_results(
+    session, client, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    payload = {
+        "operations": [
+            {"op": "create", "folder": {"name": "New Folder"}},
+            {"op": "delete", "id": str(result.inserted_id)},
+            {"op": "delete", "id": str(ObjectId())},
+        ]
+    }
+
+    response = await client.post(f"{API_PREFIX}:batch", json=payload)
+
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == [
+        "created",
+        "deleted",
+        "not_found",
+    ]
+    assert results[0]["id"]
+
+
+@pytest.mark.asyncio
+async def test__batch_folders__given_no_operations__should_return_unprocessable(
+    client,
+):
+    response = await client.post(f"{API_PREFIX}:batch", json={"operations": []})
+
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test__batch_notes__given_operations__should_return_results(
+    session, client, auth_user
+):
+    folder = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    payload = {
+        "operations": [
+            {"op": "create", "note": {"title": "Note", "content": "Content"}},
+            {"op": "update", "id": str(ObjectId()), "note": {"title": "Edited"}},
+        ]
+    }
+
+    response = await client.post(
+        f"{API_PREFIX}/{folder.inserted_id}/notes:batch", json=payload
+    )
+
+    assert response.status_code == 200, response.text
+    assert [result["status"] for result in response.json()["results"]] == [
+        "created",
+        "not_found",
+    ]
+
+
+@pytest.mark.asyncio
+async def test__batch_notes__given_unowned_folder__should_return_not_found(
+    session, client
+):
+    folder = await session.folders.insert_one({"name": "Test Folder"})
+    payload = {"operations": [{"op": "create", "note": {"title": "Note"}}]}
+
+    response = await client.post(
+        f"{API_PREFIX}/{folder.inserted_id}/notes:batch", json=payload
+    )
+
+    assert response.status_code == 404
+    assert await session.notes.count_documents({}) == 0
+
+
+@pytest.mark.asyncio
+async def test__patch_note__given_current_revision__should_apply_operations(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    result = await session.notes.insert_one(
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
+            "revision": 2,
+        }
+    )
+    payload = {"revision": 2, "operations": [{"position": 7, "insert": "!"}]}
+
+    response = await client.patch(
+        f"{API_PREFIX}/{folder_id}/notes/{result.inserted_id}", json=payload
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["revision"] == 3
+    note = await session.notes.find_one({"_id": result.inserted_id})
+    assert note["content"] == "Content!"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "payload, status_code",
+    [
+        ({"revision": 1, "operations": [{"position": 0, "insert": "!"}]}, 409),
+        ({"revision": 2, "operations": [{"position": 8, "insert": "!"}]}, 422),
+    ],
+)
+async def test__patch_note__given_invalid_delta__should_fail(
+    client, session, auth_user, payload, status_code
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    result = await session.notes.insert_one(
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
+            "revision": 2,
+        }
+    )
+
+    response = await client.patch(
+        f"{API_PREFIX}/{folder_id}/notes/{result.inserted_id}", json=payload
+    )
+
+    assert response.status_code == status_code, response.text
+    note = await session.notes.find_one({"_id": result.inserted_id})
+    assert note["content"] == "Content"
+    assert note["revision"] == 2
+
+
+@pytest.mark.asyncio
+async def test__patch_note__given_non_existent_note__should_return_404(client):
+    response = await client.patch(
+        f"{API_PREFIX}/{ObjectId()}/notes/{ObjectId()}", json={"revision": 0}
+    )
+
+    assert response.status_code == 404, response.text
+
+
+@pytest.mark.asyncio
+async def test__get_folder__given_matching_etag__should_return_not_modified(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id, "revision": 2}
+    )
+
+    response = await client.get(f"{API_PREFIX}/{result.inserted_id}")
+    not_modified = await client.get(
+        f"{API_PREFIX}/{result.inserted_id}",
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["revision"] == 2
+    assert response.headers["etag"] == '"2"'
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+@pytest.mark.asyncio
+async def test__update_folder__given_if_match__should_update_only_current_revision(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    url = f"{API_PREFIX}/{result.inserted_id}"
+
+    response = await client.put(
+        url, json={"name": "First"}, headers={"If-Match": '"0"'}
+    )
+    conflict = await client.put(
+        url, json={"name": "Second"}, headers={"If-Match": '"0"'}
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.headers["etag"] == '"1"'
+    assert conflict.status_code == 409, conflict.text
+    folder = await session.folders.find_one({"_id": result.inserted_id})
+    assert folder["name"] == "First"
+
+
+@pytest.mark.asyncio
+async def test__get_notes__given_unchanged_page__should_return_not_modified(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    result = await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": auth_user.user_id}
+    )
+    url = f"{API_PREFIX}/{folder_id}/notes"
+    etag = (await client.get(url)).headers["etag"]
+
+    not_modified = await client.get(url, headers={"If-None-Match": etag})
+    await client.put(f"{url}/{result.inserted_id}", json={"title": "New"})
+    modified = await client.get(url, headers={"If-None-Match": etag})
+
+    assert not_modified.status_code == 304
+    assert modified.status_code == 200
+    assert modified.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test__get_note__given_existent_note__should_return_etag(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    result = await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": auth_user.user_id}
+    )
+
+    response = await client.get(f"{API_PREFIX}/{folder_id}/notes/{result.inserted_id}")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["title"] == "Note"
+    assert response.headers["etag"] == '"0"'
+
+
+@pytest.mark.asyncio
+async def test__get_note__given_other_folder__should_return_404(
+    client, session, auth_user
+):
+    result = await session.notes.insert_one(
+        {"title": "Note", "folder_id": str(ObjectId()), "owner_id": auth_user.user_id}
+    )
+
+    response = await client.get(f"{API_PREFIX}/{ObjectId()}/notes/{result.inserted_id}")
+
+    assert response.status_code == 404, response.text
+
+
+@pytest.mark.asyncio
+async def test__update_note__given_stale_if_match__should_return_409(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    result = await session.notes.insert_one(
+        {
+            "title": "Note",
+            "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
+            "revision": 5,
+        }
+    )
+
+    response = await client.put(
+        f"{API_PREFIX}/{folder_id}/notes/{result.inserted_id}",
+        json={"title": "New"},
+        headers={"If-Match": '"4"'},
+    )
+
+    assert response.status_code == 409, response.text
+    note = await session.notes.find_one({"_id": result.inserted_id})
+    assert note["title"] == "Note"
+
+
+@pytest.mark.asyncio
+async def test__update_note__given_current_if_match__should_return_note(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    result = await session.notes.insert_one(
+        {
+            "title": "Note",
+            "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
+            "revision": 5,
+        }
+    )
+
+    response = await client.put(
+        f"{API_PREFIX}/{folder_id}/notes/{result.inserted_id}",
+        json={"title": "New", "last_updated_at": "2000-01-01T00:00:00Z"},
+        headers={"If-Match": '"5"'},
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["title"] == "New"
+    assert response.json()["revision"] == 6
+    assert response.headers["etag"] == '"6"'
+    note = await session.notes.find_one({"_id": result.inserted_id})
+    assert note["last_updated_at"].year != 2000
@@ -1,7 +1,12 @@
+from datetime import timedelta
+
 import pytest
 from bson import ObjectId
 
-from core.enums import FolderEventType
+from core.enums import FolderEventType, NoteEventType
+from core.revisions import RevisionConflictError
+from core.utils import get_now_utc
+from database import get_client
 from folders import services
 
 
@@ -79,7 +84,10 @@ async def test__delete_folder__given_existent_folder__should_delete(
 
     folder = await session.folders.find_one({"_id": result.inserted_id})
 
-    assert not folder, "Folder was found"
+    assert folder["deleted_at"], "Folder was not moved to the trash"
+    assert not await services.get_user_folder(
+        "user123", str(result.inserted_id), session
+    )
 
 
 @pytest.mark.asyncio
@@ -210,6 +218,87 @@ async def test__delete_folder__should_log_event(session):
     assert events[0]["payload"] == {}
 
 
+@pytest.mark.asyncio
+async def test__delete_folder__should_create_job(session):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": "user123"}
+    )
+
+    job = await services.delete_folder(
+        owner_id="user123", folder_id=str(result.inserted_id), session=session
+    )
+
+    assert await session.jobs.find_one({"_id": job["_id"]})
+    assert job["type"] == "TRASH_FOLDER_CONTENT"
+    assert job["params"]["folder_id"] == str(result.inserted_id)
+
+
+@pytest.mark.asyncio
+async def test__trash_folder_content__should_trash_and_restore_notes_with_folder(
+    session,
+):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": "user123"}
+    )
+    folder_id = str(result.inserted_id)
+    earlier = get_now_utc() - timedelta(days=1)
+    await session.notes.insert_many(
+        [
+            {"title": f"Note {index}", "folder_id": folder_id, "owner_id": "user123"}
+            for index in range(5)
+        ]
+        + [
+            {
+                "title": "Trashed note",
+                "folder_id": folder_id,
+                "owner_id": "user123",
+                "deleted_at": earlier,
+            },
+            {"title": "Other note", "folder_id": "folder456", "owner_id": "user123"},
+        ]
+    )
+    job = await services.delete_folder("user123", folder_id, session)
+
+    await services.trash_folder_content(job, get_client(), batch_size=2)
+
+    live_notes = await session.notes.find({"deleted_at": None}).to_list()
+    events = await session.events.find({"type": NoteEventType.DELETED.value}).to_list()
+    job = await session.jobs.find_one({"_id": job["_id"]})
+
+    assert [note["title"] for note in live_notes] == ["Other note"]
+    assert len(events) == 5
+    assert {event["owner_id"] for event in events} == {"user123"}
+    assert job["progress"] == {"trashed_notes": 5}
+
+    job = await services.restore_folder("user123", folder_id, session)
+    await services.restore_folder_content(job, get_client(), batch_size=2)
+
+    trashed_notes = await session.notes.find({"deleted_at": {"$ne": None}}).to_list()
+    events = await session.events.find({"type": NoteEventType.RESTORED.value}).to_list()
+
+    assert await services.get_user_folder("user123", folder_id, session)
+    assert [note["title"] for note in trashed_notes] == ["Trashed note"]
+    assert len(events) == 5
+    assert events[0]["payload"]["folder_id"] == folder_id
+
+
+@pytest.mark.asyncio
+async def test__trash_folder_content__given_restored_folder__should_stop(session):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": "user123"}
+    )
+    folder_id = str(result.inserted_id)
+    await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": "user123"}
+    )
+    job = await services.delete_folder("user123", folder_id, session)
+    await services.restore_folder("user123", folder_id, session)
+
+    await services.trash_folder_content(job, get_client())
+
+    assert await session.notes.count_documents({"deleted_at": None}) == 1
+
+
 @pytest.mark.asyncio
 async def test__delete_folder__given_no_user_folder__should_not_log_event(session):
     result = await session.folders.insert_one(
@@ -223,3 +312,114 @@ async def test__delete_folder__given_no_user_folder__should_not_log_event(sessio
     events = await session.events.find().to_list()
 
     assert not events
+
+
+@pytest.mark.asyncio
+async def test__get_folders__given_cursor__should_return_next_page(session):
+    folders = [
+        {
+            "name": f"Folder {i}",
+            "created_at": f"2022-01-0{i}T00:00:00Z",
+            "owner_id": "user123",
+        }
+        for i in range(5)
+    ]
+    await session.folders.insert_many(folders)
+    first_page = await services.get_folders(
+        owner_id="user123", session=session, limit=2
+    )
+    cursor = (first_page[-1]["created_at"], first_page[-1]["_id"])
+
+    second_page = await services.get_folders(
+        owner_id="user123", session=session, limit=2, cursor=cursor
+    )
+
+    assert [folder["name"] for folder in second_page] == ["Folder 2", "Folder 3"]
+
+
+@pytest.mark.asyncio
+async def test__get_folders__given_cursor_with_same_sort_key__should_not_repeat(
+    session,
+):
+    folders = [
+        {"name": f"Folder {i}", "created_at": "2022-01-01T00:00:00Z", "owner_id": "1"}
+        for i in range(3)
+    ]
+    await session.folders.insert_many(folders)
+    first_page = await services.get_folders(owner_id="1", session=session, limit=2)
+    cursor = (first_page[-1]["created_at"], first_page[-1]["_id"])
+
+    second_page = await services.get_folders(
+        owner_id="1", session=session, limit=2, cursor=cursor
+    )
+
+    assert [folder["name"] for folder in first_page + second_page] == [
+        "Folder 0",
+        "Folder 1",
+        "Folder 2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test__apply_folder_batch__given_mixed_operations__should_apply_all(
+    session,
+):
+    updated = await session.folders.insert_one(
+        {"name": "Folder", "owner_id": "user123"}
+    )
+    other = await session.folders.insert_one({"name": "Other", "owner_id": "user456"})
+    operations = [
+        {"op": "create", "folder": {"name": "New Folder"}},
+        {"op": "update", "id": str(updated.inserted_id), "folder": {"name": "Edited"}},
+        {"op": "delete", "id": str(other.inserted_id)},
+    ]
+
+    results = await services.apply_folder_batch("user123", operations, session)
+
+    assert [result["status"] for result in results] == [
+        "created",
+        "updated",
+        "not_found",
+    ]
+    created = await session.folders.find_one({"_id": results[0]["id"]})
+    assert created["owner_id"] == "user123"
+    assert (await session.folders.find_one({"_id": updated.inserted_id}))["name"] == (
+        "Edited"
+    )
+    assert await session.folders.find_one({"_id": other.inserted_id})
+    events = await session.events.find().to_list()
+    assert [event["type"] for event in events] == [
+        FolderEventType.CREATED.value,
+        FolderEventType.UPDATED.value,
+    ]
+
+
+@pytest.mark.asyncio
+async def test__update_folder__given_revision__should_update_if_current(session):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": "user123"}
+    )
+
+    folder = await services.update_folder(
+        "user123", str(result.inserted_id), {"name": "Updated"}, session, revision=0
+    )
+
+    assert folder["name"] == "Updated"
+    assert folder["revision"] == 1
+
+
+@pytest.mark.asyncio
+async def test__update_folder__given_stale_revision__should_raise_conflict(session):
+    result = await session.folders.insert_one(
+        {"name": "Test Folder", "owner_id": "user123", "revision": 3}
+    )
+
+    with pytest.raises(RevisionConflictError) as error:
+        await services.update_folder(
+            "user123", str(result.inserted_id), {"name": "Updated"}, session, revision=2
+        )
+
+    folder = await session.folders.find_one({"_id": result.inserted_id})
+    assert error.value.revision == 3
+    assert folder["name"] == "Test Folder"
+    assert not await session.events.find().to_list()
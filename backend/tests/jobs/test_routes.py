@@ -0,0 +1,48 @@
+import pytest
+from bson import ObjectId
+
+from folders.constants import API_PREFIX as FOLDERS_API_PREFIX
+from jobs.constants import API_PREFIX
+from jobs.runner import runner
+
+
+@pytest.mark.asyncio
+async def test__get_job__given_folder_deletion__should_return_progress(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    await session.notes.insert_many(
+        [
+            {"title": "Note", "folder_id": folder_id, "owner_id": auth_user.user_id}
+            for _ in range(3)
+        ]
+    )
+    response = await client.delete(f"{FOLDERS_API_PREFIX}/{folder_id}")
+    await runner.join()
+    response = await client.get(response.headers["location"])
+
+    assert response.status_code == 200, response.text
+    assert response.json()["status"] == "done"
+    assert response.json()["progress"] == {"trashed_notes": 3}
+    assert await session.notes.count_documents({"deleted_at": None}) == 0
+
+
+@pytest.mark.asyncio
+async def test__get_job__given_other_user_job__should_return_not_found(client, session):
+    result = await session.jobs.insert_one(
+        {"type": "TRASH_FOLDER_CONTENT", "owner_id": "other_user", "status": "done"}
+    )
+
+    response = await client.get(f"{API_PREFIX}/{result.inserted_id}")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test__get_job__given_invalid_job_id__should_return_not_found(client):
+    response = await client.get(f"{API_PREFIX}/{ObjectId()}x")
+
+    assert response.status_code == 404
@@ -0,0 +1,157 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from core.utils import get_now_utc
+from database import get_client
+from jobs import services
+from jobs.enums import JobStatus, JobType
+from jobs.runner import JobRunner
+
+
+def create_runner(runs: "list") -> "JobRunner":
+    runner = JobRunner(lease_seconds=60)
+
+    @runner.handler(JobType.EMPTY_TRASH)
+    async def handle(job, client):
+        runs.append((runner.id, job["_id"]))
+
+    return runner
+
+
+@pytest.mark.asyncio
+async def test__start__given_leased_job__should_not_resume_it(session):
+    job = await services.create_job("user", JobType.EMPTY_TRASH, {}, session)
+    await services.claim_job(job["_id"], "other_runner", 60, session)
+    runs = []
+    runner = create_runner(runs)
+
+    await runner.start(get_client())
+    await runner.join()
+    await runner.stop()
+
+    assert runs == []
+    assert (await session.jobs.find_one({"_id": job["_id"]}))["runner_id"] == (
+        "other_runner"
+    )
+
+
+@pytest.mark.asyncio
+async def test__start__given_expired_lease__should_resume_once(session):
+    job = await services.create_job("user", JobType.EMPTY_TRASH, {}, session)
+    await session.jobs.update_one(
+        {"_id": job["_id"]},
+        {
+            "$set": {
+                "status": JobStatus.RUNNING.value,
+                "runner_id": "stopped_runner",
+                "lease_expires_at": get_now_utc() - timedelta(seconds=1),
+            }
+        },
+    )
+    runs = []
+    runners = [create_runner(runs) for _ in range(2)]
+
+    await asyncio.gather(*(runner.start(get_client()) for runner in runners))
+    for runner in runners:
+        await runner.join()
+        await runner.stop()
+
+    assert [job_id for _, job_id in runs] == [job["_id"]]
+    assert (await session.jobs.find_one({"_id": job["_id"]}))["status"] == "done"
+
+
+@pytest.mark.asyncio
+async def test__submit__given_job_claimed_by_another_runner__should_not_run_it(
+    session,
+):
+    runs = []
+    runners = [create_runner(runs) for _ in range(2)]
+    for runner in runners:
+        await runner.start(get_client())
+    job = await services.create_job("user", JobType.EMPTY_TRASH, {}, session)
+
+    for runner in runners:
+        runner.submit(job)
+    for runner in runners:
+        await runner.join()
+        await runner.stop()
+
+    assert [job_id for _, job_id in runs] == [job["_id"]]
+
+
+@pytest.mark.asyncio
+async def test__stop__should_release_running_jobs(session):
+    job = await services.create_job("user", JobType.EMPTY_TRASH, {}, session)
+    started = asyncio.Event()
+    runner = JobRunner(lease_seconds=60)
+
+    @runner.handler(JobType.EMPTY_TRASH)
+    async def handle(job, client):
+        started.set()
+        await asyncio.Event().wait()
+
+    await runner.start(get_client())
+    runner.submit(job)
+    await asyncio.wait_for(started.wait(), timeout=1)
+    await runner.stop()
+
+    assert await services.claim_expired_job("next_runner", 60, session)
+
+
+@pytest.mark.asyncio
+async def test__run__given_lost_lease__should_cancel_job_and_keep_new_status(
+    session,
+):
+    runner = JobRunner(lease_seconds=0.03)
+    cancelled = asyncio.Event()
+
+    @runner.handler(JobType.EMPTY_TRASH)
+    async def handle(job, client):
+        # Claimed by another runner once the lease expired
+        await session.jobs.update_one(
+            {"_id": job["_id"]},
+            {
+                "$set": {
+                    "runner_id": "other_runner",
+                    "lease_expires_at": get_now_utc() + timedelta(seconds=60),
+                }
+            },
+        )
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    await runner.start(get_client())
+    job = await services.create_job("user", JobType.EMPTY_TRASH, {}, session)
+    runner.submit(job)
+    await asyncio.wait_for(cancelled.wait(), 1)
+    await runner.join()
+    await runner.stop()
+
+    job = await session.jobs.find_one({"_id": job["_id"]})
+    assert (job["status"], job["runner_id"]) == ("running", "other_runner")
+
+
+@pytest.mark.asyncio
+async def test__run__given_job_claimed_by_another_runner__should_not_finish_it(
+    session,
+):
+    job = await services.create_job("user", JobType.EMPTY_TRASH, {}, session)
+    runner = JobRunner(lease_seconds=60)
+
+    @runner.handler(JobType.EMPTY_TRASH)
+    async def handle(job, client):
+        await session.jobs.update_one(
+            {"_id": job["_id"]}, {"$set": {"runner_id": "other_runner"}}
+        )
+
+    await runner.start(get_client())
+    await runner.join()
+    await runner.stop()
+
+    job = await session.jobs.find_one({"_id": job["_id"]})
+    assert (job["status"], job["runner_id"]) == ("running", "other_runner")
@@ -0,0 +1,28 @@
+import pytest
+
+from notes.delta import apply_operations
+
+
+def test__apply_operations__should_apply_in_order():
+    operations = [
+        {"position": 17, "delete": 5, "insert": "sea"},
+        {"position": 0, "insert": "Today "},
+        {"position": 6, "delete": 1, "insert": "i"},
+    ]
+
+    content = apply_operations("I will go to the beach.", operations)
+
+    assert content == "Today i will go to the sea."
+
+
+def test__apply_operations__given_non_ascii__should_count_code_points():
+    content = apply_operations(
+        "Café ☕", [{"position": 5, "delete": 1, "insert": "🍵"}]
+    )
+
+    assert content == "Café 🍵"
+
+
+def test__apply_operations__given_out_of_bounds__should_raise():
+    with pytest.raises(ValueError):
+        apply_operations("Content", [{"position": 5, "delete": 3}])
@@ -0,0 +1,87 @@
+import pytest
+import pytest_asyncio
+
+from notes.constants import API_PREFIX, SERVER_TIMING_HEADER
+from notes.indexes import INDEXES
+
+
+@pytest_asyncio.fixture
+async def text_index(session):
+    await session.notes.create_indexes(INDEXES["notes"])
+
+
+@pytest.mark.asyncio
+async def test__search_notes__should_return_ranked_owner_notes(
+    session, client, auth_user, text_index
+):
+    await session.notes.insert_many(
+        [
+            {
+                "title": "Beach",
+                "content": "Going to the beach",
+                "folder_id": "folder_id",
+                "owner_id": auth_user.user_id,
+            },
+            {
+                "title": "Vacations",
+                "content": "Maybe the beach",
+                "folder_id": "folder_id",
+                "owner_id": auth_user.user_id,
+            },
+            {
+                "title": "Beach",
+                "content": "Someone else's beach",
+                "folder_id": "folder_id",
+                "owner_id": "other_user",
+            },
+        ]
+    )
+
+    response = await client.get(f"{API_PREFIX}/search", params={"q": "beach"})
+
+    assert response.status_code == 200, response.text
+    assert SERVER_TIMING_HEADER in response.headers
+    results = response.json()
+    assert [result["title"] for result in results] == ["Beach", "Vacations"]
+    assert results[0]["score"] > results[1]["score"]
+    assert results[1]["snippets"] == [
+        {"field": "content", "text": "Maybe the beach", "highlights": [[10, 15]]}
+    ]
+
+
+@pytest.mark.asyncio
+async def test__search_notes__given_next_cursor__should_return_next_page(
+    session, client, auth_user, text_index
+):
+    await session.notes.insert_many(
+        [
+            {
+                "title": f"Beach {index}",
+                "folder_id": "folder_id",
+                "owner_id": auth_user.user_id,
+            }
+            for index in range(3)
+        ]
+    )
+
+    first_page = await client.get(
+        f"{API_PREFIX}/search", params={"q": "beach", "limit": 2}
+    )
+    second_page = await client.get(
+        f"{API_PREFIX}/search",
+        params={
+            "q": "beach",
+            "limit": 2,
+            "cursor": first_page.headers["X-Next-Cursor"],
+        },
+    )
+
+    titles = [note["title"] for note in first_page.json() + second_page.json()]
+    assert sorted(titles) == ["Beach 0", "Beach 1", "Beach 2"]
+
+
+@pytest.mark.asyncio
+async def test__search_notes__given_empty_query__should_return_unprocessable(client):
+    response = await client.get(f"{API_PREFIX}/search", params={"q": ""})
+
+    assert response.status_code == 422
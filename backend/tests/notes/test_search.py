@@ -0,0 +1,32 @@
+from notes import search
+
+
+def test__get_search_terms__should_lowercase_and_skip_negated_words():
+    assert search.get_search_terms('Beach "summer trip" -work') == [
+        "beach",
+        "summer",
+        "trip",
+    ]
+
+
+def test__get_snippet__given_match__should_highlight_words():
+    snippet = search.get_snippet("Running on the beach", ["run", "beach"])
+
+    assert snippet["text"] == "Running on the beach"
+    assert snippet["highlights"] == [(0, 7), (15, 20)]
+
+
+def test__get_snippet__given_long_text__should_center_on_first_match():
+    text = " ".join(["word"] * 100 + ["beach"] + ["word"] * 100)
+
+    snippet = search.get_snippet(text, ["beach"], length=40)
+
+    assert len(snippet["text"]) <= 45
+    start, end = snippet["highlights"][0]
+    assert snippet["text"][start:end] == "beach"
+    assert not snippet["text"].startswith(" ")
+
+
+def test__get_snippet__given_no_match__should_return_none():
+    assert search.get_snippet("Mountains", ["beach"]) is None
+    assert search.get_snippet(None, ["beach"]) is None
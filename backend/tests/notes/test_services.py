@@ -1,7 +1,18 @@
+from datetime import timedelta
+
 import pytest
 from bson import ObjectId, errors
 
+import file_storage
+from core.enums import NoteEventType
+from core.utils import get_now_utc
+from file_storage import MemoryStorage
+from file_storage.base import get_blob_key
 from notes import services
+from notes.enums import NoteView
+from core.revisions import RevisionConflictError
+
+OWNER_ID = "user123"
 
 
 @pytest.mark.asyncio
@@ -12,7 +23,7 @@ async def test__create_note__should_create_note(session):
         "content": "This is a test.",
     }
 
-    await services.create_note(folder_id, payload, session)
+    await services.create_note(OWNER_ID, folder_id, payload, session)
 
     note = await session.notes.find_one({"title": payload["title"]})
 
@@ -24,13 +35,20 @@ async def test__create_note__should_create_note(session):
 @pytest.mark.asyncio
 async def test__update_note__given_new_title__should_update(session):
     folder_id = ObjectId()
-    note_payload = {"title": "Note", "content": "Content", "folder_id": folder_id}
+    note_payload = {
+        "title": "Note",
+        "content": "Content",
+        "folder_id": folder_id,
+        "owner_id": OWNER_ID,
+    }
     result = await session.notes.insert_one(note_payload)
     update_payload = {
         "title": "New Note",
     }
 
-    await services.update_note(result.inserted_id, folder_id, update_payload, session)
+    await services.update_note(
+        OWNER_ID, result.inserted_id, folder_id, update_payload, session
+    )
 
     updated_note = await session.notes.find_one({"_id": result.inserted_id})
 
@@ -42,11 +60,18 @@ async def test__update_note__given_new_content_title__should_update(
     session,
 ):
     folder_id = ObjectId()
-    note = {"title": "Note", "content": "Content", "folder_id": folder_id}
+    note = {
+        "title": "Note",
+        "content": "Content",
+        "folder_id": folder_id,
+        "owner_id": OWNER_ID,
+    }
     result = await session.notes.insert_one(note)
     payload = {"title": "New Note", "content": "New Content"}
 
-    await services.update_note(result.inserted_id, folder_id, payload, session)
+    await services.update_note(
+        OWNER_ID, result.inserted_id, folder_id, payload, session
+    )
 
     updated_note = await session.notes.find_one({"_id": result.inserted_id})
 
@@ -58,14 +83,22 @@ async def test__update_note__given_new_content_title__should_update(
 async def test__delete_note__should_soft_delete(session):
     folder_id = ObjectId()
     result = await session.notes.insert_one(
-        {"title": "Note", "content": "Content", "folder_id": folder_id}
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": folder_id,
+            "owner_id": OWNER_ID,
+        }
     )
 
-    await services.delete_note(result.inserted_id, folder_id, session)
+    await services.delete_note(OWNER_ID, result.inserted_id, folder_id, session)
 
     deleted_note = await session.notes.find_one({"_id": result.inserted_id})
 
-    assert not deleted_note, "Note was not deleted"
+    assert deleted_note["deleted_at"], "Note was not moved to the trash"
+    assert not await services.get_folder_note(
+        OWNER_ID, result.inserted_id, folder_id, session
+    )
 
 
 @pytest.mark.asyncio
@@ -74,12 +107,17 @@ async def test__get_folder_notes__should_return(
 ):
     result = await session.folders.insert_one({"name": "Test Folder"})
     await session.notes.insert_one(
-        {"title": "Note", "content": "Content", "folder_id": result.inserted_id}
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": result.inserted_id,
+            "owner_id": OWNER_ID,
+        }
     )
     note = {"title": "Note 2", "content": "Content 2", "folder_id": ObjectId()}
     await session.notes.insert_one(note)
 
-    notes = await services.get_folder_notes(result.inserted_id, session)
+    notes = await services.get_folder_notes(OWNER_ID, result.inserted_id, session)
 
     assert len(notes) == 1
     assert notes[0]["title"] == "Note"
@@ -90,23 +128,52 @@ async def test__get_folder_notes__should_return(
 async def test__get_folder_notes__should_exclude_soft_deleted(session):
     result_folder = await session.folders.insert_one({"name": "Test Folder"})
     result_note = await session.notes.insert_one(
-        {"title": "Note", "content": "Content", "folder_id": result_folder.inserted_id}
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": result_folder.inserted_id,
+            "owner_id": OWNER_ID,
+        }
     )
     await services.delete_note(
-        result_note.inserted_id, result_folder.inserted_id, session
+        OWNER_ID, result_note.inserted_id, result_folder.inserted_id, session
     )
 
-    notes = await services.get_folder_notes(result_folder.inserted_id, session)
+    notes = await services.get_folder_notes(
+        OWNER_ID, result_folder.inserted_id, session
+    )
 
     assert len(notes) == 0
 
 
+@pytest.mark.asyncio
+async def test__get_folder_notes__given_summary_view__should_project_summary_fields(
+    session,
+):
+    result_folder = await session.folders.insert_one({"name": "Test Folder"})
+    await session.notes.insert_one(
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": result_folder.inserted_id,
+            "owner_id": OWNER_ID,
+            "revision": 1,
+        }
+    )
+
+    notes = await services.get_folder_notes(
+        OWNER_ID, result_folder.inserted_id, session, view=NoteView.SUMMARY
+    )
+
+    assert [set(note) for note in notes] == [{"_id", "title", "revision"}]
+
+
 @pytest.mark.asyncio
 async def test__create_note__without_optional_fields__should_succeed(session):
     payload = {"title": "Test Note"}
     folder_id = ObjectId()
 
-    created_note = await services.create_note(folder_id, payload, session)
+    created_note = await services.create_note(OWNER_ID, folder_id, payload, session)
 
     assert created_note["title"] == payload["title"]
     assert created_note["folder_id"] == payload["folder_id"]
@@ -122,10 +189,11 @@ async def test__update_note__with_empty_payload__should_not_remove_existing_fiel
         "title": "Original Note",
         "content": "Original Content",
         "folder_id": folder_id,
+        "owner_id": OWNER_ID,
     }
     result = await session.notes.insert_one(note)
 
-    await services.update_note(result.inserted_id, folder_id, {}, session)
+    await services.update_note(OWNER_ID, result.inserted_id, folder_id, {}, session)
 
     updated_note = await session.notes.find_one({"_id": result.inserted_id})
 
@@ -138,7 +206,7 @@ async def test__create_note__should_trigger_create_event(session):
     payload = {"title": "Test Note"}
     folder_id = ObjectId()
 
-    result = await services.create_note(folder_id, payload, session)
+    result = await services.create_note(OWNER_ID, folder_id, payload, session)
 
     events = await session.events.find().to_list()
 
@@ -150,11 +218,18 @@ async def test__create_note__should_trigger_create_event(session):
 @pytest.mark.asyncio
 async def test__update_note__should_trigger_update_event(session):
     folder_id = ObjectId()
-    note = {"title": "Note", "content": "Content", "folder_id": folder_id}
+    note = {
+        "title": "Note",
+        "content": "Content",
+        "folder_id": folder_id,
+        "owner_id": OWNER_ID,
+    }
     result = await session.notes.insert_one(note)
     update_payload = {"title": "Updated Note"}
 
-    await services.update_note(result.inserted_id, folder_id, update_payload, session)
+    await services.update_note(
+        OWNER_ID, result.inserted_id, folder_id, update_payload, session
+    )
 
     events = await session.events.find().to_list()
 
@@ -166,10 +241,15 @@ async def test__update_note__should_trigger_update_event(session):
 @pytest.mark.asyncio
 async def test__delete_note__should_trigger_delete_event(session):
     folder_id = ObjectId()
-    note = {"title": "Note", "content": "Content", "folder_id": folder_id}
+    note = {
+        "title": "Note",
+        "content": "Content",
+        "folder_id": folder_id,
+        "owner_id": OWNER_ID,
+    }
     result = await session.notes.insert_one(note)
 
-    await services.delete_note(result.inserted_id, folder_id, session)
+    await services.delete_note(OWNER_ID, result.inserted_id, folder_id, session)
 
     events = await session.events.find().to_list()
 
@@ -184,7 +264,7 @@ async def test__update_note__with_invalid_id__should_raise(session):
     payload = {"title": "New Title"}
 
     with pytest.raises(errors.InvalidId):
-        await services.update_note(invalid_id, ObjectId(), payload, session)
+        await services.update_note(OWNER_ID, invalid_id, ObjectId(), payload, session)
 
 
 @pytest.mark.asyncio
@@ -192,7 +272,7 @@ async def test__delete_note__with_invalid_id__should_raise(session):
     invalid_id = "not_a_valid_object_id"
 
     with pytest.raises(errors.InvalidId):
-        await services.delete_note(invalid_id, ObjectId(), session)
+        await services.delete_note(OWNER_ID, invalid_id, ObjectId(), session)
 
 
 @pytest.mark.asyncio
@@ -205,14 +285,296 @@ async def test__get_folder_notes__with_pagination__should_return_limited_results
             "title": f"Note {i}",
             "content": f"Content {i}",
             "folder_id": folder_id,
+            "owner_id": OWNER_ID,
             "last_updated_at": f"2022-01-{i}T00:00:00Z",
         }
         for i in range(5)
     ]
     await session.notes.insert_many(notes)
 
-    results = await services.get_folder_notes(folder_id, session, limit=2, offset=2)
+    results = await services.get_folder_notes(
+        OWNER_ID, folder_id, session, limit=2, offset=2
+    )
 
     assert len(results) == 2
     assert results[0]["title"] == "Note 2"
     assert results[1]["title"] == "Note 3"
+
+
+@pytest.mark.asyncio
+async def test__get_folder_notes__given_cursor__should_return_next_page(session):
+    folder_id = ObjectId()
+    notes = [
+        {
+            "title": f"Note {i}",
+            "folder_id": folder_id,
+            "owner_id": OWNER_ID,
+            "last_updated_at": f"2022-01-0{i}T00:00:00Z",
+        }
+        for i in range(5)
+    ]
+    await session.notes.insert_many(notes)
+    first_page = await services.get_folder_notes(OWNER_ID, folder_id, session, limit=3)
+    cursor = (first_page[-1]["last_updated_at"], first_page[-1]["_id"])
+
+    second_page = await services.get_folder_notes(
+        OWNER_ID, folder_id, session, limit=3, cursor=cursor
+    )
+
+    assert [note["title"] for note in second_page] == ["Note 3", "Note 4"]
+
+
+@pytest.mark.asyncio
+async def test__update_note__given_other_owner__should_return_none(session):
+    folder_id = ObjectId()
+    result = await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": OWNER_ID}
+    )
+
+    document = await services.update_note(
+        "user456", result.inserted_id, folder_id, {"title": "New Title"}, session
+    )
+
+    note = await session.notes.find_one({"_id": result.inserted_id})
+    assert document is None
+    assert note["title"] == "Note"
+
+
+@pytest.mark.asyncio
+async def test__delete_note__given_other_owner__should_not_delete(session):
+    folder_id = ObjectId()
+    result = await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": OWNER_ID}
+    )
+
+    deleted = await services.delete_note(
+        "user456", result.inserted_id, folder_id, session
+    )
+
+    assert not deleted
+    assert await session.notes.find_one({"_id": result.inserted_id})
+
+
+@pytest.mark.asyncio
+async def test__backfill_owner_ids__should_copy_folder_owner_to_notes(session):
+    result = await session.folders.insert_one({"name": "Folder", "owner_id": OWNER_ID})
+    folder_id = str(result.inserted_id)
+    await session.notes.insert_many(
+        [{"title": f"Note {i}", "folder_id": folder_id} for i in range(2)]
+    )
+
+    updated_count = await services.backfill_owner_ids(session)
+
+    notes = await session.notes.find({"folder_id": folder_id}).to_list()
+    assert updated_count == 2
+    assert {note["owner_id"] for note in notes} == {OWNER_ID}
+
+
+@pytest.mark.asyncio
+async def test__apply_note_batch__given_mixed_operations__should_apply_all(session):
+    folder_id = str(ObjectId())
+    updated = await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": OWNER_ID}
+    )
+    deleted = await session.notes.insert_one(
+        {"title": "Other Note", "folder_id": folder_id, "owner_id": OWNER_ID}
+    )
+    operations = [
+        {"op": "create", "note": {"title": "New Note", "content": "Content"}},
+        {"op": "update", "id": str(updated.inserted_id), "note": {"title": "Edited"}},
+        {"op": "delete", "id": str(deleted.inserted_id)},
+    ]
+
+    results = await services.apply_note_batch(OWNER_ID, folder_id, operations, session)
+
+    assert [result["status"] for result in results] == ["created", "updated", "deleted"]
+    assert await session.notes.find_one({"_id": results[0]["id"], "owner_id": OWNER_ID})
+    assert (await session.notes.find_one({"_id": updated.inserted_id}))["title"] == (
+        "Edited"
+    )
+    assert (await session.notes.find_one({"_id": deleted.inserted_id}))["deleted_at"]
+    assert await session.events.count_documents({}) == 3
+
+
+@pytest.mark.asyncio
+async def test__apply_note_batch__given_other_owner_note__should_be_not_found(
+    session,
+):
+    folder_id = str(ObjectId())
+    result = await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": "user456"}
+    )
+    operations = [
+        {"op": "delete", "id": str(result.inserted_id)},
+        {"op": "delete", "id": "invalid_id"},
+    ]
+
+    results = await services.apply_note_batch(OWNER_ID, folder_id, operations, session)
+
+    assert [result["status"] for result in results] == ["not_found", "not_found"]
+    assert await session.notes.find_one({"_id": result.inserted_id})
+    assert await session.events.count_documents({}) == 0
+
+
+@pytest.mark.asyncio
+async def test__apply_note_batch__given_unowned_target_folder__should_be_not_found(
+    session,
+):
+    folder_id = str(ObjectId())
+    other_folder = await session.folders.insert_one({"owner_id": "user456"})
+    result = await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": OWNER_ID}
+    )
+    operations = [
+        {
+            "op": "update",
+            "id": str(result.inserted_id),
+            "note": {"folder_id": str(other_folder.inserted_id)},
+        }
+    ]
+
+    results = await services.apply_note_batch(OWNER_ID, folder_id, operations, session)
+
+    assert results[0]["status"] == "not_found"
+    assert (await session.notes.find_one({"_id": result.inserted_id}))[
+        "folder_id"
+    ] == folder_id
+
+
+@pytest.mark.asyncio
+async def test__apply_note_delta__should_apply_operations_and_store_only_them(
+    session,
+):
+    folder_id = str(ObjectId())
+    note = await services.create_note(
+        OWNER_ID, folder_id, {"title": "Note", "content": "Hello world"}, session
+    )
+    operations = [{"position": 6, "delete": 5, "insert": "there"}]
+
+    result = await services.apply_note_delta(
+        OWNER_ID,
+        note["_id"],
+        folder_id,
+        {"revision": 0, "operations": operations},
+        session,
+    )
+
+    updated_note = await session.notes.find_one({"_id": note["_id"]})
+    event = await session.events.find_one({"type": NoteEventType.UPDATED.value})
+    assert result["revision"] == updated_note["revision"] == 1
+    assert updated_note["content"] == "Hello there"
+    assert event["payload"] == {"revision": 1, "operations": operations}
+
+
+@pytest.mark.asyncio
+async def test__apply_note_delta__given_legacy_note__should_start_at_revision_0(
+    session,
+):
+    folder_id = str(ObjectId())
+    result = await session.notes.insert_one(
+        {
+            "title": "Note",
+            "content": "Content",
+            "folder_id": folder_id,
+            "owner_id": OWNER_ID,
+        }
+    )
+
+    await services.apply_note_delta(
+        OWNER_ID,
+        result.inserted_id,
+        folder_id,
+        {"revision": 0, "title": "New"},
+        session,
+    )
+
+    updated_note = await session.notes.find_one({"_id": result.inserted_id})
+    assert updated_note["title"] == "New"
+    assert updated_note["content"] == "Content"
+    assert updated_note["revision"] == 1
+
+
+@pytest.mark.asyncio
+async def test__apply_note_delta__given_stale_revision__should_raise_conflict(
+    session,
+):
+    folder_id = str(ObjectId())
+    note = await services.create_note(
+        OWNER_ID, folder_id, {"title": "Note", "content": "Content"}, session
+    )
+    await services.update_note(
+        OWNER_ID, note["_id"], folder_id, {"content": "Other"}, session
+    )
+
+    with pytest.raises(RevisionConflictError):
+        await services.apply_note_delta(
+            OWNER_ID,
+            note["_id"],
+            folder_id,
+            {"revision": 0, "operations": [{"position": 0, "insert": "My "}]},
+            session,
+        )
+
+    assert (await session.notes.find_one({"_id": note["_id"]}))["content"] == "Other"
+
+
+@pytest.mark.asyncio
+async def test__apply_note_delta__given_other_owner__should_return_none(session):
+    folder_id = str(ObjectId())
+    note = await services.create_note(
+        OWNER_ID, folder_id, {"title": "Note", "content": "Content"}, session
+    )
+
+    result = await services.apply_note_delta(
+        "other_owner", note["_id"], folder_id, {"revision": 0}, session
+    )
+
+    assert result is None
+
+
+@pytest.fixture
+def memory_storage(monkeypatch):
+    storage = MemoryStorage(base_url="http://test/uploads")
+    monkeypatch.setattr(file_storage, "_storage", storage)
+    return storage
+
+
+@pytest.mark.asyncio
+async def test__delete_unreferenced_images__given_recent_upload__should_keep_it(
+    session, memory_storage
+):
+    uploaded_key = get_blob_key("a" * 64, ".png")
+    unlinked_key = get_blob_key("b" * 64, ".png")
+    memory_storage.files = {uploaded_key: b"uploaded", unlinked_key: b"unlinked"}
+    await services.record_image_upload(uploaded_key, session)
+
+    deleted_count = await services.delete_unreferenced_images(
+        {uploaded_key, unlinked_key}, session
+    )
+
+    assert deleted_count == 1
+    assert list(memory_storage.files) == [uploaded_key]
+
+
+@pytest.mark.asyncio
+async def test__collect_uploads__should_delete_old_unreferenced_uploads(
+    session, memory_storage
+):
+    keys = [get_blob_key(character * 64, ".png") for character in "abc"]
+    old_key, linked_key, recent_key = keys
+    memory_storage.files = {key: b"content" for key in keys}
+    for key in keys:
+        await services.record_image_upload(key, session)
+    await session.uploads.update_many(
+        {"_id": {"$in": [old_key, linked_key]}},
+        {"$set": {"uploaded_at": get_now_utc() - timedelta(days=2)}},
+    )
+    await session.notes.insert_one({"owner_id": OWNER_ID, "image_keys": [linked_key]})
+
+    deleted_count = await services.collect_uploads(session, batch_size=1)
+
+    assert deleted_count == 1
+    assert sorted(memory_storage.files) == [linked_key, recent_key]
+    assert [upload["_id"] for upload in await session.uploads.find().to_list()] == [
+        recent_key
+    ]
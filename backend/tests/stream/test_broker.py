@@ -0,0 +1,60 @@
+import pytest
+
+from stream.broker import ChangeBroker
+
+
+def event(owner_id="user123", aggregate_id="a"):
+    return {"aggregate_id": aggregate_id, "type": "NOTE_UPDATED", "owner_id": owner_id}
+
+
+@pytest.mark.asyncio
+async def test__publish__should_only_push_to_owner_connections():
+    broker = ChangeBroker()
+    connection = broker.connect("user123")
+    other_connection = broker.connect("user456")
+
+    await broker.publish([event(), event(owner_id="user456", aggregate_id="b")])
+
+    assert connection.pop() == ([event()], False)
+    assert other_connection.pop() == (
+        [event(owner_id="user456", aggregate_id="b")],
+        False,
+    )
+
+
+@pytest.mark.asyncio
+async def test__publish__given_full_queue__should_ask_to_resync():
+    broker = ChangeBroker(max_queue_size=2)
+    connection = broker.connect("user123")
+
+    await broker.publish([event(aggregate_id=str(index)) for index in range(5)])
+
+    assert await connection.wait(0)
+    assert connection.pop() == ([], True)
+    assert not await connection.wait(0)
+
+
+@pytest.mark.asyncio
+async def test__disconnect__should_stop_pushing():
+    broker = ChangeBroker()
+    connection = broker.connect("user123")
+
+    broker.disconnect(connection)
+    await broker.publish([event()])
+
+    assert broker.connection_count == 0
+    assert connection.pop() == ([], False)
+
+
+@pytest.mark.asyncio
+async def test__resync__should_ask_owner_connections_to_resync():
+    broker = ChangeBroker()
+    connection = broker.connect("user123")
+    other_connection = broker.connect("user456")
+    await broker.publish([event()])
+
+    broker.resync([event(aggregate_id="b")])
+
+    assert await connection.wait(0)
+    assert connection.pop() == ([], True)
+    assert not await other_connection.wait(0)
@@ -0,0 +1,130 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from core import pagination
+from core.utils import get_now_utc
+from core.auth import get_stream_auth_user
+from stream.broker import broker
+from stream.constants import API_PREFIX
+from stream.routes import format_event, stream_changes
+from sync.constants import SYNC_SETTLE_SECONDS
+
+
+@pytest.mark.asyncio
+async def test__stream_changes__should_push_owner_events(auth_user):
+    response = await stream_changes(auth_user, last_event_id=None, session=None)
+    chunks = response.body_iterator
+    created_at = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    event = {
+        "_id": ObjectId(),
+        "aggregate_id": str(ObjectId()),
+        "type": "NOTE_UPDATED",
+        "payload": {"revision": 2, "operations": []},
+        "owner_id": auth_user.user_id,
+        "created_at": created_at,
+    }
+
+    assert (await anext(chunks)).startswith("retry:")
+    await broker.publish([event])
+    message = await anext(chunks)
+    await chunks.aclose()
+
+    assert message.startswith(
+        f"id: {pagination.encode_cursor(created_at, event['_id'])}\n"
+        "event: NOTE_UPDATED\n"
+    )
+    assert f'"id": "{event["aggregate_id"]}"' in message
+    assert '"revision": 2' in message
+    assert broker.connection_count == 0
+
+
+@pytest.mark.asyncio
+async def test__stream_changes__given_no_token__should_return_401(client):
+    response = await client.get(API_PREFIX)
+
+    assert response.status_code == 401, response.text
+
+
+@pytest.mark.asyncio
+async def test__create_ticket__should_authenticate_stream_once(client, auth_user):
+    response = await client.post(f"{API_PREFIX}/tickets")
+    ticket = response.json()["ticket"]
+
+    assert response.status_code == 201, response.text
+    assert await get_stream_auth_user(authorization=None, ticket=ticket) == auth_user
+    with pytest.raises(HTTPException) as error:
+        await get_stream_auth_user(authorization=None, ticket=ticket)
+    assert error.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test__stream_changes__given_expired_token__should_close(auth_user):
+    expired_user = auth_user.model_copy(update={"exp": int(time.time()) - 1})
+    response = await stream_changes(expired_user, last_event_id=None, session=None)
+
+    messages = [message async for message in response.body_iterator]
+
+    assert messages[-1] == "event: expired\ndata: {}\n\n"
+    assert broker.connection_count == 0
+
+
+def test__format_event__given_unsettled_event__should_clamp_id_to_settle_window():
+    event = {
+        "_id": ObjectId(),
+        "aggregate_id": str(ObjectId()),
+        "type": "NOTE_CREATED",
+        "payload": {},
+        "created_at": get_now_utc(),
+    }
+
+    token = format_event(event).split("\n")[0].removeprefix("id: ")
+
+    created_at, _ = pagination.decode_cursor(token)
+    assert created_at <= get_now_utc() - timedelta(seconds=SYNC_SETTLE_SECONDS)
+
+
+@pytest.mark.asyncio
+async def test__stream_changes__given_last_event_id__should_replay_changes_since(
+    auth_user, session
+):
+    created_at = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    events = [
+        {
+            "aggregate_id": str(ObjectId()),
+            "type": "NOTE_CREATED",
+            "payload": {},
+            "owner_id": auth_user.user_id,
+            "created_at": created_at + timedelta(seconds=i),
+        }
+        for i in range(2)
+    ]
+    await session.events.insert_many(events)
+    last_event_id = pagination.encode_cursor(created_at, events[0]["_id"])
+
+    response = await stream_changes(
+        auth_user, last_event_id=last_event_id, session=session
+    )
+    chunks = response.body_iterator
+    await anext(chunks)
+    message = await anext(chunks)
+    await chunks.aclose()
+
+    assert message.count("event: NOTE_CREATED") == 1
+    assert f'"id": "{events[1]["aggregate_id"]}"' in message
+
+
+@pytest.mark.asyncio
+async def test__stream_changes__given_invalid_last_event_id__should_resync(
+    auth_user, session
+):
+    response = await stream_changes(auth_user, last_event_id="invalid", session=session)
+    chunks = response.body_iterator
+    await anext(chunks)
+    message = await anext(chunks)
+    await chunks.aclose()
+
+    assert message == "event: resync\ndata: {}\n\n"
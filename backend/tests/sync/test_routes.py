@@ -0,0 +1,47 @@
+import pytest
+from bson import ObjectId
+
+from core import pagination
+from folders import services as folder_services
+from sync import services
+from sync.constants import API_PREFIX
+
+
+@pytest.mark.asyncio
+async def test__sync__given_token__should_return_changes_since(
+    client, session, auth_user, monkeypatch
+):
+    monkeypatch.setattr(services, "SYNC_SETTLE_SECONDS", 0)
+    folder = await folder_services.create_folder(
+        auth_user.user_id, {"name": "Folder"}, session
+    )
+    first_sync = (await client.get(API_PREFIX)).json()
+    await folder_services.update_folder(
+        auth_user.user_id, str(folder["_id"]), {"name": "Renamed"}, session
+    )
+
+    response = await client.get(API_PREFIX, params={"since": first_sync["token"]})
+
+    assert response.status_code == 200, response.text
+    assert [f["id"] for f in first_sync["folders"]["created"]] == [str(folder["_id"])]
+    assert response.json()["folders"]["updated"] == [
+        {"id": str(folder["_id"]), "name": "Renamed", "revision": 1}
+    ]
+    assert response.json()["token"] != first_sync["token"]
+    assert response.json()["has_more"] is False
+
+
+@pytest.mark.asyncio
+async def test__sync__given_invalid_token__should_return_400(client):
+    response = await client.get(API_PREFIX, params={"since": "invalid"})
+
+    assert response.status_code == 400, response.text
+
+
+@pytest.mark.asyncio
+async def test__sync__given_token_without_datetime__should_return_400(client):
+    since = pagination.encode_cursor(1, ObjectId())
+
+    response = await client.get(API_PREFIX, params={"since": since})
+
+    assert response.status_code == 400, response.text
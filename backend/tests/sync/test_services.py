@@ -0,0 +1,161 @@
+from datetime import timedelta
+
+import pytest
+from bson import ObjectId
+
+from core.utils import get_now_utc
+from folders import services as folder_services
+from notes import services as note_services
+from sync import services
+
+OWNER_ID = "user123"
+
+
+@pytest.fixture(autouse=True)
+def no_settle(monkeypatch):
+    monkeypatch.setattr(services, "SYNC_SETTLE_SECONDS", 0)
+
+
+@pytest.mark.asyncio
+async def test__get_changes__should_return_created_updated_and_deleted(session):
+    folder = await folder_services.create_folder(OWNER_ID, {"name": "Folder"}, session)
+    folder_id = str(folder["_id"])
+    kept = await note_services.create_note(
+        OWNER_ID, folder_id, {"title": "Kept"}, session
+    )
+    removed = await note_services.create_note(
+        OWNER_ID, folder_id, {"title": "Removed"}, session
+    )
+    first_sync = await services.get_changes(OWNER_ID, session)
+
+    await note_services.update_note(
+        OWNER_ID, kept["_id"], folder_id, {"title": "Updated"}, session
+    )
+    await note_services.delete_note(OWNER_ID, removed["_id"], folder_id, session)
+    second_sync = await services.get_changes(OWNER_ID, session, first_sync["position"])
+
+    assert [f["name"] for f in first_sync["folders"]["created"]] == ["Folder"]
+    assert {n["title"] for n in first_sync["notes"]["created"]} == {"Kept", "Removed"}
+    assert not second_sync["folders"]["created"] + second_sync["folders"]["updated"]
+    assert [n["title"] for n in second_sync["notes"]["updated"]] == ["Updated"]
+    assert second_sync["notes"]["deleted"] == [str(removed["_id"])]
+
+
+@pytest.mark.asyncio
+async def test__get_changes__given_created_and_deleted__should_leave_out(session):
+    folder = await folder_services.create_folder(OWNER_ID, {"name": "Folder"}, session)
+    await folder_services.delete_folder(OWNER_ID, str(folder["_id"]), session)
+
+    changes = await services.get_changes(OWNER_ID, session)
+
+    assert changes["folders"] == {"created": [], "updated": [], "deleted": []}
+    assert changes["position"] is not None
+
+
+@pytest.mark.asyncio
+async def test__get_changes__should_only_return_owner_changes(session):
+    await folder_services.create_folder("other_owner", {"name": "Other"}, session)
+
+    changes = await services.get_changes(OWNER_ID, session)
+
+    assert changes["folders"]["created"] == []
+    assert changes["position"] is None
+
+
+@pytest.mark.asyncio
+async def test__get_changes__given_limit__should_resume_from_position(session):
+    for index in range(3):
+        await folder_services.create_folder(
+            OWNER_ID, {"name": f"Folder {index}"}, session
+        )
+
+    first_page = await services.get_changes(OWNER_ID, session, limit=2)
+    second_page = await services.get_changes(
+        OWNER_ID, session, first_page["position"], limit=2
+    )
+
+    assert first_page["more"]
+    assert not second_page["more"]
+    assert [
+        folder["name"]
+        for page in (first_page, second_page)
+        for folder in page["folders"]["created"]
+    ] == ["Folder 0", "Folder 1", "Folder 2"]
+
+
+@pytest.mark.asyncio
+async def test__get_changes__given_unsettled_events__should_wait(session, monkeypatch):
+    monkeypatch.setattr(services, "SYNC_SETTLE_SECONDS", 60)
+    await session.events.insert_one(
+        {
+            "aggregate_id": "x",
+            "type": "FOLDER_DELETED",
+            "payload": {},
+            "owner_id": OWNER_ID,
+            "created_at": get_now_utc() - timedelta(seconds=30),
+        }
+    )
+
+    changes = await services.get_changes(OWNER_ID, session)
+
+    assert changes["folders"]["deleted"] == []
+
+
+@pytest.mark.asyncio
+async def test__get_changes__given_restored_note__should_return_created(session):
+    folder = await folder_services.create_folder(OWNER_ID, {"name": "Folder"}, session)
+    folder_id = str(folder["_id"])
+    note = await note_services.create_note(
+        OWNER_ID, folder_id, {"title": "Note"}, session
+    )
+    first_sync = await services.get_changes(OWNER_ID, session)
+
+    await note_services.delete_note(OWNER_ID, note["_id"], folder_id, session)
+    await note_services.restore_note(OWNER_ID, note["_id"], session)
+    second_sync = await services.get_changes(OWNER_ID, session, first_sync["position"])
+
+    assert [n["title"] for n in second_sync["notes"]["created"]] == ["Note"]
+    assert second_sync["notes"]["deleted"] == []
+
+
+@pytest.mark.asyncio
+async def test__backfill_event_owner_ids__should_copy_owner_to_events(session):
+    folder = await folder_services.create_folder(OWNER_ID, {"name": "Folder"}, session)
+    note = await note_services.create_note(
+        OWNER_ID, str(folder["_id"]), {"title": "Note"}, session
+    )
+    await session.events.update_many({}, {"$unset": {"owner_id": ""}})
+
+    updated_count = await services.backfill_event_owner_ids(session)
+    changes = await services.get_changes(OWNER_ID, session)
+
+    assert updated_count == 2
+    assert [f["_id"] for f in changes["folders"]["created"]] == [folder["_id"]]
+    assert [n["_id"] for n in changes["notes"]["created"]] == [note["_id"]]
+
+
+@pytest.mark.asyncio
+async def test__get_snapshot__given_limit__should_page_folders_then_notes(session):
+    folder = await folder_services.create_folder(OWNER_ID, {"name": "Folder"}, session)
+    notes = [
+        await note_services.create_note(
+            OWNER_ID, str(folder["_id"]), {"title": f"Note {i}"}, session
+        )
+        for i in range(3)
+    ]
+    horizon = (get_now_utc(), ObjectId())
+
+    pages, cursor = [], None
+    while True:
+        page = await services.get_snapshot(OWNER_ID, horizon, session, cursor, limit=2)
+        pages.append(page)
+        if not (cursor := page["cursor"]):
+            break
+
+    assert [
+        [document["_id"] for document in page["folders"]["created"]] for page in pages
+    ] == [[folder["_id"]], [], []]
+    assert [
+        [document["_id"] for document in page["notes"]["created"]] for page in pages
+    ] == [[notes[0]["_id"]], [notes[1]["_id"], notes[2]["_id"]], []]
+    assert all(page["position"] == horizon for page in pages)
@@ -0,0 +1,289 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+from cache import MemoryCache, RedisCache
+from cache.redis import RedisError, encode_command, read_reply
+from core.enums import FolderEventType, NoteEventType
+from folders import services as folder_services
+
+
+@asynccontextmanager
+async def redis_server(password=None):
+    """Stand-in for a Redis server, speaking enough of its protocol for
+    `RedisCache`, and keeping its values in memory"""
+    values, commands = {}, []
+
+    async def handle(reader, writer):
+        authenticated = password is None
+        while not reader.at_eof():
+            try:
+                name, *args = await read_reply(reader)
+            except asyncio.IncompleteReadError:
+                break
+            name = name.decode().upper()
+            commands.append(name)
+            if name == "AUTH":
+                authenticated = args[-1].decode() == password
+                reply = b"+OK\r\n" if authenticated else b"-WRONGPASS\r\n"
+            elif not authenticated:
+                reply = b"-NOAUTH Authentication required\r\n"
+            elif name == "SELECT":
+                reply = b"+OK\r\n"
+            elif name in ("GET", "GETEX"):
+                value = values.get(args[0])
+                reply = b"$-1\r\n" if value is None else encode_command(value)[4:]
+            elif name == "SET":
+                values[args[0]] = args[1]
+                reply = b"+OK\r\n"
+            elif name == "GETDEL":
+                value = values.pop(args[0], None)
+                reply = b"$-1\r\n" if value is None else encode_command(value)[4:]
+            elif name == "INCR":
+                values[args[0]] = str(int(values.get(args[0], 0)) + 1).encode()
+                reply = f":{int(values[args[0]])}\r\n".encode()
+            elif name == "PEXPIRE":
+                reply = f":{int(args[0] in values)}\r\n".encode()
+            elif name == "SCAN":
+                prefix = args[2].rstrip(b"*")
+                keys = [key for key in values if key.startswith(prefix)]
+                reply = b"*2\r\n$1\r\n0\r\n" + encode_command(*keys)
+            elif name == "DEL":
+                reply = f":{sum(values.pop(key, None) is not None for key in args)}\r\n"
+                reply = reply.encode()
+            elif name == "INFO":
+                reply = encode_command(b"# Stats\r\nevicted_keys:3\r\n")[4:]
+            else:
+                reply = f"-ERR unknown command '{name}'\r\n".encode()
+            writer.write(reply)
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        yield port, values, commands
+    finally:
+        server.close()
+
+
+@pytest.mark.asyncio
+async def test__memory_cache__given_value__should_hit_then_expire():
+    memory_cache = MemoryCache(max_size=10)
+    await memory_cache.set("key", b"value", ttl=0.05)
+
+    hit = await memory_cache.get("key")
+    await asyncio.sleep(0.06)
+    expired = await memory_cache.get("key")
+
+    assert (hit, expired) == (b"value", None)
+    assert (memory_cache.hits, memory_cache.misses) == (1, 1)
+    assert len(memory_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test__memory_cache__given_full__should_evict_least_recently_used():
+    memory_cache = MemoryCache(max_size=2)
+    await memory_cache.set("a", b"1", ttl=60)
+    await memory_cache.set("b", b"2", ttl=60)
+    await memory_cache.get("a")
+
+    await memory_cache.set("c", b"3", ttl=60)
+
+    assert await memory_cache.get("b") is None
+    assert await memory_cache.get("a") == b"1"
+    assert await memory_cache.get("c") == b"3"
+    assert (await memory_cache.get_metrics())["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test__memory_cache__given_full__should_keep_counters():
+    memory_cache = MemoryCache(max_size=1)
+    await memory_cache.incr("generation", ttl=60)
+
+    await memory_cache.set("a", b"1", ttl=60)
+    await memory_cache.set("b", b"2", ttl=60)
+
+    assert await memory_cache.get_counter("generation", ttl=60) == 1
+
+
+@pytest.mark.asyncio
+async def test__memory_cache__given_unused_counter__should_expire_it():
+    memory_cache = MemoryCache(max_size=10)
+    await memory_cache.incr("unused", ttl=0.05)
+    await memory_cache.incr("read", ttl=0.05)
+
+    await asyncio.sleep(0.03)
+    read = await memory_cache.get_counter("read", ttl=0.05)
+    await asyncio.sleep(0.03)
+    await memory_cache.incr("other", ttl=0.05)
+
+    assert list(memory_cache._counters) == ["read", "other"]
+    assert read == await memory_cache.get_counter("read", ttl=0.05) == 1
+    assert await memory_cache.get_counter("unused", ttl=0.05) == 0
+
+
+@pytest.mark.asyncio
+async def test__memory_cache__pop__should_return_value_once():
+    memory_cache = MemoryCache(max_size=10)
+    await memory_cache.set("key", b"value", ttl=60)
+
+    assert [await memory_cache.pop("key") for _ in range(2)] == [b"value", None]
+    assert (memory_cache.hits, memory_cache.misses) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test__cached__given_hit__should_not_load():
+    loads = []
+
+    async def load():
+        loads.append(time.monotonic())
+        return [{"name": "Folder"}]
+
+    first = await cache.cached(cache.FOLDER_NAMESPACE, "user", "list", load)
+    second = await cache.cached(cache.FOLDER_NAMESPACE, "user", "list", load)
+
+    assert first == second == [{"name": "Folder"}]
+    assert len(loads) == 1
+
+
+@pytest.mark.asyncio
+async def test__invalidate__given_events__should_only_invalidate_their_namespace_and_owner():
+    async def load():
+        return {"loaded_at": time.monotonic()}
+
+    keys = [
+        (cache.FOLDER_NAMESPACE, "user"),
+        (cache.NOTE_NAMESPACE, "user"),
+        (cache.FOLDER_NAMESPACE, "other"),
+    ]
+    before = [await cache.cached(*key, "key", load) for key in keys]
+
+    await cache.invalidate([{"type": NoteEventType.UPDATED.value, "owner_id": "user"}])
+    after = [await cache.cached(*key, "key", load) for key in keys]
+
+    assert [value == before[i] for i, value in enumerate(after)] == [
+        True,
+        False,
+        True,
+    ]
+
+
+@pytest.mark.asyncio
+async def test__cached__given_unavailable_backend__should_load(monkeypatch):
+    async def unavailable(*args):
+        raise ConnectionRefusedError
+
+    monkeypatch.setattr(cache.get_cache(), "get_counter", unavailable)
+
+    async def load():
+        return {"name": "Folder"}
+
+    assert await cache.cached(cache.FOLDER_NAMESPACE, "user", "key", load) == {
+        "name": "Folder"
+    }
+
+
+@pytest.mark.parametrize(
+    "outbox, stale_reads, expected",
+    [(None, False, True), ([], False, False), (None, True, False)],
+)
+def test__is_cacheable__given_session__should_exclude_transactions_and_secondaries(
+    outbox, stale_reads, expected
+):
+    session = SimpleNamespace(outbox=outbox, stale_reads=stale_reads)
+
+    assert cache.is_cacheable(session) is expected
+
+
+@pytest.mark.asyncio
+async def test__get_user_folder__given_folder_event__should_invalidate(session):
+    folder = await folder_services.create_folder("user", {"name": "Old"}, session)
+    folder_id = str(folder["_id"])
+    await folder_services.get_user_folder("user", folder_id, session)
+
+    await session.folders.update_one({"_id": folder["_id"]}, {"$set": {"name": "New"}})
+    stale = await folder_services.get_user_folder("user", folder_id, session)
+    await cache.invalidate(
+        [{"type": FolderEventType.UPDATED.value, "owner_id": "user"}]
+    )
+    fresh = await folder_services.get_user_folder("user", folder_id, session)
+
+    assert (stale["name"], fresh["name"]) == ("Old", "New")
+
+
+@pytest.mark.asyncio
+async def test__get_folders__given_update__should_return_updated_first_page(session):
+    folder = await folder_services.create_folder("user", {"name": "Old"}, session)
+    await folder_services.get_folders("user", session)
+
+    await folder_services.update_folder(
+        "user", str(folder["_id"]), {"name": "New"}, session
+    )
+
+    assert [f["name"] for f in await folder_services.get_folders("user", session)] == [
+        "New"
+    ]
+
+
+@pytest.mark.asyncio
+async def test__redis_cache__should_get_set_incr_and_clear():
+    async with redis_server(password="secret") as (port, values, commands):
+        redis_cache = RedisCache(
+            f"redis://:secret@127.0.0.1:{port}/2", key_prefix="test:"
+        )
+        miss = await redis_cache.get("key")
+        await redis_cache.set("key", b"value", ttl=60)
+        hit = await redis_cache.get("key")
+        popped = [await redis_cache.pop("key") for _ in range(2)]
+        counters = [await redis_cache.incr("generation", ttl=60) for _ in range(2)]
+        counter = await redis_cache.get_counter("generation", ttl=60)
+        metrics = await redis_cache.get_metrics()
+        await redis_cache.clear()
+        await redis_cache.close()
+
+    assert (miss, hit, counters, counter) == (None, b"value", [1, 2], 2)
+    assert popped == [b"value", None]
+    assert metrics == {"hits": 1, "misses": 1, "evictions": 3, "hit_ratio": 0.5}
+    assert values == {}
+    # Counters expire once unused
+    assert commands.count("PEXPIRE") == 2 and "GETEX" in commands
+    # A single connection, authenticated once, was reused
+    assert commands.count("AUTH") == commands.count("SELECT") == 1
+
+
+@pytest.mark.asyncio
+async def test__redis_cache__given_wrong_password__should_raise():
+    async with redis_server(password="secret") as (port, _, _):
+        redis_cache = RedisCache(f"redis://:wrong@127.0.0.1:{port}")
+
+        with pytest.raises(RedisError, match="WRONGPASS"):
+            await redis_cache.get("key")
+
+
+@pytest.mark.asyncio
+async def test__redis_cache__given_error_reply__should_keep_connection():
+    async with redis_server() as (port, _, commands):
+        redis_cache = RedisCache(f"redis://127.0.0.1:{port}")
+
+        with pytest.raises(RedisError, match="unknown command"):
+            await redis_cache.execute("FLUSHALL")
+        await redis_cache.set("key", b"value", ttl=1)
+        await redis_cache.close()
+
+    assert commands == ["FLUSHALL", "SET"]
+
+
+def test__redis_cache__given_unsupported_url__should_raise():
+    with pytest.raises(ValueError):
+        RedisCache("http://localhost:6379")
+
+
+def test__encode_command__should_encode_bulk_strings():
+    assert encode_command("SET", "key", b"\x00") == (
+        b"*3\r\n$3\r\nSET\r\n$3\r\nkey\r\n$1\r\n\x00\r\n"
+    )
@@ -1,7 +1,18 @@
+from importlib import import_module
+
 import pytest
 from bson import ObjectId
+from pymongo import ASCENDING, TEXT, IndexModel, ReadPreference, monitoring
 
-from database import get_client
+from database import (
+    Client,
+    LazyMotorClientSession,
+    get_client,
+    get_read_preference,
+    indexes,
+)
+from database.monitoring import PoolMetrics
+from pre_start import INDEX_MODULES, create_indexes
 
 
 async def transactional_operations(session):
@@ -39,3 +50,221 @@ async def test__get_session__given_transaction__should_be_atomic(session):
 
     assert not events, "Events should be rolled back"
     assert not notes, "Notes should be rolled back"
+
+
+@pytest.mark.parametrize("module_name", INDEX_MODULES)
+def test__index_registry__should_support_declared_query_shapes(module_name):
+    module = import_module(module_name)
+
+    unsupported = indexes.find_unsupported_query_shapes(
+        indexes.get_registry_keys(module.INDEXES), module.QUERY_SHAPES
+    )
+
+    assert not unsupported, [str(shape) for shape in unsupported]
+
+
+@pytest.mark.parametrize(
+    "keys, expected",
+    [
+        ([("owner_id", 1), ("created_at", 1), ("_id", 1)], True),
+        ([("owner_id", -1), ("created_at", -1), ("_id", -1)], True),
+        ([("owner_id", 1), ("created_at", -1), ("_id", 1)], False),
+        ([("created_at", 1), ("owner_id", 1)], False),
+        ([("owner_id", 1)], False),
+    ],
+)
+def test__supports__given_index_keys__should_match_filter_and_sort(keys, expected):
+    shape = indexes.QueryShape(
+        "folders", filter=("owner_id",), sort=(("created_at", 1), ("_id", 1))
+    )
+
+    assert indexes.supports(keys, shape) is expected
+
+
+@pytest.mark.parametrize(
+    "keys, expected",
+    [
+        ([("owner_id", 1), ("title", "text"), ("content", "text")], True),
+        ([("owner_id", 1), ("_fts", "text"), ("_ftsx", 1)], True),
+        ([("_fts", "text"), ("_ftsx", 1)], False),
+        ([("owner_id", 1), ("title", 1)], False),
+    ],
+)
+def test__supports__given_text_query__should_need_text_index(keys, expected):
+    shape = indexes.QueryShape("notes", filter=("owner_id",), text=True)
+
+    assert indexes.supports(keys, shape) is expected
+
+
+@pytest.mark.asyncio
+async def test__apply_indexes__given_existing_indexes__should_be_idempotent():
+    db = get_client().db
+    registry = import_module("folders.indexes").INDEXES
+
+    await indexes.apply_indexes(db, registry)
+    await indexes.apply_indexes(db, registry)
+
+    existing_keys = await indexes.get_existing_keys(db, registry)
+    assert existing_keys["folders"] == [
+        [("_id", 1)],
+        [("owner_id", 1), ("created_at", 1), ("_id", 1)],
+        [("owner_id", 1), ("_id", 1)],
+        [("owner_id", 1), ("deleted_at", -1), ("_id", -1)],
+        [("deleted_at", 1)],
+    ]
+
+
+@pytest.mark.asyncio
+async def test__drop_indexes__should_drop_existing_indexes_only():
+    db = get_client().db
+    await db.folders.create_index("name", name="name")
+
+    await indexes.drop_indexes(db, {"folders": ["name", "missing"]})
+
+    assert "name" not in await db.folders.index_information()
+
+
+@pytest.mark.asyncio
+async def test__create_indexes__given_replaced_indexes__should_upgrade():
+    db = get_client().db
+    # Indexes declared before notes and folders could be trashed
+    await db.notes.create_indexes(
+        [
+            IndexModel(
+                [
+                    ("folder_id", ASCENDING),
+                    ("owner_id", ASCENDING),
+                    ("last_updated_at", ASCENDING),
+                    ("_id", ASCENDING),
+                ],
+                name="folder_id_owner_id_last_updated_at",
+            ),
+            IndexModel(
+                [("owner_id", ASCENDING), ("title", TEXT), ("content", TEXT)],
+                name="owner_id_text",
+            ),
+        ]
+    )
+    await db.folders.create_index(
+        [("owner_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+        name="owner_id_created_at",
+    )
+    # Indexes that purged the trash before jobs did
+    for collection in (db.notes, db.folders):
+        await collection.create_index(
+            [("deleted_at", ASCENDING)],
+            name="deleted_at_ttl",
+            expireAfterSeconds=30 * 24 * 60 * 60,
+        )
+
+    await create_indexes()
+
+    for module in map(import_module, INDEX_MODULES):
+        for collection, models in module.INDEXES.items():
+            assert set(await db[collection].index_information()) == {
+                "_id_",
+                *(model.document["name"] for model in models),
+            }
+
+
+@pytest.fixture
+def lazy_client():
+    # Sessions are started without a round trip, so no server is needed
+    client = Client(host="mongodb://localhost:27017/testing")
+    yield client
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test__lazy_session__should_only_start_on_first_use(lazy_client):
+    session = LazyMotorClientSession(lazy_client)
+
+    started_before_use = session.started
+    delegate = session.delegate
+    await session.end_session()
+
+    assert not started_before_use
+    assert session.started and delegate is session.delegate
+    assert delegate.has_ended
+
+
+@pytest.mark.asyncio
+async def test__lazy_session__given_no_use__should_end_without_starting(lazy_client):
+    session = LazyMotorClientSession(lazy_client)
+
+    await session.end_session()
+
+    assert not session.started
+
+
+@pytest.mark.asyncio
+async def test__lazy_session__given_not_explicit__should_use_implicit_sessions(
+    lazy_client,
+):
+    session = LazyMotorClientSession(lazy_client, explicit=False)
+
+    assert session.delegate is None
+    with pytest.raises(RuntimeError):
+        session.start_transaction()
+
+
+def test__lazy_session__should_share_client_collections(lazy_client):
+    session = LazyMotorClientSession(lazy_client)
+
+    assert session.notes is lazy_client.collections["notes"]
+    assert session.outbox is None
+
+
+@pytest.mark.asyncio
+async def test__lazy_session__given_secondary__should_read_from_secondaries():
+    client = Client(
+        host="mongodb://localhost:27017/testing",
+        secondary_read_preference=get_read_preference("secondaryPreferred"),
+    )
+
+    session = LazyMotorClientSession(client, explicit=False, secondary=True)
+    primary_session = LazyMotorClientSession(client)
+    client.close()
+
+    assert session.notes.read_preference == ReadPreference.SECONDARY_PREFERRED
+    assert primary_session.notes.read_preference == ReadPreference.PRIMARY
+    assert (session.stale_reads, primary_session.stale_reads) == (True, False)
+
+
+def test__lazy_session__given_primary_secondary_preference__should_not_be_stale(
+    lazy_client,
+):
+    session = LazyMotorClientSession(lazy_client, explicit=False, secondary=True)
+
+    assert not session.stale_reads
+
+
+def test__pool_metrics__should_count_connections_and_checkouts():
+    metrics = PoolMetrics()
+    address = ("localhost", 27017)
+
+    metrics.connection_created(monitoring.ConnectionCreatedEvent(address, 1))
+    for duration in (0.01, 0.03):
+        metrics.connection_check_out_started(
+            monitoring.ConnectionCheckOutStartedEvent(address)
+        )
+        metrics.connection_checked_out(
+            monitoring.ConnectionCheckedOutEvent(address, 1, duration)
+        )
+    metrics.connection_checked_in(monitoring.ConnectionCheckedInEvent(address, 1))
+    metrics.connection_check_out_started(
+        monitoring.ConnectionCheckOutStartedEvent(address)
+    )
+    metrics.connection_check_out_failed(
+        monitoring.ConnectionCheckOutFailedEvent(address, "timeout", 0.5)
+    )
+
+    assert metrics.get_metrics() == {
+        "connections": 1,
+        "in_use": 1,
+        "waiting": 0,
+        "checkouts": 2,
+        "failed_checkouts": 1,
+        "average_wait_seconds": pytest.approx(0.02),
+        "max_wait_seconds": 0.03,
+    }
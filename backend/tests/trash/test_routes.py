@@ -0,0 +1,175 @@
+from datetime import timedelta
+
+import pytest
+from bson import ObjectId
+
+from core.utils import get_now_utc
+from folders.constants import API_PREFIX as FOLDERS_API_PREFIX
+from jobs.runner import runner
+from trash.constants import API_PREFIX
+
+# Within the retention period, so only emptying the trash purges it
+DELETED_AT = get_now_utc() - timedelta(days=3)
+
+
+@pytest.mark.asyncio
+async def test__get_trashed_notes__should_return_most_recent_first(
+    client, session, auth_user
+):
+    await session.notes.insert_many(
+        [
+            {
+                "title": f"Note {index}",
+                "folder_id": str(ObjectId()),
+                "owner_id": auth_user.user_id,
+                "deleted_at": DELETED_AT + timedelta(hours=index),
+            }
+            for index in range(3)
+        ]
+        + [
+            {
+                "title": "Live",
+                "folder_id": str(ObjectId()),
+                "owner_id": auth_user.user_id,
+            }
+        ]
+    )
+
+    response = await client.get(f"{API_PREFIX}/notes", params={"limit": 2})
+    next_response = await client.get(
+        f"{API_PREFIX}/notes",
+        params={"limit": 2, "cursor": response.headers["x-next-cursor"]},
+    )
+
+    assert response.status_code == 200, response.text
+    assert [note["title"] for note in response.json()] == ["Note 2", "Note 1"]
+    assert [note["title"] for note in next_response.json()] == ["Note 0"]
+
+
+@pytest.mark.asyncio
+async def test__delete_folder__should_move_folder_and_notes_to_trash(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    await session.notes.insert_one(
+        {"title": "Note", "folder_id": folder_id, "owner_id": auth_user.user_id}
+    )
+
+    await client.delete(f"{FOLDERS_API_PREFIX}/{folder_id}")
+    await runner.join()
+
+    folders_response = await client.get(FOLDERS_API_PREFIX)
+    notes_response = await client.get(f"{FOLDERS_API_PREFIX}/{folder_id}/notes")
+    trashed_folders_response = await client.get(f"{API_PREFIX}/folders")
+    trashed_notes_response = await client.get(f"{API_PREFIX}/notes")
+
+    assert folders_response.json() == []
+    assert notes_response.status_code == 404
+    assert [folder["id"] for folder in trashed_folders_response.json()] == [folder_id]
+    assert [note["title"] for note in trashed_notes_response.json()] == ["Note"]
+
+
+@pytest.mark.asyncio
+async def test__restore_folder__should_restore_folder_and_notes(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Folder", "owner_id": auth_user.user_id, "deleted_at": DELETED_AT}
+    )
+    folder_id = str(result.inserted_id)
+    await session.notes.insert_one(
+        {
+            "title": "Note",
+            "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
+            "deleted_at": DELETED_AT,
+        }
+    )
+
+    response = await client.post(f"{API_PREFIX}/folders/{folder_id}:restore")
+    await runner.join()
+    notes_response = await client.get(f"{FOLDERS_API_PREFIX}/{folder_id}/notes")
+
+    assert response.status_code == 202, response.text
+    assert response.json()["type"] == "RESTORE_FOLDER_CONTENT"
+    assert response.headers["location"] == f"/api/jobs/{response.json()['id']}"
+    assert [note["title"] for note in notes_response.json()] == ["Note"]
+
+
+@pytest.mark.asyncio
+async def test__restore_folder__given_live_folder__should_return_not_found(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Folder", "owner_id": auth_user.user_id}
+    )
+
+    response = await client.post(f"{API_PREFIX}/folders/{result.inserted_id}:restore")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test__restore_note__should_restore_note(client, session, auth_user):
+    result = await session.folders.insert_one(
+        {"name": "Folder", "owner_id": auth_user.user_id}
+    )
+    folder_id = str(result.inserted_id)
+    result = await session.notes.insert_one(
+        {
+            "title": "Note",
+            "folder_id": folder_id,
+            "owner_id": auth_user.user_id,
+            "deleted_at": DELETED_AT,
+            "revision": 1,
+        }
+    )
+
+    response = await client.post(f"{API_PREFIX}/notes/{result.inserted_id}:restore")
+    note_response = await client.get(
+        f"{FOLDERS_API_PREFIX}/{folder_id}/notes/{result.inserted_id}"
+    )
+
+    assert response.status_code == 200, response.text
+    assert response.json()["revision"] == 2
+    assert response.headers["etag"] == '"2"'
+    assert note_response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test__restore_note__given_trashed_folder__should_return_conflict(
+    client, session, auth_user
+):
+    result = await session.folders.insert_one(
+        {"name": "Folder", "owner_id": auth_user.user_id, "deleted_at": DELETED_AT}
+    )
+    result = await session.notes.insert_one(
+        {
+            "title": "Note",
+            "folder_id": str(result.inserted_id),
+            "owner_id": auth_user.user_id,
+            "deleted_at": DELETED_AT,
+        }
+    )
+
+    response = await client.post(f"{API_PREFIX}/notes/{result.inserted_id}:restore")
+
+    assert response.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test__empty_trash__should_purge_trash(client, session, auth_user):
+    await session.notes.insert_one(
+        {"title": "Note", "owner_id": auth_user.user_id, "deleted_at": DELETED_AT}
+    )
+
+    response = await client.delete(API_PREFIX)
+    await runner.join()
+    job_response = await client.get(response.headers["location"])
+
+    assert response.status_code == 202, response.text
+    assert job_response.json()["status"] == "done"
+    assert await session.notes.count_documents({}) == 0
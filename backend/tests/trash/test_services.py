@@ -0,0 +1,170 @@
+from datetime import timedelta
+
+import pytest
+from bson import ObjectId
+
+import file_storage
+from core.utils import get_now_utc
+from database import get_client
+from file_storage import MemoryStorage
+from file_storage.base import get_blob_key
+from jobs import services as job_services
+from jobs.enums import JobType
+from trash import services
+from trash.constants import TRASH_RETENTION_SECONDS
+
+# Within the retention period, so only emptying the trash purges it
+DELETED_AT = get_now_utc() - timedelta(days=1)
+EXPIRED_AT = get_now_utc() - timedelta(seconds=TRASH_RETENTION_SECONDS + 60)
+
+
+@pytest.mark.asyncio
+async def test__purge_trash__should_purge_trash_and_unlinked_images(
+    session, monkeypatch
+):
+    storage = MemoryStorage(base_url="http://test/uploads")
+    monkeypatch.setattr(file_storage, "_storage", storage)
+    unlinked_key = get_blob_key("a" * 64, ".png")
+    shared_key = get_blob_key("b" * 64, ".png")
+    storage.files = {unlinked_key: b"unlinked", shared_key: b"shared"}
+    await session.folders.insert_many(
+        [
+            {"name": "Trashed", "owner_id": "user123", "deleted_at": DELETED_AT},
+            {"name": "Live", "owner_id": "user123"},
+        ]
+    )
+    await session.notes.insert_many(
+        [
+            {
+                "title": f"Note {index}",
+                "owner_id": "user123",
+                "image_keys": [unlinked_key, shared_key],
+                "deleted_at": DELETED_AT,
+            }
+            for index in range(5)
+        ]
+        + [
+            {"title": "Live note", "owner_id": "user123", "image_keys": [shared_key]},
+            {"title": "Other owner", "owner_id": "user456", "deleted_at": DELETED_AT},
+        ]
+    )
+    job = await services.empty_trash("user123", session)
+
+    await services.purge_trash(job, get_client(), batch_size=2)
+
+    notes = await session.notes.find().to_list()
+    folders = await session.folders.find().to_list()
+    job = await session.jobs.find_one({"_id": job["_id"]})
+
+    assert [note["title"] for note in notes] == ["Live note", "Other owner"]
+    assert [folder["name"] for folder in folders] == ["Live"]
+    assert job["progress"] == {
+        "purged_notes": 5,
+        "deleted_images": 1,
+        "purged_folders": 1,
+    }
+    assert list(storage.files) == [shared_key]
+
+
+@pytest.mark.asyncio
+async def test__purge_trash__given_folder_content_job__should_skip_its_folder(
+    session,
+):
+    result = await session.folders.insert_many(
+        [
+            {"name": "Trashing", "owner_id": "user123", "deleted_at": DELETED_AT},
+            {"name": "Trashed", "owner_id": "user123", "deleted_at": DELETED_AT},
+        ]
+    )
+    trashing_id, trashed_id = map(str, result.inserted_ids)
+    await session.notes.insert_many(
+        [
+            {
+                "title": "Trashing",
+                "folder_id": trashing_id,
+                "owner_id": "user123",
+                "deleted_at": DELETED_AT,
+            },
+            {"title": "Live", "folder_id": trashing_id, "owner_id": "user123"},
+            {
+                "title": "Trashed",
+                "folder_id": trashed_id,
+                "owner_id": "user123",
+                "deleted_at": DELETED_AT,
+            },
+        ]
+    )
+    await job_services.create_job(
+        "user123",
+        JobType.TRASH_FOLDER_CONTENT,
+        {"folder_id": trashing_id, "deleted_at": DELETED_AT},
+        session,
+    )
+    job = await services.empty_trash("user123", session)
+
+    await services.purge_trash(job, get_client())
+
+    notes = await session.notes.find().to_list()
+    folders = await session.folders.find().to_list()
+    assert [note["title"] for note in notes] == ["Trashing", "Live"]
+    assert [folder["name"] for folder in folders] == ["Trashing"]
+
+
+@pytest.mark.asyncio
+async def test__empty_trash__should_create_job(session):
+    job = await services.empty_trash("user123", session)
+
+    assert await session.jobs.find_one({"_id": job["_id"], "owner_id": "user123"})
+    assert isinstance(job["_id"], ObjectId)
+
+
+@pytest.mark.asyncio
+async def test__purge_expired_trash__should_create_jobs_for_expired_trash(session):
+    await session.notes.insert_many(
+        [
+            {"title": "Expired", "owner_id": "user123", "deleted_at": EXPIRED_AT},
+            {"title": "Trashed", "owner_id": "user456", "deleted_at": DELETED_AT},
+            {"title": "Emptying", "owner_id": "user789", "deleted_at": EXPIRED_AT},
+        ]
+    )
+    await session.folders.insert_one(
+        {"name": "Expired", "owner_id": "user000", "deleted_at": EXPIRED_AT}
+    )
+    await services.empty_trash("user789", session)
+
+    created_count = await services.purge_expired_trash(session)
+
+    jobs = await session.jobs.find({}, sort=[("owner_id", 1)]).to_list()
+    assert created_count == 2
+    assert [(job["owner_id"], "deleted_before" in job["params"]) for job in jobs] == [
+        ("user000", True),
+        ("user123", True),
+        ("user789", False),
+    ]
+
+
+@pytest.mark.asyncio
+async def test__purge_trash__given_deleted_before__should_purge_expired_trash_only(
+    session,
+):
+    await session.folders.insert_many(
+        [
+            {"name": "Expired", "owner_id": "user123", "deleted_at": EXPIRED_AT},
+            {"name": "Trashed", "owner_id": "user123", "deleted_at": DELETED_AT},
+        ]
+    )
+    await session.notes.insert_many(
+        [
+            {"title": "Expired", "owner_id": "user123", "deleted_at": EXPIRED_AT},
+            {"title": "Trashed", "owner_id": "user123", "deleted_at": DELETED_AT},
+        ]
+    )
+    await services.purge_expired_trash(session)
+    job = await session.jobs.find_one({"owner_id": "user123"})
+
+    await services.purge_trash(job, get_client())
+
+    notes = await session.notes.find().to_list()
+    folders = await session.folders.find().to_list()
+    assert [note["title"] for note in notes] == ["Trashed"]
+    assert [folder["name"] for folder in folders] == ["Trashed"]
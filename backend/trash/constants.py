@@ -0,0 +1,12 @@
+API_PREFIX = "/api/trash"
+SORT_KEY = "deleted_at"
+# Trashed Folders and Notes are purged, by the jobs `maintenance.py` records,
+# once they have been in the trash for this long
+TRASH_RETENTION_SECONDS = 30 * 24 * 60 * 60
+# Trashed Notes are purged by batches of this size when emptying the trash
+PURGE_BATCH_SIZE = 500
+
+# Filters of the Folders and Notes out of and in the trash. The indexes of each
+# are partial on the same filter, so queries only ever scan their own side.
+LIVE_FILTER = {"deleted_at": None}
+TRASHED_FILTER = {"deleted_at": {"$exists": True}}
@@ -0,0 +1,139 @@
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pydantic import TypeAdapter
+
+from core import pagination, revisions, services as core_services
+from core.auth import get_auth_user
+from core.responses import ModelResponse
+from database import get_secondary_session, get_session
+from folders import services as folder_services
+from jobs import constants as job_constants, schemas as job_schemas
+from jobs.runner import runner
+from notes import schemas as note_schemas, services as note_services
+from trash import constants, schemas, services
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from core.auth import AuthUser
+    from database import Session
+
+router = APIRouter(prefix=constants.API_PREFIX)
+
+TRASHED_FOLDERS = TypeAdapter(list[schemas.TrashedFolder])
+TRASHED_NOTES = TypeAdapter(list[schemas.TrashedNote])
+
+
+def _accept_job(response: "Response", job: "dict[str, Any]") -> "dict[str, Any]":
+    runner.submit(job)
+    response.headers["Location"] = f"{job_constants.API_PREFIX}/{job['_id']}"
+    return job
+
+
+@router.get(
+    "/folders",
+    description="Retrieve the Folders in the trash, most recently trashed first",
+    response_model=list[schemas.TrashedFolder],
+)
+async def get_trashed_folders(
+    response: Response,
+    limit: int = Query(20, ge=1),
+    cursor: "Optional[pagination.Cursor]" = Depends(pagination.get_cursor),
+    session: "Session" = Depends(get_secondary_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "list[schemas.TrashedFolder]":
+    folders = await folder_services.get_trashed_folders(
+        auth_user.user_id, session, limit, cursor
+    )
+    if next_cursor := pagination.get_next_cursor(folders, constants.SORT_KEY, limit):
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return ModelResponse(folders, TRASHED_FOLDERS, headers=response.headers)
+
+
+@router.get(
+    "/notes",
+    description="Retrieve the Notes in the trash, most recently trashed first",
+    response_model=list[schemas.TrashedNote],
+)
+async def get_trashed_notes(
+    response: Response,
+    limit: int = Query(20, ge=1),
+    cursor: "Optional[pagination.Cursor]" = Depends(pagination.get_cursor),
+    session: "Session" = Depends(get_secondary_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "list[schemas.TrashedNote]":
+    notes = await note_services.get_trashed_notes(
+        auth_user.user_id, session, limit, cursor
+    )
+    if next_cursor := pagination.get_next_cursor(notes, constants.SORT_KEY, limit):
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    return ModelResponse(notes, TRASHED_NOTES, headers=response.headers)
+
+
+@router.post(
+    "/folders/{folder_id}:restore",
+    description="Restore a Folder from the trash. The Notes trashed along with it "
+    "are restored in the background, by the returned Job.",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=job_schemas.JobRetrieve,
+)
+async def restore_folder(
+    folder_id: str,
+    response: Response,
+    session: "Session" = Depends(get_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "job_schemas.JobRetrieve":
+    job = await core_services.with_transaction(
+        session,
+        lambda s: folder_services.restore_folder(auth_user.user_id, folder_id, s),
+    )
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return _accept_job(response, job)
+
+
+@router.post(
+    "/notes/{note_id}:restore",
+    description="Restore a Note from the trash, back into its Folder",
+    response_model=note_schemas.NoteRetrieve,
+    responses={
+        status.HTTP_409_CONFLICT: {"description": "Folder of the Note is in the trash"}
+    },
+)
+async def restore_note(
+    note_id: str,
+    response: Response,
+    session: "Session" = Depends(get_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "note_schemas.NoteRetrieve":
+    try:
+        note = await core_services.with_transaction(
+            session,
+            lambda s: note_services.restore_note(auth_user.user_id, note_id, s),
+        )
+    except note_services.FolderInTrashError as error:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(error))
+    if note is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    response.headers[revisions.ETAG_HEADER] = revisions.get_etag(note)
+    return note
+
+
+@router.delete(
+    "",
+    description="Empty the trash. Its Folders and Notes are purged in the "
+    "background, by the returned Job. Otherwise they are purged once they have "
+    "been in the trash for the retention period.",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=job_schemas.JobRetrieve,
+)
+async def empty_trash(
+    response: Response,
+    session: "Session" = Depends(get_session),
+    auth_user: "AuthUser" = Depends(get_auth_user),
+) -> "job_schemas.JobRetrieve":
+    job = await core_services.with_transaction(
+        session, lambda s: services.empty_trash(auth_user.user_id, s)
+    )
+    return _accept_job(response, job)
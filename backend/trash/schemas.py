@@ -0,0 +1,12 @@
+from pydantic import AwareDatetime, Field
+
+from folders.schemas import FolderRetrieve
+from notes.schemas import NoteRetrieve
+
+
+class TrashedFolder(FolderRetrieve):
+    deleted_at: AwareDatetime = Field(examples=["2022-01-01T00:00:00Z"])
+
+
+class TrashedNote(NoteRetrieve):
+    deleted_at: AwareDatetime = Field(examples=["2022-01-01T00:00:00Z"])
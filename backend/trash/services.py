@@ -0,0 +1,143 @@
+import typing
+from datetime import timedelta
+
+from bson import ObjectId
+
+from core.services import with_transaction
+from core.utils import get_now_utc
+from jobs import services as job_services
+from jobs.enums import JobType
+from jobs.runner import runner
+from notes import services as note_services
+from trash.constants import (
+    PURGE_BATCH_SIZE,
+    TRASH_RETENTION_SECONDS,
+    TRASHED_FILTER,
+)
+
+if typing.TYPE_CHECKING:
+    from database import Client, Session
+
+
+async def empty_trash(owner_id: str, session: "Session") -> "dict[str, typing.Any]":
+    """Record the job purging the trash of an owner, see `purge_trash`"""
+    return await job_services.create_job(owner_id, JobType.EMPTY_TRASH, {}, session)
+
+
+async def purge_expired_trash(session: "Session") -> int:
+    """Record the jobs purging the notes and folders that have been in the trash
+    for `TRASH_RETENTION_SECONDS`, see `purge_trash`. Owners whose trash is
+    already being emptied are skipped.
+
+    Returns:
+        int: Number of recorded jobs
+    """
+    deleted_before = get_now_utc() - timedelta(seconds=TRASH_RETENTION_SECONDS)
+    query = {"deleted_at": {"$exists": True, "$lt": deleted_before}}
+    owner_ids = set(
+        await session.notes.distinct("owner_id", query, session=session)
+    ) | set(await session.folders.distinct("owner_id", query, session=session))
+    created_count = 0
+    for owner_id in sorted(owner_ids):
+        if await job_services.get_unfinished_jobs(
+            owner_id, [JobType.EMPTY_TRASH], session
+        ):
+            continue
+        await job_services.create_job(
+            owner_id,
+            JobType.EMPTY_TRASH,
+            {"deleted_before": deleted_before},
+            session,
+        )
+        created_count += 1
+    return created_count
+
+
+def _get_trashed_filter(job: "dict[str, typing.Any]") -> "dict[str, typing.Any]":
+    """Filter of the trashed notes and folders a job purges: all of them, or only
+    those trashed before `deleted_before` when the retention expired"""
+    if deleted_before := job["params"].get("deleted_before"):
+        return {"deleted_at": {"$exists": True, "$lt": deleted_before}}
+    return TRASHED_FILTER
+
+
+async def _get_moving_folder_ids(owner_id: str, session: "Session") -> "list[str]":
+    """Folders whose notes are still being moved to or out of the trash by a job,
+    which must not be purged until it finished"""
+    jobs = await job_services.get_unfinished_jobs(
+        owner_id,
+        [JobType.TRASH_FOLDER_CONTENT, JobType.RESTORE_FOLDER_CONTENT],
+        session,
+    )
+    return [job["params"]["folder_id"] for job in jobs]
+
+
+async def _purge_notes_batch(
+    job: "dict[str, typing.Any]", batch_size: int, session: "Session"
+) -> "list[dict[str, typing.Any]]":
+    query = {
+        "owner_id": job["owner_id"],
+        "folder_id": {"$nin": await _get_moving_folder_ids(job["owner_id"], session)},
+        **_get_trashed_filter(job),
+    }
+    notes = (
+        await session.notes.find(query, {"image_keys": 1}, session=session)
+        .limit(batch_size)
+        .to_list()
+    )
+    if not notes:
+        return []
+    delete_result = await session.notes.delete_many(
+        {**query, "_id": {"$in": [note["_id"] for note in notes]}}, session=session
+    )
+    await job_services.update_job(
+        job["_id"], session, progress={"purged_notes": delete_result.deleted_count}
+    )
+    return notes
+
+
+@runner.handler(JobType.EMPTY_TRASH)
+async def purge_trash(
+    job: "dict[str, typing.Any]",
+    client: "Client",
+    batch_size: int = PURGE_BATCH_SIZE,
+) -> None:
+    """Purge the notes and folders of an owner in the trash, along with the images
+    only they linked to. Only those trashed before `deleted_before` are purged,
+    if the job has that param, see `purge_expired_trash`.
+
+    Notes are purged `batch_size` at a time, each batch in its own transaction,
+    so no transaction grows with the size of the trash. Their `NOTE_DELETED`
+    events were written when they were trashed. Folders whose notes are still
+    being moved by a job are left, with their notes, to a later job.
+    """
+    async with await client.start_session() as session:
+        while notes := await with_transaction(
+            session, lambda s: _purge_notes_batch(job, batch_size, s)
+        ):
+            image_keys = {key for note in notes for key in note.get("image_keys", [])}
+            if image_keys and (
+                deleted_count := await note_services.delete_unreferenced_images(
+                    image_keys, session
+                )
+            ):
+                await job_services.update_job(
+                    job["_id"], session, progress={"deleted_images": deleted_count}
+                )
+
+        await with_transaction(session, lambda s: _purge_folders(job, s))
+
+
+async def _purge_folders(job: "dict[str, typing.Any]", session: "Session") -> None:
+    moving_folder_ids = await _get_moving_folder_ids(job["owner_id"], session)
+    delete_result = await session.folders.delete_many(
+        {
+            "owner_id": job["owner_id"],
+            "_id": {"$nin": [ObjectId(folder_id) for folder_id in moving_folder_ids]},
+            **_get_trashed_filter(job),
+        },
+        session=session,
+    )
+    await job_services.update_job(
+        job["_id"], session, progress={"purged_folders": delete_result.deleted_count}
+    )